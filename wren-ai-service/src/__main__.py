@@ -1,3 +1,4 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 import uvicorn
@@ -12,7 +13,7 @@ from src.globals import (
     create_service_container,
     create_service_metadata,
 )
-from src.providers import generate_components
+from src.providers import generate_components, log_provider_stats
 from src.utils import (
     init_langfuse,
     setup_custom_logger,
@@ -32,12 +33,30 @@ async def lifespan(app: FastAPI):
     app.state.service_container = create_service_container(pipe_components, settings)
     app.state.service_metadata = create_service_metadata(pipe_components)
     init_langfuse(settings)
+    # the cache and coalescing counters of the providers, logged periodically
+    stats_task = (
+        asyncio.create_task(
+            log_provider_stats(pipe_components, settings.provider_stats_interval)
+        )
+        if settings.provider_stats_interval
+        else None
+    )
 
     yield
 
     # shutdown events
+    if stats_task:
+        stats_task.cancel()
     langfuse_context.flush()
 
+    # close the pooled connections of the engines shared by the pipelines
+    engines = {
+        component.engine
+        for component in pipe_components.values()
+        if component.engine is not None
+    }
+    await asyncio.gather(*(engine.close() for engine in engines))
+
 
 app = FastAPI(
     title="wren-ai-service API Docs",
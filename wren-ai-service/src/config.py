@@ -36,6 +36,18 @@ class Settings(BaseSettings):
     instructions_similarity_threshold: float = Field(default=0.7)
     instructions_top_k: int = Field(default=10)
 
+    # embedding cache config
+    enable_embedding_cache: bool = Field(default=True)
+    embedding_cache_max_bytes: int = Field(default=256 * 1024 * 1024)
+    embedding_cache_path: str | None = Field(default=None)
+    embedding_cache_disk_maxsize: int = Field(default=100_000)  # rows on disk
+
+    # llm response cache config, enabled per pipeline with `response_cache: true`
+    llm_response_cache_maxsize: int = Field(default=10_000)
+    llm_response_cache_path: str | None = Field(default=None)
+    llm_response_cache_disk_maxsize: int = Field(default=100_000)  # rows on disk
+    llm_response_cache_ttl: int = Field(default=604_800)  # unit: seconds
+
     # generation config
     allow_intent_classification: bool = Field(default=True)
     allow_sql_generation_reasoning: bool = Field(default=True)
@@ -45,11 +57,24 @@ class Settings(BaseSettings):
     max_histories: int = Field(default=5)
     max_sql_correction_retries: int = Field(default=3)
 
+    # answer cache config
+    enable_answer_cache: bool = Field(default=False)
+    answer_cache_similarity_threshold: float = Field(default=0.95)
+    answer_cache_max_entries: int = Field(default=1000)  # per project
+    answer_cache_ttl: int = Field(default=86400)  # unit: seconds
+
     # engine config
     engine_timeout: float = Field(default=30.0)
+    engine_connection_limit: int = Field(default=100)
+    engine_connection_limit_per_host: int = Field(default=0)  # 0 means no limit
+    engine_dns_cache_ttl: int = Field(default=300)  # unit: seconds
+    engine_keepalive_timeout: float = Field(default=30.0)  # unit: seconds
+    dry_run_cache_maxsize: int = Field(default=10_000)
+    dry_run_cache_ttl: int = Field(default=600)  # unit: seconds
 
     # service config
     query_cache_ttl: int = Field(default=3600)  # unit: seconds
+    schema_cache_ttl: int = Field(default=86400)  # unit: seconds
     query_cache_maxsize: int = Field(
         default=1_000_000,
         comment="""
@@ -69,6 +94,7 @@ class Settings(BaseSettings):
 
     # debug config
     logging_level: str = Field(default="INFO")
+    provider_stats_interval: int = Field(default=300)  # unit: seconds, 0 to disable
     development: bool = Field(default=False)
 
     # this is used to store the config like type: llm, embedder, etc. and we will process them later
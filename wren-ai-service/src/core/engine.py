@@ -1,11 +1,18 @@
+import asyncio
+import functools
+import hashlib
+import inspect
 import logging
 import re
 from abc import ABCMeta, abstractmethod
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, Hashable, Optional, Tuple
 
 import aiohttp
+from cachetools import TTLCache
 from pydantic import BaseModel
 
+from src.config import settings
+
 logger = logging.getLogger("wren-ai-service")
 
 
@@ -14,7 +21,133 @@ class EngineConfig(BaseModel):
     config: dict = {}
 
 
+def sql_fingerprint(sql: str) -> str:
+    """
+    Normalize the formatting of the sql, so the same query generated with different whitespace
+    or a trailing semicolon shares one fingerprint. The case is kept since it matters for literals.
+    """
+    return re.sub(r"\s+", " ", sql).strip().rstrip(";").strip()
+
+
+class DryRunCache:
+    """
+    Caches the results of validating sql against the engine, i.e. dry runs and dry plans.
+
+    The entries are scoped by the project or by the hash of the manifest the engine validates against,
+    and the entries of a project are invalidated whenever its semantics are prepared again.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: int = 600):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, key: Tuple[Hashable, ...]) -> Optional[Any]:
+        return self._cache.get(key)
+
+    def set(self, key: Tuple[Hashable, ...], value: Any):
+        self._cache[key] = value
+
+    def invalidate(self, project_id: Optional[str], mdl_hash: Optional[str] = None):
+        for key in [key for key in list(self._cache.keys()) if key[0] == project_id]:
+            self._cache.pop(key, None)
+
+
+def manifest_hash(manifest: Optional[str]) -> str:
+    return hashlib.sha256((manifest or "").encode()).hexdigest()
+
+
+def cache_dry_run(func):
+    """
+    Cache the results of an engine validation method, keyed by the sql fingerprint, the other arguments
+    of the call and the project, or the cache scope of the engine if the call has no project.
+
+    Only successful dry runs are cached. A failure cannot be told apart reliably from an engine or data source
+    failing on the way, e.g. a 5xx or a lost connection, and it must be validated again once they recover.
+    """
+    signature = inspect.signature(func)
+    ignored = {"self", "session", "timeout", "kwargs"}
+
+    @functools.wraps(func)
+    async def wrapper(self: "Engine", *args, **kwargs):
+        arguments = signature.bind(self, *args, **kwargs)
+        arguments.apply_defaults()
+        params = dict(arguments.arguments)
+        if not params.get("dry_run", True):
+            return await func(self, *args, **kwargs)
+
+        key = (
+            params.pop("project_id", None) or self.cache_scope,
+            func.__name__,
+            sql_fingerprint(params.pop("sql")),
+            *(
+                (name, value)
+                for name, value in sorted(params.items())
+                if name not in ignored
+            ),
+        )
+        if (result := self.dry_run_cache.get(key)) is not None:
+            return result
+
+        result = await func(self, *args, **kwargs)
+        if result[0]:
+            self.dry_run_cache.set(key, result)
+
+        return result
+
+    return wrapper
+
+
 class Engine(metaclass=ABCMeta):
+    _session: Optional[aiohttp.ClientSession] = None
+    _session_loop: Optional[asyncio.AbstractEventLoop] = None
+    _dry_run_cache: Optional[DryRunCache] = None
+
+    @property
+    def cache_scope(self) -> Hashable:
+        """
+        The scope of the cached dry runs when the call has no project, e.g. the hash of a fixed manifest.
+        """
+        return None
+
+    @property
+    def dry_run_cache(self) -> DryRunCache:
+        if self._dry_run_cache is None:
+            self._dry_run_cache = DryRunCache(
+                maxsize=settings.dry_run_cache_maxsize,
+                ttl=settings.dry_run_cache_ttl,
+            )
+
+        return self._dry_run_cache
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """
+        The pooled session shared by all the requests to the engine, connections are kept alive
+        between requests instead of being set up again for every dry run or query.
+        """
+        # sessions are bound to the event loop they are created in
+        loop = asyncio.get_running_loop()
+        if (
+            self._session is None
+            or self._session.closed
+            or self._session_loop is not loop
+        ):
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=settings.engine_connection_limit,
+                    limit_per_host=settings.engine_connection_limit_per_host,
+                    ttl_dns_cache=settings.engine_dns_cache_ttl,
+                    keepalive_timeout=settings.engine_keepalive_timeout,
+                ),
+            )
+            self._session_loop = loop
+
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
     @abstractmethod
     async def execute_sql(
         self,
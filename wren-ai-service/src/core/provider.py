@@ -1,7 +1,18 @@
+import functools
 from abc import ABCMeta, abstractmethod
+from contextvars import ContextVar
+from typing import Optional
 
 from haystack.document_stores.types import DocumentStore
 
+_embedding_scope: ContextVar[Optional[dict]] = ContextVar(
+    "embedding_scope", default=None
+)
+
+# the priority classes of the LLM requests, from the highest to the lowest
+LLM_PRIORITIES = ("interactive", "followup", "background")
+_llm_priority: ContextVar[str] = ContextVar("llm_priority", default="interactive")
+
 
 class LLMProvider(metaclass=ABCMeta):
     @abstractmethod
@@ -17,6 +28,13 @@ class LLMProvider(metaclass=ABCMeta):
     def get_context_window_size(self):
         return self._context_window_size
 
+    def with_response_cache(self) -> "LLMProvider":
+        """
+        Return the provider caching the responses of its generators, for the pipelines enabling it.
+        The providers without a response cache return themselves.
+        """
+        return self
+
 
 class EmbedderProvider(metaclass=ABCMeta):
     @abstractmethod
@@ -31,6 +49,59 @@ class EmbedderProvider(metaclass=ABCMeta):
         return self._embedding_model
 
 
+def get_embedding_scope() -> Optional[dict]:
+    """
+    Return the embeddings shared in the current scope, keyed by model and text, or None outside of a scope.
+    """
+    return _embedding_scope.get()
+
+
+def embedding_scope(func):
+    """
+    Share one embedding per text across all the text embedders called while `func` runs,
+    e.g. the retrieval pipelines of a single ask all embedding the same user question.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        token = _embedding_scope.set({})
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _embedding_scope.reset(token)
+
+    return wrapper
+
+
+def get_llm_priority() -> str:
+    """
+    Return the priority class of the LLM requests made in the current context, interactive by default.
+    """
+    return _llm_priority.get()
+
+
+def llm_priority(priority: str):
+    """
+    Send the LLM requests made while the decorated function runs with the priority class,
+    e.g. the background recommendations yield to the interactive asks when the LLM providers are saturated.
+    """
+    if priority not in LLM_PRIORITIES:
+        raise ValueError(f"Unknown LLM priority: {priority}")
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            token = _llm_priority.set(priority)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _llm_priority.reset(token)
+
+        return wrapper
+
+    return decorator
+
+
 class DocumentStoreProvider(metaclass=ABCMeta):
     @abstractmethod
     def get_store(self, *args, **kwargs) -> DocumentStore:
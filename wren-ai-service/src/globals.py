@@ -7,6 +7,7 @@ from src.config import Settings
 from src.core.pipeline import PipelineComponent
 from src.core.provider import EmbedderProvider, LLMProvider
 from src.pipelines import generation, indexing, retrieval
+from src.pipelines.common import ProjectCatalog
 from src.utils import fetch_wren_ai_docs
 from src.web.v1 import services
 
@@ -48,10 +49,46 @@ def create_service_container(
     if not wren_ai_docs:
         logger.warning("Failed to fetch Wren AI docs or response was empty.")
 
+    # schemas only change on re-deploy, the cache is invalidated by the semantics preparation service
+    _schema_cache = retrieval.SchemaCache(
+        maxsize=settings.query_cache_maxsize,
+        ttl=settings.schema_cache_ttl,
+    )
+    # the document counts, default instructions and metadata of a project only change when its documents are indexed,
+    # the catalog is invalidated by the services indexing them
+    _project_catalog = ProjectCatalog(
+        maxsize=settings.query_cache_maxsize,
+        ttl=settings.schema_cache_ttl,
+    )
+    # the validated sql of a project is re-validated after re-deploy
+    _dry_run_caches = [
+        engine.dry_run_cache
+        for engine in {
+            component.engine
+            for component in pipe_components.values()
+            if component.engine is not None
+        }
+    ]
+    # the answers are embedded with the embedder of the historical question retrieval,
+    # so the question of an ask is embedded only once for both lookups
+    _answer_cache = (
+        services.AnswerCache(
+            embedder=pipe_components[
+                "historical_question_retrieval"
+            ].embedder_provider.get_text_embedder(),
+            similarity_threshold=settings.answer_cache_similarity_threshold,
+            max_entries=settings.answer_cache_max_entries,
+            maxsize=settings.query_cache_maxsize,
+            ttl=settings.answer_cache_ttl,
+        )
+        if settings.enable_answer_cache
+        else None
+    )
     _db_schema_retrieval_pipeline = retrieval.DbSchemaRetrieval(
         **pipe_components["db_schema_retrieval"],
         table_retrieval_size=settings.table_retrieval_size,
         table_column_retrieval_size=settings.table_column_retrieval_size,
+        schema_cache=_schema_cache,
     )
     _sql_pair_indexing_pipeline = indexing.SqlPairs(
         **pipe_components["sql_pairs_indexing"],
@@ -64,17 +101,21 @@ def create_service_container(
         **pipe_components["sql_pairs_retrieval"],
         sql_pairs_similarity_threshold=settings.sql_pairs_similarity_threshold,
         sql_pairs_retrieval_max_size=settings.sql_pairs_retrieval_max_size,
+        project_catalog=_project_catalog,
     )
     _instructions_retrieval_pipeline = retrieval.Instructions(
         **pipe_components["instructions_retrieval"],
         similarity_threshold=settings.instructions_similarity_threshold,
         top_k=settings.instructions_top_k,
+        project_catalog=_project_catalog,
     )
     _sql_correction_pipeline = generation.SQLCorrection(
         **pipe_components["sql_correction"],
+        project_catalog=_project_catalog,
     )
     _sql_functions_retrieval_pipeline = retrieval.SqlFunctions(
         **pipe_components["sql_functions_retrieval"],
+        project_catalog=_project_catalog,
     )
     _sql_executor_pipeline = retrieval.SQLExecutor(
         **pipe_components["sql_executor"],
@@ -110,6 +151,12 @@ def create_service_container(
                     **pipe_components["project_meta_indexing"],
                 ),
             },
+            caches=[
+                _schema_cache,
+                _project_catalog,
+                *_dry_run_caches,
+                *([_answer_cache] if _answer_cache else []),
+            ],
             **query_cache,
         ),
         ask_service=services.AskService(
@@ -132,11 +179,13 @@ def create_service_container(
                 "historical_question": retrieval.HistoricalQuestionRetrieval(
                     **pipe_components["historical_question_retrieval"],
                     historical_question_retrieval_similarity_threshold=settings.historical_question_retrieval_similarity_threshold,
+                    project_catalog=_project_catalog,
                 ),
                 "sql_pairs_retrieval": _sql_pair_retrieval_pipeline,
                 "instructions_retrieval": _instructions_retrieval_pipeline,
                 "sql_generation": generation.SQLGeneration(
                     **pipe_components["sql_generation"],
+                    project_catalog=_project_catalog,
                 ),
                 "sql_generation_reasoning": generation.SQLGenerationReasoning(
                     **pipe_components["sql_generation_reasoning"],
@@ -147,11 +196,13 @@ def create_service_container(
                 "sql_correction": _sql_correction_pipeline,
                 "followup_sql_generation": generation.FollowUpSQLGeneration(
                     **pipe_components["followup_sql_generation"],
+                    project_catalog=_project_catalog,
                 ),
                 "sql_functions_retrieval": _sql_functions_retrieval_pipeline,
                 "sql_diagnosis": _sql_diagnosis_pipeline,
                 "sql_knowledge_retrieval": retrieval.SqlKnowledges(
                     **pipe_components["sql_knowledge_retrieval"],
+                    project_catalog=_project_catalog,
                 ),
             },
             allow_intent_classification=settings.allow_intent_classification,
@@ -162,6 +213,7 @@ def create_service_container(
             max_histories=settings.max_histories,
             enable_column_pruning=settings.enable_column_pruning,
             max_sql_correction_retries=settings.max_sql_correction_retries,
+            answer_cache=_answer_cache,
             **query_cache,
         ),
         ask_feedback_service=services.AskFeedbackService(
@@ -177,6 +229,7 @@ def create_service_container(
                 "sql_diagnosis": _sql_diagnosis_pipeline,
                 "sql_knowledge_retrieval": retrieval.SqlKnowledges(
                     **pipe_components["sql_knowledge_retrieval"],
+                    project_catalog=_project_catalog,
                 ),
             },
             allow_sql_functions_retrieval=settings.allow_sql_functions_retrieval,
@@ -229,12 +282,14 @@ def create_service_container(
                 "db_schema_retrieval": _db_schema_retrieval_pipeline,
                 "sql_generation": generation.SQLGeneration(
                     **pipe_components["question_recommendation_sql_generation"],
+                    project_catalog=_project_catalog,
                 ),
                 "sql_pairs_retrieval": _sql_pair_retrieval_pipeline,
                 "instructions_retrieval": _instructions_retrieval_pipeline,
                 "sql_functions_retrieval": _sql_functions_retrieval_pipeline,
                 "sql_knowledge_retrieval": retrieval.SqlKnowledges(
                     **pipe_components["sql_knowledge_retrieval"],
+                    project_catalog=_project_catalog,
                 ),
             },
             allow_sql_functions_retrieval=settings.allow_sql_functions_retrieval,
@@ -245,6 +300,7 @@ def create_service_container(
             pipelines={
                 "sql_pairs": _sql_pair_indexing_pipeline,
             },
+            caches=[_project_catalog, *([_answer_cache] if _answer_cache else [])],
             **query_cache,
         ),
         sql_question_service=services.SqlQuestionService(
@@ -259,6 +315,7 @@ def create_service_container(
             pipelines={
                 "instructions_indexing": _instructions_indexing_pipeline,
             },
+            caches=[_project_catalog, *([_answer_cache] if _answer_cache else [])],
             **query_cache,
         ),
         sql_correction_service=services.SqlCorrectionService(
@@ -270,6 +327,7 @@ def create_service_container(
                 "sql_correction": _sql_correction_pipeline,
                 "sql_knowledge_retrieval": retrieval.SqlKnowledges(
                     **pipe_components["sql_knowledge_retrieval"],
+                    project_catalog=_project_catalog,
                 ),
             },
             allow_sql_knowledge_retrieval=settings.allow_sql_knowledge_retrieval,
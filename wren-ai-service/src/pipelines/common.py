@@ -1,7 +1,13 @@
+import ast
 import re
-from typing import Any, List, Optional, Tuple
+import zlib
+from collections import Counter
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
 
+import orjson
+from cachetools import TTLCache
 from haystack import Document, component
+from haystack.dataclasses import SparseEmbedding
 
 
 def get_engine_supported_data_type(data_type: str) -> str:
@@ -27,6 +33,25 @@ def get_engine_supported_data_type(data_type: str) -> str:
             return data_type.upper()
 
 
+def parse_document_content(document: Document) -> dict:
+    """
+    Parse the structured content of TABLE_SCHEMA and TABLE_DESCRIPTION documents.
+
+    The content is written as JSON. Documents indexed by older versions were written as python literals,
+    they are still accepted until the project is deployed again and the documents are re-indexed.
+    The parsed content is cached on the document and shared by all the steps reading it, so callers must not mutate it.
+    """
+    parsed = getattr(document, "_parsed_content", None)
+    if parsed is None:
+        try:
+            parsed = orjson.loads(document.content)
+        except orjson.JSONDecodeError:
+            parsed = ast.literal_eval(document.content)
+        document._parsed_content = parsed
+
+    return parsed
+
+
 def build_table_ddl(
     content: dict, columns: Optional[set[str]] = None, tables: Optional[set[str]] = None
 ) -> Tuple[str, bool, bool]:
@@ -64,7 +89,62 @@ def build_table_ddl(
     )
 
 
-async def retrieve_metadata(project_id: str, retriever) -> dict[str, Any]:
+class ProjectCatalog:
+    """
+    Per-project catalog of what the pipelines look up in the document store before searching,
+    e.g. the document counts, the default instructions and the project metadata.
+
+    They only change when the documents of a project are indexed or cleaned, so the catalog is
+    invalidated by the services indexing them, and refilled on the next lookup. The TTL is only a safeguard.
+    """
+
+    def __init__(self, maxsize: int = 1_000, ttl: int = 86_400):
+        self._projects: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(
+        self, project_id: Optional[str], key: str, fetch: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Return the value of the project under the key, fetching it on a miss.
+        """
+        project_id = project_id or ""
+        if (entry := self._projects.get(project_id)) is None:
+            entry = self._projects[project_id] = {}
+
+        if key not in entry:
+            # a fetch still running when the project is invalidated writes to the dropped entry
+            entry[key] = await fetch()
+
+        return entry[key]
+
+    def invalidate(self, project_id: Optional[str], mdl_hash: Optional[str] = None):
+        self._projects.pop(project_id or "", None)
+
+
+async def from_catalog(
+    catalog: Optional[ProjectCatalog],
+    project_id: Optional[str],
+    key: str,
+    fetch: Callable[[], Awaitable[Any]],
+) -> Any:
+    if catalog is None:
+        return await fetch()
+
+    return await catalog.get(project_id, key, fetch)
+
+
+async def retrieve_metadata(
+    project_id: str, retriever, catalog: Optional[ProjectCatalog] = None
+) -> dict[str, Any]:
+    return await from_catalog(
+        catalog,
+        project_id,
+        "metadata",
+        lambda: _retrieve_metadata(project_id, retriever),
+    )
+
+
+async def _retrieve_metadata(project_id: str, retriever) -> dict[str, Any]:
     filters = None
     if project_id:
         filters = {
@@ -105,6 +185,71 @@ class ScoreFilter:
         }
 
 
+IDENTIFIER_TOKEN_REGEX = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+IDENTIFIER_REGEX = re.compile(r"\w+")
+
+
+class SparseEncoder:
+    """
+    In-process BM25 encoder of the table and column names, for the hybrid retrieval of the tables.
+
+    The identifiers are split into lowercased words, e.g. "orderItems" and "order_items" into "order" and "items",
+    and the words are hashed into the token ids, so no vocabulary has to be shared between the indexing and the queries.
+    The documents are weighted with the BM25 term frequency, the IDF is computed by Qdrant (sparse_idf)
+    and the query tokens are weighted 1.0, so the dot product of the vectors is the BM25 score.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, avg_length: float = 32):
+        self._k1 = k1
+        self._b = b
+        self._avg_length = avg_length
+
+    def tokenize(self, text: str) -> list[str]:
+        tokens = []
+        for identifier in IDENTIFIER_REGEX.findall(text):
+            words = [
+                word.lower() for word in IDENTIFIER_TOKEN_REGEX.findall(identifier)
+            ]
+            tokens.extend(_stem(word) for word in words)
+            # the whole identifier also matches, e.g. "order_items"
+            if len(words) > 1:
+                tokens.append(identifier.lower())
+
+        return tokens
+
+    def encode_document(self, text: str) -> SparseEmbedding:
+        frequencies = Counter(self.tokenize(text))
+        length = sum(frequencies.values())
+        norm = self._k1 * (1 - self._b + self._b * length / self._avg_length)
+
+        return _sparse_embedding(
+            {
+                token: frequency * (self._k1 + 1) / (frequency + norm)
+                for token, frequency in frequencies.items()
+            }
+        )
+
+    def encode_query(self, text: str) -> SparseEmbedding:
+        return _sparse_embedding(dict.fromkeys(self.tokenize(text), 1.0))
+
+
+def _stem(word: str) -> str:
+    # a naive plural stemming, e.g. "customers" and "customer"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+
+    return word
+
+
+def _sparse_embedding(weights: dict[str, float]) -> SparseEmbedding:
+    values: dict[int, float] = {}
+    for token, weight in weights.items():
+        index = zlib.crc32(token.encode())
+        values[index] = values.get(index, 0.0) + weight
+
+    return SparseEmbedding(indices=list(values.keys()), values=list(values.values()))
+
+
 MULTIPLE_NEW_LINE_REGEX = re.compile(r"\n{3,}")
 
 
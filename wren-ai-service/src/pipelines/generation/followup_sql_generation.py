@@ -1,6 +1,6 @@
 import logging
 import sys
-from typing import Any
+from typing import Any, Optional
 
 from hamilton import base
 from hamilton.async_driver import AsyncDriver
@@ -10,7 +10,7 @@ from langfuse.decorators import observe
 from src.core.engine import Engine
 from src.core.pipeline import BasicPipeline
 from src.core.provider import DocumentStoreProvider, LLMProvider
-from src.pipelines.common import clean_up_new_lines, retrieve_metadata
+from src.pipelines.common import ProjectCatalog, clean_up_new_lines, retrieve_metadata
 from src.pipelines.generation.utils.sql import (
     SQL_GENERATION_MODEL_KWARGS,
     SQLGenPostProcessor,
@@ -119,11 +119,13 @@ class FollowUpSQLGeneration(BasicPipeline):
         llm_provider: LLMProvider,
         document_store_provider: DocumentStoreProvider,
         engine: Engine,
+        project_catalog: Optional[ProjectCatalog] = None,
         **kwargs,
     ):
         self._retriever = document_store_provider.get_retriever(
             document_store_provider.get_store("project_meta")
         )
+        self._project_catalog = project_catalog
 
         self._components = {
             "generator": llm_provider.get_generator(
@@ -162,7 +164,9 @@ class FollowUpSQLGeneration(BasicPipeline):
         logger.info("Follow-Up SQL Generation pipeline is running...")
 
         if use_dry_plan:
-            metadata = await retrieve_metadata(project_id or "", self._retriever)
+            metadata = await retrieve_metadata(
+                project_id or "", self._retriever, self._project_catalog
+            )
         else:
             metadata = {}
 
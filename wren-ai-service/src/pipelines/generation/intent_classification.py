@@ -1,4 +1,3 @@
-import ast
 import logging
 import sys
 from typing import Any, Literal, Optional
@@ -13,7 +12,12 @@ from pydantic import BaseModel
 
 from src.core.pipeline import BasicPipeline
 from src.core.provider import DocumentStoreProvider, EmbedderProvider, LLMProvider
-from src.pipelines.common import build_table_ddl, clean_up_new_lines
+from src.pipelines.common import (
+    SparseEncoder,
+    build_table_ddl,
+    clean_up_new_lines,
+    parse_document_content,
+)
 from src.pipelines.generation.utils.sql import construct_instructions
 from src.templates import load_template
 from src.utils import trace_cost
@@ -46,7 +50,11 @@ async def embedding(query: str, embedder: Any, histories: list[AskHistory]) -> d
 
 @observe(capture_input=False)
 async def table_retrieval(
-    embedding: dict, project_id: str, table_retriever: Any
+    embedding: dict,
+    query: str,
+    project_id: str,
+    table_retriever: Any,
+    sparse_encoder: SparseEncoder,
 ) -> dict:
     filters = {
         "operator": "AND",
@@ -62,6 +70,7 @@ async def table_retrieval(
 
     return await table_retriever.run(
         query_embedding=embedding.get("embedding"),
+        query_sparse_embedding=sparse_encoder.encode_query(query),
         filters=filters,
     )
 
@@ -73,21 +82,16 @@ async def dbschema_retrieval(
     tables = table_retrieval.get("documents", [])
     table_names = []
     for table in tables:
-        content = ast.literal_eval(table.content)
+        content = parse_document_content(table)
         table_names.append(content["name"])
 
     logger.info(f"dbschema_retrieval with table_names: {table_names}")
 
-    table_name_conditions = [
-        {"field": "name", "operator": "==", "value": table_name}
-        for table_name in table_names
-    ]
-
     filters = {
         "operator": "AND",
         "conditions": [
             {"field": "type", "operator": "==", "value": "TABLE_SCHEMA"},
-            {"operator": "OR", "conditions": table_name_conditions},
+            {"field": "name", "operator": "in", "value": table_names},
         ],
     }
 
@@ -96,8 +100,13 @@ async def dbschema_retrieval(
             {"field": "project_id", "operator": "==", "value": project_id}
         )
 
+    if not table_names:
+        return []
+
     results = await dbschema_retriever.run(
-        query_embedding=embedding.get("embedding"), filters=filters
+        query_embedding=embedding.get("embedding"),
+        filters=filters,
+        top_k=len(table_names),
     )
     return results["documents"]
 
@@ -106,10 +115,10 @@ async def dbschema_retrieval(
 def construct_db_schemas(dbschema_retrieval: list[Document]) -> list[str]:
     db_schemas = {}
     for document in dbschema_retrieval:
-        content = ast.literal_eval(document.content)
+        content = parse_document_content(document)
         if content["type"] == "TABLE":
             if document.meta["name"] not in db_schemas:
-                db_schemas[document.meta["name"]] = content
+                db_schemas[document.meta["name"]] = {**content}
             else:
                 db_schemas[document.meta["name"]] = {
                     **content,
@@ -117,10 +126,14 @@ def construct_db_schemas(dbschema_retrieval: list[Document]) -> list[str]:
                 }
         elif content["type"] == "TABLE_COLUMNS":
             if document.meta["name"] not in db_schemas:
-                db_schemas[document.meta["name"]] = {"columns": content["columns"]}
+                db_schemas[document.meta["name"]] = {
+                    "columns": list(content["columns"])
+                }
             else:
                 if "columns" not in db_schemas[document.meta["name"]]:
-                    db_schemas[document.meta["name"]]["columns"] = content["columns"]
+                    db_schemas[document.meta["name"]]["columns"] = list(
+                        content["columns"]
+                    )
                 else:
                     db_schemas[document.meta["name"]]["columns"] += content["columns"]
 
@@ -222,10 +235,15 @@ class IntentClassification(BasicPipeline):
             "table_retriever": document_store_provider.get_retriever(
                 document_store_provider.get_store(dataset_name="table_descriptions"),
                 top_k=table_retrieval_size,
+                payload_fields=["content"],
             ),
+            "sparse_encoder": SparseEncoder(),
             "dbschema_retriever": document_store_provider.get_retriever(
                 document_store_provider.get_store(),
-                top_k=table_column_retrieval_size,
+                payload_fields=["content", "name"],
+                # all the chunks of the retrieved tables, up to table_column_retrieval_size chunks per table
+                group_by="name",
+                group_size=table_column_retrieval_size,
             ),
             "generator": llm_provider.get_generator(
                 system_prompt=intent_classification_system_prompt,
@@ -1,7 +1,6 @@
 import logging
 from typing import Any, Dict, List
 
-import aiohttp
 import orjson
 from haystack import component
 from haystack.dataclasses import ChatMessage
@@ -83,85 +82,84 @@ class SQLGenPostProcessor:
         invalid_generation_result = {}
         use_dry_run = not allow_data_preview
 
-        async with aiohttp.ClientSession() as session:
-            if use_dry_plan:
-                dry_plan_result, error_message = await self._engine.dry_plan(
-                    session,
-                    generation_result,
-                    data_source,
-                    allow_fallback=allow_dry_plan_fallback,
-                )
+        if use_dry_plan:
+            dry_plan_result, error_message = await self._engine.dry_plan(
+                self._engine.session,
+                generation_result,
+                data_source,
+                allow_fallback=allow_dry_plan_fallback,
+            )
 
-                if dry_plan_result:
-                    valid_generation_result = {
-                        "sql": raw_generation_result or generation_result,
-                        "correlation_id": "",
-                    }
-                else:
-                    invalid_generation_result = {
-                        "sql": raw_generation_result or generation_result,
-                        "type": "TIME_OUT"
-                        if error_message.startswith("Request timed out")
-                        else "DRY_PLAN",
-                        "error": error_message,
-                        "correlation_id": "",
-                    }
-            elif use_dry_run:
-                success, _, addition = await self._engine.execute_sql(
-                    generation_result,
-                    session,
-                    project_id=project_id,
-                    limit=1,
-                    dry_run=True,
-                )
+            if dry_plan_result:
+                valid_generation_result = {
+                    "sql": raw_generation_result or generation_result,
+                    "correlation_id": "",
+                }
+            else:
+                invalid_generation_result = {
+                    "sql": raw_generation_result or generation_result,
+                    "type": "TIME_OUT"
+                    if error_message.startswith("Request timed out")
+                    else "DRY_PLAN",
+                    "error": error_message,
+                    "correlation_id": "",
+                }
+        elif use_dry_run:
+            success, _, addition = await self._engine.execute_sql(
+                generation_result,
+                self._engine.session,
+                project_id=project_id,
+                limit=1,
+                dry_run=True,
+            )
 
-                if success:
-                    valid_generation_result = {
-                        "sql": raw_generation_result or generation_result,
-                        "correlation_id": addition.get("correlation_id", ""),
-                    }
-                else:
-                    error_message = addition.get("error_message", "")
-                    invalid_generation_result = {
-                        "sql": raw_generation_result or generation_result,
-                        "original_sql": raw_generation_result or generation_result,
-                        "type": "TIME_OUT"
-                        if error_message.startswith("Request timed out")
-                        else "DRY_RUN",
-                        "error": error_message,
-                        "correlation_id": addition.get("correlation_id", ""),
-                        "engine_sql": addition.get("error_sql"),
-                    }
+            if success:
+                valid_generation_result = {
+                    "sql": raw_generation_result or generation_result,
+                    "correlation_id": addition.get("correlation_id", ""),
+                }
             else:
-                has_data, _, addition = await self._engine.execute_sql(
-                    generation_result,
-                    session,
-                    project_id=project_id,
-                    limit=1,
-                    dry_run=False,
-                )
+                error_message = addition.get("error_message", "")
+                invalid_generation_result = {
+                    "sql": raw_generation_result or generation_result,
+                    "original_sql": raw_generation_result or generation_result,
+                    "type": "TIME_OUT"
+                    if error_message.startswith("Request timed out")
+                    else "DRY_RUN",
+                    "error": error_message,
+                    "correlation_id": addition.get("correlation_id", ""),
+                    "engine_sql": addition.get("error_sql"),
+                }
+        else:
+            has_data, _, addition = await self._engine.execute_sql(
+                generation_result,
+                self._engine.session,
+                project_id=project_id,
+                limit=1,
+                dry_run=False,
+            )
 
-                if has_data:
-                    valid_generation_result = {
-                        "sql": raw_generation_result or generation_result,
-                        "correlation_id": addition.get("correlation_id", ""),
-                    }
-                else:
-                    error_message = addition.get("error_message", "")
-                    preview_data_status = (
-                        "PREVIEW_EMPTY_DATA"
-                        if error_message == ""
-                        else "PREVIEW_FAILED"
-                    )
-                    invalid_generation_result = {
-                        "sql": raw_generation_result or addition.get("error_sql", generation_result),
-                        "original_sql": raw_generation_result or generation_result,
-                        "type": "TIME_OUT"
-                        if error_message.startswith("Request timed out")
-                        else preview_data_status,
-                        "error": error_message,
-                        "correlation_id": addition.get("correlation_id", ""),
-                    }
+            if has_data:
+                valid_generation_result = {
+                    "sql": raw_generation_result or generation_result,
+                    "correlation_id": addition.get("correlation_id", ""),
+                }
+            else:
+                error_message = addition.get("error_message", "")
+                preview_data_status = (
+                    "PREVIEW_EMPTY_DATA"
+                    if error_message == ""
+                    else "PREVIEW_FAILED"
+                )
+                invalid_generation_result = {
+                    "sql": raw_generation_result or addition.get("error_sql", generation_result),
+                    "original_sql": raw_generation_result or generation_result,
+                    "type": "TIME_OUT"
+                    if error_message.startswith("Request timed out")
+                    else preview_data_status,
+                    "error": error_message,
+                    "correlation_id": addition.get("correlation_id", ""),
+                }
 
         return valid_generation_result, invalid_generation_result
 
@@ -1,7 +1,9 @@
 import asyncio
+import hashlib
 import json
 import logging
 import re
+import uuid
 from typing import Any, Dict, List, Optional
 
 import orjson
@@ -12,18 +14,52 @@ from haystack.document_stores.types import DocumentStore, DuplicatePolicy
 logger = logging.getLogger("wren-ai-service")
 
 
+def _project_filters(project_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    return (
+        {
+            "operator": "AND",
+            "conditions": [
+                {"field": "project_id", "operator": "==", "value": project_id},
+            ],
+        }
+        if project_id
+        else None
+    )
+
+
+def build_document_id(content: Optional[str], meta: Dict[str, Any]) -> str:
+    """
+    Build a deterministic document id from the content and meta of a chunk.
+
+    Chunks with the same content and meta (including the project id) always get the same id,
+    so comparing ids between the new chunks and the indexed ones tells what has changed.
+    """
+    digest = hashlib.sha256(
+        orjson.dumps(
+            {"content": content, "meta": meta},
+            option=orjson.OPT_SORT_KEYS,
+        )
+    ).hexdigest()
+    return str(uuid.UUID(digest[:32]))
+
+
 @component
 class DocumentCleaner:
     """
     This component is used to clear all the documents in the specified document store(s).
 
+    If `document_ids` is provided, only the documents with these ids will be removed.
     """
 
     def __init__(self, stores: List[DocumentStore]) -> None:
         self._stores = stores
 
     @component.output_types()
-    async def run(self, project_id: Optional[str] = None) -> None:
+    async def run(
+        self,
+        project_id: Optional[str] = None,
+        document_ids: Optional[List[str]] = None,
+    ) -> None:
         async def _clear_documents(
             store: DocumentStore, project_id: Optional[str] = None
         ) -> None:
@@ -31,23 +67,59 @@ class DocumentCleaner:
                 store.to_dict().get("init_parameters", {}).get("index", "unknown")
             )
             logger.info(f"Project ID: {project_id}, Cleaning documents in {store_name}")
-            filters = (
-                {
-                    "operator": "AND",
-                    "conditions": [
-                        {"field": "project_id", "operator": "==", "value": project_id},
-                    ],
-                }
-                if project_id
-                else None
-            )
+            filters = _project_filters(project_id)
+
+            if document_ids is not None:
+                filters = filters or {"operator": "AND", "conditions": []}
+                filters["conditions"].append(
+                    {"field": "id", "operator": "in", "value": document_ids}
+                )
+
             await store.delete_documents(filters)
 
+        if document_ids is not None and not document_ids:
+            return
+
         await asyncio.gather(
             *[_clear_documents(store, project_id) for store in self._stores]
         )
 
 
+@component
+class DocumentDiffer:
+    """
+    Compare the chunked documents against the documents already indexed for the project.
+
+    Document ids are derived from the content of the chunks (see `build_document_id`), so:
+    - documents whose ids are not indexed yet are new or changed, and need to be embedded and written
+    - indexed ids that are not in the chunked documents anymore are stale, and need to be removed
+    - the rest are unchanged, and are left untouched in the document store
+    """
+
+    def __init__(self, store: DocumentStore) -> None:
+        self._store = store
+
+    @component.output_types(documents=List[Document], stale_ids=List[str])
+    async def run(
+        self, documents: List[Document], project_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        indexed_ids = set(
+            await self._store.get_document_ids(filters=_project_filters(project_id))
+        )
+        current_ids = {document.id for document in documents}
+
+        changed = [document for document in documents if document.id not in indexed_ids]
+        stale_ids = list(indexed_ids - current_ids)
+
+        logger.info(
+            f"Project ID: {project_id}, {len(changed)} documents changed, "
+            f"{len(stale_ids)} documents stale, "
+            f"{len(current_ids) - len(changed)} documents unchanged"
+        )
+
+        return {"documents": changed, "stale_ids": stale_ids}
+
+
 @component
 class MDLValidator:
     """
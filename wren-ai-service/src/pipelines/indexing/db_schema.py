@@ -1,9 +1,9 @@
 import asyncio
 import logging
 import sys
-import uuid
 from typing import Any, Dict, List, Optional
 
+import orjson
 from hamilton import base
 from hamilton.async_driver import AsyncDriver
 from hamilton.function_modifiers import extract_fields
@@ -18,7 +18,9 @@ from src.core.provider import DocumentStoreProvider, EmbedderProvider
 from src.pipelines.indexing import (
     AsyncDocumentWriter,
     DocumentCleaner,
+    DocumentDiffer,
     MDLValidator,
+    build_document_id,
     clean_display_name,
 )
 from src.pipelines.indexing.utils import helper
@@ -40,13 +42,12 @@ class DDLChunker:
 
         chunks = [
             {
-                "id": str(uuid.uuid4()),
                 "meta": {
                     "type": "TABLE_SCHEMA",
                     "name": chunk["name"],
                     **_additional_meta(),
                 },
-                "content": chunk["payload"],
+                "content": orjson.dumps(chunk["payload"]).decode(),
             }
             for chunk in await self._get_ddl_commands(
                 **mdl, column_batch_size=column_batch_size
@@ -55,7 +56,7 @@ class DDLChunker:
 
         return {
             "documents": [
-                Document(**chunk)
+                Document(id=build_document_id(**chunk), **chunk)
                 for chunk in tqdm(
                     chunks,
                     desc=f"Project ID: {project_id}, Chunking DDL commands into documents",
@@ -128,7 +129,7 @@ class DDLChunker:
         models: List[Dict[str, Any]],
         relationships: List[Dict[str, Any]],
         column_batch_size: int,
-    ) -> List[Dict[str, str]]:
+    ) -> List[Dict[str, Any]]:
         def _model_command(model: Dict[str, Any]) -> dict:
             properties = model.get("properties", {})
 
@@ -144,7 +145,7 @@ class DDLChunker:
                 "comment": comment,
                 "name": table_name,
             }
-            return {"name": table_name, "payload": str(payload)}
+            return {"name": table_name, "payload": payload}
 
         def _column_command(column: Dict[str, Any], model: Dict[str, Any]) -> dict:
             if column.get("relationship"):
@@ -213,12 +214,10 @@ class DDLChunker:
             return [
                 {
                     "name": model["name"],
-                    "payload": str(
-                        {
-                            "type": "TABLE_COLUMNS",
-                            "columns": filtered[i : i + column_batch_size],
-                        }
-                    ),
+                    "payload": {
+                        "type": "TABLE_COLUMNS",
+                        "columns": filtered[i : i + column_batch_size],
+                    },
                 }
                 for i in range(0, len(filtered), column_batch_size)
             ]
@@ -233,7 +232,7 @@ class DDLChunker:
             + [_model_command(model)]
         ]
 
-    def _convert_views(self, views: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    def _convert_views(self, views: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         def _payload(view: Dict[str, Any]) -> dict:
             return {
                 "type": "VIEW",
@@ -244,11 +243,9 @@ class DDLChunker:
                 "statement": view["statement"],
             }
 
-        return [
-            {"name": view["name"], "payload": str(_payload(view))} for view in views
-        ]
+        return [{"name": view["name"], "payload": _payload(view)} for view in views]
 
-    def _convert_metrics(self, metrics: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    def _convert_metrics(self, metrics: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         def _create_column(name: str, data_type: str, comment: str) -> dict:
             return {
                 "type": "COLUMN",
@@ -286,8 +283,7 @@ class DDLChunker:
             }
 
         return [
-            {"name": metric["name"], "payload": str(_payload(metric))}
-            for metric in metrics
+            {"name": metric["name"], "payload": _payload(metric)} for metric in metrics
         ]
 
 
@@ -313,18 +309,28 @@ async def chunk(
     )
 
 
+@observe(capture_input=False)
+async def diff(
+    chunk: Dict[str, Any],
+    differ: DocumentDiffer,
+    project_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    return await differ.run(documents=chunk["documents"], project_id=project_id)
+
+
 @observe(capture_input=False, capture_output=False)
-async def embedding(chunk: Dict[str, Any], embedder: Any) -> Dict[str, Any]:
-    return await embedder.run(documents=chunk["documents"])
+async def embedding(diff: Dict[str, Any], embedder: Any) -> Dict[str, Any]:
+    return await embedder.run(documents=diff["documents"])
 
 
 @observe(capture_input=False, capture_output=False)
 async def clean(
     embedding: Dict[str, Any],
+    diff: Dict[str, Any],
     cleaner: DocumentCleaner,
     project_id: Optional[str] = None,
 ) -> Dict[str, Any]:
-    await cleaner.run(project_id=project_id)
+    await cleaner.run(project_id=project_id, document_ids=diff["stale_ids"])
     return embedding
 
 
@@ -348,6 +354,7 @@ class DBSchema(BasicPipeline):
 
         self._components = {
             "cleaner": DocumentCleaner([dbschema_store]),
+            "differ": DocumentDiffer(dbschema_store),
             "validator": MDLValidator(),
             "embedder": embedder_provider.get_document_embedder(),
             "chunker": DDLChunker(),
@@ -385,8 +392,4 @@ class DBSchema(BasicPipeline):
 
     @observe(name="Clean Documents for DB Schema")
     async def clean(self, project_id: Optional[str] = None) -> None:
-        await clean(
-            embedding={"documents": []},
-            cleaner=self._components["cleaner"],
-            project_id=project_id,
-        )
+        await self._components["cleaner"].run(project_id=project_id)
@@ -1,6 +1,5 @@
 import logging
 import sys
-import uuid
 from typing import Any, Dict, List, Optional
 
 from hamilton import base
@@ -14,7 +13,13 @@ from tqdm import tqdm
 
 from src.core.pipeline import BasicPipeline
 from src.core.provider import DocumentStoreProvider, EmbedderProvider
-from src.pipelines.indexing import AsyncDocumentWriter, DocumentCleaner, MDLValidator
+from src.pipelines.indexing import (
+    AsyncDocumentWriter,
+    DocumentCleaner,
+    DocumentDiffer,
+    MDLValidator,
+    build_document_id,
+)
 
 logger = logging.getLogger("wren-ai-service")
 
@@ -74,7 +79,6 @@ class ViewChunker:
 
         chunks = [
             {
-                "id": str(uuid.uuid4()),
                 "content": _get_content(view),
                 "meta": {**_get_meta(view), **_additional_meta()},
             }
@@ -83,7 +87,7 @@ class ViewChunker:
 
         return {
             "documents": [
-                Document(**chunk)
+                Document(id=build_document_id(**chunk), **chunk)
                 for chunk in tqdm(
                     chunks,
                     desc=f"Project ID: {project_id}, Chunking views into documents",
@@ -109,18 +113,28 @@ def chunk(
     return chunker.run(mdl=mdl, project_id=project_id)
 
 
+@observe(capture_input=False)
+async def diff(
+    chunk: Dict[str, Any],
+    differ: DocumentDiffer,
+    project_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    return await differ.run(documents=chunk["documents"], project_id=project_id)
+
+
 @observe(capture_input=False, capture_output=False)
-async def embedding(chunk: Dict[str, Any], embedder: Any) -> Dict[str, Any]:
-    return await embedder.run(documents=chunk["documents"])
+async def embedding(diff: Dict[str, Any], embedder: Any) -> Dict[str, Any]:
+    return await embedder.run(documents=diff["documents"])
 
 
 @observe(capture_input=False, capture_output=False)
 async def clean(
     embedding: Dict[str, Any],
+    diff: Dict[str, Any],
     cleaner: DocumentCleaner,
     project_id: Optional[str] = None,
 ) -> Dict[str, Any]:
-    await cleaner.run(project_id=project_id)
+    await cleaner.run(project_id=project_id, document_ids=diff["stale_ids"])
     return embedding
 
 
@@ -144,6 +158,7 @@ class HistoricalQuestion(BasicPipeline):
 
         self._components = {
             "cleaner": DocumentCleaner([store]),
+            "differ": DocumentDiffer(store),
             "validator": MDLValidator(),
             "embedder": embedder_provider.get_document_embedder(),
             "chunker": ViewChunker(),
@@ -178,8 +193,4 @@ class HistoricalQuestion(BasicPipeline):
 
     @observe(name="Clean Documents for Historical Question")
     async def clean(self, project_id: Optional[str] = None) -> None:
-        await clean(
-            embedding={"documents": []},
-            cleaner=self._components["cleaner"],
-            project_id=project_id,
-        )
+        await self._components["cleaner"].run(project_id=project_id)
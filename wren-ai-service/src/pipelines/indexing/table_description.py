@@ -1,8 +1,8 @@
 import logging
 import sys
-import uuid
 from typing import Any, Dict, List, Optional
 
+import orjson
 from hamilton import base
 from hamilton.async_driver import AsyncDriver
 from hamilton.function_modifiers import extract_fields
@@ -14,7 +14,14 @@ from tqdm import tqdm
 
 from src.core.pipeline import BasicPipeline
 from src.core.provider import DocumentStoreProvider, EmbedderProvider
-from src.pipelines.indexing import AsyncDocumentWriter, DocumentCleaner, MDLValidator
+from src.pipelines.common import SparseEncoder
+from src.pipelines.indexing import (
+    AsyncDocumentWriter,
+    DocumentCleaner,
+    DocumentDiffer,
+    MDLValidator,
+    build_document_id,
+)
 
 logger = logging.getLogger("wren-ai-service")
 
@@ -28,20 +35,19 @@ class TableDescriptionChunker:
 
         chunks = [
             {
-                "id": str(uuid.uuid4()),
                 "meta": {
                     "type": "TABLE_DESCRIPTION",
                     "name": chunk["name"],
                     **_additional_meta(),
                 },
-                "content": str(chunk),
+                "content": orjson.dumps(chunk).decode(),
             }
             for chunk in self._get_table_descriptions(mdl)
         ]
 
         return {
             "documents": [
-                Document(**chunk)
+                Document(id=build_document_id(**chunk), **chunk)
                 for chunk in tqdm(
                     chunks,
                     desc=f"Project ID: {project_id}, Chunking table descriptions into documents",
@@ -92,19 +98,42 @@ def chunk(
     return chunker.run(mdl=mdl, project_id=project_id)
 
 
+@observe(capture_input=False)
+async def diff(
+    chunk: Dict[str, Any],
+    differ: DocumentDiffer,
+    project_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    return await differ.run(documents=chunk["documents"], project_id=project_id)
+
+
+@observe(capture_input=False, capture_output=False)
+async def embedding(diff: Dict[str, Any], embedder: Any) -> Dict[str, Any]:
+    return await embedder.run(documents=diff["documents"])
+
+
 @observe(capture_input=False, capture_output=False)
-async def embedding(chunk: Dict[str, Any], embedder: Any) -> Dict[str, Any]:
-    return await embedder.run(documents=chunk["documents"])
+def sparse_embedding(
+    embedding: Dict[str, Any], sparse_encoder: SparseEncoder
+) -> Dict[str, Any]:
+    for document in embedding["documents"]:
+        content = orjson.loads(document.content)
+        document.sparse_embedding = sparse_encoder.encode_document(
+            f"{content['name']} {content['columns']}"
+        )
+
+    return embedding
 
 
 @observe(capture_input=False, capture_output=False)
 async def clean(
-    embedding: Dict[str, Any],
+    sparse_embedding: Dict[str, Any],
+    diff: Dict[str, Any],
     cleaner: DocumentCleaner,
     project_id: Optional[str] = None,
 ) -> Dict[str, Any]:
-    await cleaner.run(project_id=project_id)
-    return embedding
+    await cleaner.run(project_id=project_id, document_ids=diff["stale_ids"])
+    return sparse_embedding
 
 
 @observe(capture_input=False)
@@ -128,9 +157,11 @@ class TableDescription(BasicPipeline):
 
         self._components = {
             "cleaner": DocumentCleaner([table_description_store]),
+            "differ": DocumentDiffer(table_description_store),
             "validator": MDLValidator(),
             "embedder": embedder_provider.get_document_embedder(),
             "chunker": TableDescriptionChunker(),
+            "sparse_encoder": SparseEncoder(),
             "writer": AsyncDocumentWriter(
                 document_store=table_description_store,
                 policy=DuplicatePolicy.OVERWRITE,
@@ -162,8 +193,4 @@ class TableDescription(BasicPipeline):
 
     @observe(name="Clean Documents for Table Description")
     async def clean(self, project_id: Optional[str] = None) -> None:
-        await clean(
-            embedding={"documents": []},
-            cleaner=self._components["cleaner"],
-            project_id=project_id,
-        )
+        await self._components["cleaner"].run(project_id=project_id)
@@ -1,4 +1,4 @@
-from .db_schema_retrieval import DbSchemaRetrieval
+from .db_schema_retrieval import DbSchemaRetrieval, SchemaCache
 from .historical_question_retrieval import HistoricalQuestionRetrieval
 from .instructions import Instructions
 from .preprocess_sql_data import PreprocessSqlData
@@ -11,6 +11,7 @@ __all__ = [
     "HistoricalQuestionRetrieval",
     "PreprocessSqlData",
     "DbSchemaRetrieval",
+    "SchemaCache",
     "SQLExecutor",
     "SqlPairsRetrieval",
     "Instructions",
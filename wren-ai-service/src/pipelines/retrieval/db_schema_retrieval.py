@@ -1,10 +1,10 @@
-import ast
 import logging
 import sys
 from typing import Any, Optional
 
 import orjson
 import tiktoken
+from cachetools import TTLCache
 from hamilton import base
 from hamilton.async_driver import AsyncDriver
 from haystack import Document
@@ -15,9 +15,11 @@ from pydantic import BaseModel
 from src.core.pipeline import BasicPipeline
 from src.core.provider import DocumentStoreProvider, EmbedderProvider, LLMProvider
 from src.pipelines.common import (
+    SparseEncoder,
     build_table_ddl,
     clean_up_new_lines,
     get_engine_supported_data_type,
+    parse_document_content,
 )
 from src.templates import load_template
 from src.utils import trace_cost
@@ -56,6 +58,86 @@ def _build_view_ddl(content: dict) -> str:
     )
 
 
+def _build_schemas(documents: list[Document]) -> dict[str, dict]:
+    """
+    Assemble the TABLE_SCHEMA documents into one schema per table, metric or view, along with its rendered DDL.
+    """
+    tables = {}
+    schemas = {}
+    for document in documents:
+        content = parse_document_content(document)
+        name = document.meta["name"]
+        if content["type"] == "TABLE":
+            tables.setdefault(name, {}).update(content)
+        elif content["type"] == "TABLE_COLUMNS":
+            tables.setdefault(name, {}).setdefault("columns", []).extend(
+                content["columns"]
+            )
+        elif content["type"] == "METRIC":
+            schemas[name] = {
+                "type": "METRIC",
+                "content": content,
+                "ddl": _build_metric_ddl(content),
+                "has_calculated_field": False,
+                "has_json_field": False,
+            }
+        elif content["type"] == "VIEW":
+            schemas[name] = {
+                "type": "VIEW",
+                "content": content,
+                "ddl": _build_view_ddl(content),
+                "has_calculated_field": False,
+                "has_json_field": False,
+            }
+
+    for name, content in tables.items():
+        # skip incomplete schemas
+        if "type" not in content or "columns" not in content:
+            continue
+
+        ddl, has_calculated_field, has_json_field = build_table_ddl(content)
+        schemas[name] = {
+            "type": "TABLE",
+            "content": content,
+            "ddl": ddl,
+            "has_calculated_field": has_calculated_field,
+            "has_json_field": has_json_field,
+        }
+
+    return schemas
+
+
+class SchemaCache:
+    """
+    Per-project cache of the schemas assembled by db_schema_retrieval, keyed by table name.
+
+    Schemas only change when a project is deployed again, so the cache is invalidated by
+    SemanticsPreparationService on prepare_semantics and delete_semantics, and the entries of a
+    project belong to the MDL hash it was deployed with: a retrieval for another MDL hash,
+    e.g. in a worker that did not handle the re-deploy, starts over. The TTL is only a safeguard.
+    """
+
+    def __init__(self, maxsize: int = 1_000, ttl: int = 86_400):
+        self._projects: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, project_id: Optional[str], mdl_hash: Optional[str] = None) -> dict:
+        """
+        Return the schemas of the project by table name, schemas added to the returned dict are cached.
+        Without an MDL hash, the schemas of the current entry of the project are returned.
+        """
+        project_id = project_id or ""
+        entry = self._projects.get(project_id)
+        if entry is None or (mdl_hash and entry["mdl_hash"] != mdl_hash):
+            entry = self._projects[project_id] = {"mdl_hash": mdl_hash, "schemas": {}}
+
+        return entry["schemas"]
+
+    def invalidate(self, project_id: Optional[str], mdl_hash: Optional[str] = None):
+        # replacing the entry, instead of clearing it, also drops the schemas
+        # written by retrievals that were still running with the previous entry
+        self._projects[project_id or ""] = {"mdl_hash": mdl_hash, "schemas": {}}
+
+
 ## Start of Pipeline
 @observe(capture_input=False, capture_output=False)
 async def embedding(query: str, embedder: Any, histories: list[AskHistory]) -> dict:
@@ -74,7 +156,12 @@ async def embedding(query: str, embedder: Any, histories: list[AskHistory]) -> d
 
 @observe(capture_input=False)
 async def table_retrieval(
-    embedding: dict, project_id: str, tables: list[str], table_retriever: Any
+    embedding: dict,
+    query: str,
+    project_id: str,
+    tables: list[str],
+    table_retriever: Any,
+    sparse_encoder: SparseEncoder,
 ) -> dict:
     filters = {
         "operator": "AND",
@@ -91,6 +178,7 @@ async def table_retrieval(
     if embedding:
         return await table_retriever.run(
             query_embedding=embedding.get("embedding"),
+            query_sparse_embedding=sparse_encoder.encode_query(query),
             filters=filters,
         )
     else:
@@ -106,25 +194,26 @@ async def table_retrieval(
 
 @observe(capture_input=False)
 async def dbschema_retrieval(
-    table_retrieval: dict, project_id: str, dbschema_retriever: Any
-) -> list[Document]:
+    table_retrieval: dict,
+    project_id: str,
+    mdl_hash: str,
+    dbschema_retriever: Any,
+    schema_cache: Optional[SchemaCache],
+) -> list[dict]:
     tables = table_retrieval.get("documents", [])
-    table_names = []
-    for table in tables:
-        content = ast.literal_eval(table.content)
-        table_names.append(content["name"])
-
-    table_name_conditions = [
-        {"field": "name", "operator": "==", "value": table_name}
-        for table_name in table_names
-    ]
+    table_names = list(
+        dict.fromkeys(parse_document_content(table)["name"] for table in tables)
+    )
+
+    schemas = schema_cache.get(project_id, mdl_hash) if schema_cache else {}
+    missing = [table_name for table_name in table_names if table_name not in schemas]
 
-    if table_name_conditions:
+    if missing:
         filters = {
             "operator": "AND",
             "conditions": [
                 {"field": "type", "operator": "==", "value": "TABLE_SCHEMA"},
-                {"operator": "OR", "conditions": table_name_conditions},
+                {"field": "name", "operator": "in", "value": missing},
             ],
         }
 
@@ -133,44 +222,27 @@ async def dbschema_retrieval(
                 {"field": "project_id", "operator": "==", "value": project_id}
             )
 
-        results = await dbschema_retriever.run(query_embedding=[], filters=filters)
-        return results["documents"]
+        results = await dbschema_retriever.run(
+            query_embedding=[], filters=filters, top_k=len(missing)
+        )
+        built = _build_schemas(results["documents"])
+        for table_name in missing:
+            # tables without a complete schema are cached as well, so they are not fetched again
+            schemas[table_name] = built.get(table_name)
 
-    return []
+    return [schemas[table_name] for table_name in table_names if schemas[table_name]]
 
 
 @observe()
-def construct_db_schemas(dbschema_retrieval: list[Document]) -> list[dict]:
-    db_schemas = {}
-    for document in dbschema_retrieval:
-        content = ast.literal_eval(document.content)
-        if content["type"] == "TABLE":
-            if document.meta["name"] not in db_schemas:
-                db_schemas[document.meta["name"]] = content
-            else:
-                db_schemas[document.meta["name"]] = {
-                    **content,
-                    "columns": db_schemas[document.meta["name"]].get("columns", []),
-                }
-        elif content["type"] == "TABLE_COLUMNS":
-            if document.meta["name"] not in db_schemas:
-                db_schemas[document.meta["name"]] = {"columns": content["columns"]}
-            else:
-                if "columns" not in db_schemas[document.meta["name"]]:
-                    db_schemas[document.meta["name"]]["columns"] = content["columns"]
-                else:
-                    db_schemas[document.meta["name"]]["columns"] += content["columns"]
-
-    # remove incomplete schemas
-    db_schemas = {k: v for k, v in db_schemas.items() if "type" in v and "columns" in v}
-
-    return list(db_schemas.values())
+def construct_db_schemas(dbschema_retrieval: list[dict]) -> list[dict]:
+    return [
+        schema["content"] for schema in dbschema_retrieval if schema["type"] == "TABLE"
+    ]
 
 
 @observe(capture_input=False)
 def check_using_db_schemas_without_pruning(
-    construct_db_schemas: list[dict],
-    dbschema_retrieval: list[Document],
+    dbschema_retrieval: list[dict],
     encoding: tiktoken.Encoding,
     enable_column_pruning: bool,
     context_window_size: int,
@@ -180,38 +252,20 @@ def check_using_db_schemas_without_pruning(
     has_metric = False
     has_json_field = False
 
-    for table_schema in construct_db_schemas:
-        if table_schema["type"] == "TABLE":
-            ddl, _has_calculated_field, _has_json_field = build_table_ddl(table_schema)
-            retrieval_results.append(
-                {
-                    "table_name": table_schema["name"],
-                    "table_ddl": ddl,
-                }
-            )
-            if _has_calculated_field:
-                has_calculated_field = True
-            if _has_json_field:
-                has_json_field = True
-
-    for document in dbschema_retrieval:
-        content = ast.literal_eval(document.content)
-
-        if content["type"] == "METRIC":
-            retrieval_results.append(
-                {
-                    "table_name": content["name"],
-                    "table_ddl": _build_metric_ddl(content),
-                }
-            )
+    # tables first, then metrics and views
+    for schema in sorted(dbschema_retrieval, key=lambda s: s["type"] != "TABLE"):
+        retrieval_results.append(
+            {
+                "table_name": schema["content"]["name"],
+                "table_ddl": schema["ddl"],
+            }
+        )
+        if schema["has_calculated_field"]:
+            has_calculated_field = True
+        if schema["has_json_field"]:
+            has_json_field = True
+        if schema["type"] == "METRIC":
             has_metric = True
-        elif content["type"] == "VIEW":
-            retrieval_results.append(
-                {
-                    "table_name": content["name"],
-                    "table_ddl": _build_view_ddl(content),
-                }
-            )
 
     table_ddls = [
         retrieval_result["table_ddl"] for retrieval_result in retrieval_results
@@ -279,7 +333,7 @@ def construct_retrieval_results(
     check_using_db_schemas_without_pruning: dict,
     filter_columns_in_tables: dict,
     construct_db_schemas: list[dict],
-    dbschema_retrieval: list[Document],
+    dbschema_retrieval: list[dict],
 ) -> dict[str, Any]:
     if filter_columns_in_tables:
         columns_and_tables_needed = orjson.loads(
@@ -319,25 +373,19 @@ def construct_retrieval_results(
                     }
                 )
 
-        for document in dbschema_retrieval:
-            if document.meta["name"] in columns_and_tables_needed:
-                content = ast.literal_eval(document.content)
-
-                if content["type"] == "METRIC":
-                    retrieval_results.append(
-                        {
-                            "table_name": content["name"],
-                            "table_ddl": _build_metric_ddl(content),
-                        }
-                    )
+        for schema in dbschema_retrieval:
+            if (
+                schema["type"] != "TABLE"
+                and schema["content"]["name"] in columns_and_tables_needed
+            ):
+                retrieval_results.append(
+                    {
+                        "table_name": schema["content"]["name"],
+                        "table_ddl": schema["ddl"],
+                    }
+                )
+                if schema["type"] == "METRIC":
                     has_metric = True
-                elif content["type"] == "VIEW":
-                    retrieval_results.append(
-                        {
-                            "table_name": content["name"],
-                            "table_ddl": _build_view_ddl(content),
-                        }
-                    )
 
         return {
             "retrieval_results": retrieval_results,
@@ -393,6 +441,7 @@ class DbSchemaRetrieval(BasicPipeline):
         document_store_provider: DocumentStoreProvider,
         table_retrieval_size: int = 10,
         table_column_retrieval_size: int = 100,
+        schema_cache: Optional[SchemaCache] = None,
         **kwargs,
     ):
         self._components = {
@@ -400,10 +449,15 @@ class DbSchemaRetrieval(BasicPipeline):
             "table_retriever": document_store_provider.get_retriever(
                 document_store_provider.get_store(dataset_name="table_descriptions"),
                 top_k=table_retrieval_size,
+                payload_fields=["content"],
             ),
+            "sparse_encoder": SparseEncoder(),
             "dbschema_retriever": document_store_provider.get_retriever(
                 document_store_provider.get_store(),
-                top_k=table_column_retrieval_size,
+                payload_fields=["content", "name"],
+                # all the chunks of the retrieved tables, up to table_column_retrieval_size chunks per table
+                group_by="name",
+                group_size=table_column_retrieval_size,
             ),
             "table_columns_selection_generator": llm_provider.get_generator(
                 system_prompt=table_columns_selection_system_prompt,
@@ -423,6 +477,7 @@ class DbSchemaRetrieval(BasicPipeline):
             _encoding = tiktoken.get_encoding("cl100k_base")
 
         self._configs = {
+            "schema_cache": schema_cache,
             "encoding": _encoding,
             "context_window_size": llm_provider.get_context_window_size(),
         }
@@ -439,6 +494,7 @@ class DbSchemaRetrieval(BasicPipeline):
         project_id: Optional[str] = None,
         histories: Optional[list[AskHistory]] = None,
         enable_column_pruning: bool = False,
+        mdl_hash: Optional[str] = None,
     ):
         logger.info("Ask Retrieval pipeline is running...")
         return await self._pipe.execute(
@@ -447,6 +503,7 @@ class DbSchemaRetrieval(BasicPipeline):
                 "query": query,
                 "tables": tables,
                 "project_id": project_id or "",
+                "mdl_hash": mdl_hash or "",
                 "histories": histories or [],
                 "enable_column_pruning": enable_column_pruning,
                 **self._components,
@@ -10,7 +10,7 @@ from langfuse.decorators import observe
 
 from src.core.pipeline import BasicPipeline
 from src.core.provider import DocumentStoreProvider, EmbedderProvider
-from src.pipelines.common import ScoreFilter
+from src.pipelines.common import ProjectCatalog, ScoreFilter, from_catalog
 
 logger = logging.getLogger("wren-ai-service")
 
@@ -38,6 +38,7 @@ class OutputFormatter:
 @observe(capture_input=False)
 async def count_documents(
     view_questions_store: QdrantDocumentStore,
+    catalog: Optional[ProjectCatalog],
     project_id: Optional[str] = None,
 ) -> int:
     filters = (
@@ -51,7 +52,12 @@ async def count_documents(
         else None
     )
 
-    return await view_questions_store.count_documents(filters=filters)
+    return await from_catalog(
+        catalog,
+        project_id,
+        "view_questions_count",
+        lambda: view_questions_store.count_documents(filters=filters),
+    )
 
 
 @observe(capture_input=False, capture_output=False)
@@ -123,6 +129,7 @@ class HistoricalQuestionRetrieval(BasicPipeline):
         embedder_provider: EmbedderProvider,
         document_store_provider: DocumentStoreProvider,
         historical_question_retrieval_similarity_threshold: float = 0.9,
+        project_catalog: Optional[ProjectCatalog] = None,
         **kwargs,
     ) -> None:
         view_questions_store = document_store_provider.get_store(
@@ -130,9 +137,11 @@ class HistoricalQuestionRetrieval(BasicPipeline):
         )
         self._components = {
             "view_questions_store": view_questions_store,
+            "catalog": project_catalog,
             "embedder": embedder_provider.get_text_embedder(),
             "view_questions_retriever": document_store_provider.get_retriever(
                 document_store=view_questions_store,
+                payload_fields=["content", "summary", "statement", "sql", "viewId"],
             ),
             "score_filter": ScoreFilter(),
             # TODO: add a llm filter to filter out low scoring document, in case ScoreFilter is not accurate enough
@@ -10,7 +10,7 @@ from langfuse.decorators import observe
 
 from src.core.pipeline import BasicPipeline
 from src.core.provider import DocumentStoreProvider, EmbedderProvider
-from src.pipelines.common import ScoreFilter
+from src.pipelines.common import ProjectCatalog, ScoreFilter, from_catalog
 
 logger = logging.getLogger("wren-ai-service")
 
@@ -34,30 +34,27 @@ class OutputFormatter:
         return {"documents": list}
 
 
-@component
-class ScopeFilter:
-    @component.output_types(
-        documents=List[Document],
-    )
-    def run(
-        self,
-        documents: List[Document],
-        scope: str = "sql",
-    ):
-        return {
-            "documents": list(
-                filter(
-                    lambda document: document.meta.get("scope", "sql") == scope,
-                    documents,
-                ),
-            )
-        }
+def _scope_condition(scope: str) -> dict:
+    condition = {"field": "scope", "operator": "==", "value": scope}
+    if scope != "sql":
+        return condition
+
+    # the instructions indexed before the scopes were introduced have no scope, they are sql ones
+    return {
+        "operator": "OR",
+        "conditions": [
+            condition,
+            {"field": "scope", "operator": "==", "value": None},
+        ],
+    }
 
 
 ## Start of Pipeline
 @observe(capture_input=False)
 async def count_documents(
-    store: QdrantDocumentStore, project_id: Optional[str] = None
+    store: QdrantDocumentStore,
+    catalog: Optional[ProjectCatalog],
+    project_id: Optional[str] = None,
 ) -> int:
     filters = (
         {
@@ -69,8 +66,12 @@ async def count_documents(
         if project_id
         else None
     )
-    document_count = await store.count_documents(filters=filters)
-    return document_count
+    return await from_catalog(
+        catalog,
+        project_id,
+        "instructions_count",
+        lambda: store.count_documents(filters=filters),
+    )
 
 
 @observe(capture_input=False, capture_output=False)
@@ -82,7 +83,9 @@ async def embedding(count_documents: int, query: str, embedder: Any) -> dict:
 
 
 @observe(capture_input=False)
-async def retrieval(embedding: dict, project_id: str, retriever: Any) -> dict:
+async def retrieval(
+    embedding: dict, project_id: str, scope: str, retriever: Any
+) -> dict:
     if not embedding:
         return {}
 
@@ -90,6 +93,7 @@ async def retrieval(embedding: dict, project_id: str, retriever: Any) -> dict:
         "operator": "AND",
         "conditions": [
             {"field": "is_default", "operator": "==", "value": False},
+            _scope_condition(scope),
         ],
     }
 
@@ -108,8 +112,6 @@ async def retrieval(embedding: dict, project_id: str, retriever: Any) -> dict:
 @observe(capture_input=False)
 def filtered_documents(
     retrieval: dict,
-    scope: str,
-    scope_filter: ScopeFilter,
     score_filter: ScoreFilter,
     similarity_threshold: float,
     top_k: int,
@@ -117,13 +119,8 @@ def filtered_documents(
     if not retrieval:
         return {}
 
-    res = scope_filter.run(
-        documents=retrieval.get("documents"),
-        scope=scope,
-    )
-
     return score_filter.run(
-        documents=res.get("documents"),
+        documents=retrieval.get("documents"),
         score=similarity_threshold,
         max_size=top_k,
     )
@@ -133,8 +130,8 @@ def filtered_documents(
 async def default_instructions(
     count_documents: int,
     retriever: Any,
+    catalog: Optional[ProjectCatalog],
     project_id: str,
-    scope_filter: ScopeFilter,
     scope: str,
 ) -> list[Document]:
     if not count_documents:
@@ -144,6 +141,7 @@ async def default_instructions(
         "operator": "AND",
         "conditions": [
             {"field": "is_default", "operator": "==", "value": True},
+            _scope_condition(scope),
         ],
     }
 
@@ -152,18 +150,17 @@ async def default_instructions(
             {"field": "project_id", "operator": "==", "value": project_id}
         )
 
-    _res = await retriever.run(
-        query_embedding=None,
-        filters=filters,
-    )
+    async def _fetch() -> dict:
+        res = await retriever.run(
+            query_embedding=None,
+            filters=filters,
+        )
+        return dict(documents=res.get("documents"))
 
-    res = scope_filter.run(
-        documents=_res.get("documents"),
-        scope=scope,
+    return await from_catalog(
+        catalog, project_id, f"default_instructions:{scope}", _fetch
     )
 
-    return dict(documents=res.get("documents"))
-
 
 @observe(capture_input=False)
 def formatted_output(
@@ -189,16 +186,18 @@ class Instructions(BasicPipeline):
         document_store_provider: DocumentStoreProvider,
         similarity_threshold: float = 0.7,
         top_k: int = 10,
+        project_catalog: Optional[ProjectCatalog] = None,
         **kwargs,
     ) -> None:
         store = document_store_provider.get_store(dataset_name="instructions")
         self._components = {
             "store": store,
+            "catalog": project_catalog,
             "embedder": embedder_provider.get_text_embedder(),
             "retriever": document_store_provider.get_retriever(
                 document_store=store,
+                payload_fields=["content", "instruction", "instruction_id"],
             ),
-            "scope_filter": ScopeFilter(),
             "score_filter": ScoreFilter(),
             "output_formatter": OutputFormatter(),
         }
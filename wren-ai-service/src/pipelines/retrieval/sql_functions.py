@@ -2,7 +2,6 @@ import logging
 import sys
 from typing import List, Optional
 
-import aiohttp
 from cachetools import TTLCache
 from hamilton import base
 from hamilton.async_driver import AsyncDriver
@@ -11,7 +10,7 @@ from langfuse.decorators import observe
 from src.core.engine import Engine
 from src.core.pipeline import BasicPipeline
 from src.core.provider import DocumentStoreProvider
-from src.pipelines.common import retrieve_metadata
+from src.pipelines.common import ProjectCatalog, retrieve_metadata
 from src.providers.engine.wren import WrenIbis
 
 logger = logging.getLogger("wren-ai-service")
@@ -53,17 +52,16 @@ async def get_functions(
     engine: WrenIbis,
     data_source: str,
 ) -> List[SqlFunction]:
-    async with aiohttp.ClientSession() as session:
-        func_list = await engine.get_func_list(
-            session=session,
-            data_source=data_source,
-        )
+    func_list = await engine.get_func_list(
+        session=engine.session,
+        data_source=data_source,
+    )
 
-        return [
-            SqlFunction(definition=func)
-            for func in func_list
-            if not SqlFunction.empty(func)
-        ]
+    return [
+        SqlFunction(definition=func)
+        for func in func_list
+        if not SqlFunction.empty(func)
+    ]
 
 
 @observe(capture_input=False)
@@ -85,11 +83,13 @@ class SqlFunctions(BasicPipeline):
         engine: Engine,
         document_store_provider: DocumentStoreProvider,
         ttl: int = 60 * 60 * 24,
+        project_catalog: Optional[ProjectCatalog] = None,
         **kwargs,
     ) -> None:
         self._retriever = document_store_provider.get_retriever(
             document_store_provider.get_store("project_meta")
         )
+        self._project_catalog = project_catalog
         self._cache = TTLCache(maxsize=100, ttl=ttl)
         self._components = {
             "engine": engine,
@@ -109,7 +109,9 @@ class SqlFunctions(BasicPipeline):
             f"Project ID: {project_id} SQL Functions Retrieval pipeline is running..."
         )
 
-        metadata = await retrieve_metadata(project_id or "", self._retriever)
+        metadata = await retrieve_metadata(
+            project_id or "", self._retriever, self._project_catalog
+        )
         _data_source = metadata.get("data_source", "local_file")
 
         if _data_source in self._cache:
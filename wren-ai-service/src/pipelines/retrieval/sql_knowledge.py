@@ -2,7 +2,6 @@ import logging
 import sys
 from typing import Dict, Optional
 
-import aiohttp
 from cachetools import TTLCache
 from hamilton import base
 from hamilton.async_driver import AsyncDriver
@@ -11,7 +10,7 @@ from langfuse.decorators import observe
 from src.core.engine import Engine
 from src.core.pipeline import BasicPipeline
 from src.core.provider import DocumentStoreProvider
-from src.pipelines.common import retrieve_metadata
+from src.pipelines.common import ProjectCatalog, retrieve_metadata
 from src.providers.engine.wren import WrenIbis
 
 logger = logging.getLogger("wren-ai-service")
@@ -62,16 +61,15 @@ async def get_knowledge(
     engine: WrenIbis,
     data_source: str,
 ) -> Optional[SqlKnowledge]:
-    async with aiohttp.ClientSession() as session:
-        knowledge_dict = await engine.get_sql_knowledge(
-            session=session,
-            data_source=data_source,
-        )
+    knowledge_dict = await engine.get_sql_knowledge(
+        session=engine.session,
+        data_source=data_source,
+    )
 
-        if not knowledge_dict or SqlKnowledge.empty(knowledge_dict):
-            return None
+    if not knowledge_dict or SqlKnowledge.empty(knowledge_dict):
+        return None
 
-        return SqlKnowledge(sql_knowledge=knowledge_dict)
+    return SqlKnowledge(sql_knowledge=knowledge_dict)
 
 
 @observe(capture_input=False)
@@ -95,11 +93,13 @@ class SqlKnowledges(BasicPipeline):
         engine: Engine,
         document_store_provider: DocumentStoreProvider,
         ttl: int = 60 * 60 * 24,
+        project_catalog: Optional[ProjectCatalog] = None,
         **kwargs,
     ) -> None:
         self._retriever = document_store_provider.get_retriever(
             document_store_provider.get_store("project_meta")
         )
+        self._project_catalog = project_catalog
         self._cache = TTLCache(maxsize=100, ttl=ttl)
         self._components = {
             "engine": engine,
@@ -119,7 +119,9 @@ class SqlKnowledges(BasicPipeline):
             f"Project ID: {project_id} SQL Knowledge Retrieval pipeline is running..."
         )
 
-        metadata = await retrieve_metadata(project_id or "", self._retriever)
+        metadata = await retrieve_metadata(
+            project_id or "", self._retriever, self._project_catalog
+        )
         _data_source = metadata.get("data_source", "local_file")
 
         if _data_source in self._cache:
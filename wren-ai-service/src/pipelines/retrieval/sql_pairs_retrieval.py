@@ -10,7 +10,7 @@ from langfuse.decorators import observe
 
 from src.core.pipeline import BasicPipeline
 from src.core.provider import DocumentStoreProvider, EmbedderProvider
-from src.pipelines.common import ScoreFilter
+from src.pipelines.common import ProjectCatalog, ScoreFilter, from_catalog
 
 logger = logging.getLogger("wren-ai-service")
 
@@ -36,7 +36,9 @@ class OutputFormatter:
 ## Start of Pipeline
 @observe(capture_input=False)
 async def count_documents(
-    store: QdrantDocumentStore, project_id: Optional[str] = None
+    store: QdrantDocumentStore,
+    catalog: Optional[ProjectCatalog],
+    project_id: Optional[str] = None,
 ) -> int:
     filters = (
         {
@@ -48,8 +50,12 @@ async def count_documents(
         if project_id
         else None
     )
-    document_count = await store.count_documents(filters=filters)
-    return document_count
+    return await from_catalog(
+        catalog,
+        project_id,
+        "sql_pairs_count",
+        lambda: store.count_documents(filters=filters),
+    )
 
 
 @observe(capture_input=False, capture_output=False)
@@ -120,14 +126,17 @@ class SqlPairsRetrieval(BasicPipeline):
         document_store_provider: DocumentStoreProvider,
         sql_pairs_similarity_threshold: float = 0.7,
         sql_pairs_retrieval_max_size: int = 10,
+        project_catalog: Optional[ProjectCatalog] = None,
         **kwargs,
     ) -> None:
         store = document_store_provider.get_store(dataset_name="sql_pairs")
         self._components = {
             "store": store,
+            "catalog": project_catalog,
             "embedder": embedder_provider.get_text_embedder(),
             "retriever": document_store_provider.get_retriever(
                 document_store=store,
+                payload_fields=["content", "sql"],
             ),
             "score_filter": ScoreFilter(),
             # TODO: add a llm filter to filter out low scoring document, in case ScoreFilter is not accurate enough
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from dataclasses import dataclass
 
@@ -264,7 +265,8 @@ def pipeline_processor(entry: dict) -> dict:
                 "llm": "openai_llm.gpt-4o-mini",
                 "embedder": "openai_embedder.text-embedding-3-large",
                 "document_store": "qdrant",
-                "engine": "wren_ui"
+                "engine": "wren_ui",
+                "response_cache": false
             }
         ]
     }
@@ -277,6 +279,7 @@ def pipeline_processor(entry: dict) -> dict:
             "embedder": "openai_embedder.text-embedding-3-large",
             "document_store": "qdrant",
             "engine": "wren_ui",
+            "response_cache": False,
         }
     }
 
@@ -292,6 +295,7 @@ def pipeline_processor(entry: dict) -> dict:
             "embedder": pipe.get("embedder"),
             "document_store": pipe.get("document_store"),
             "engine": pipe.get("engine"),
+            "response_cache": pipe.get("response_cache", False),
         }
         for pipe in entry["pipes"]
     }
@@ -380,9 +384,13 @@ def generate_components(configs: list[dict]) -> dict[str, PipelineComponent]:
         return instantiated_providers[type].get(identifier)
 
     def componentize(components: dict, instantiated_providers: dict):
+        llm_provider = get("llm", components, instantiated_providers)
+        if llm_provider and components.get("response_cache"):
+            llm_provider = llm_provider.with_response_cache()
+
         return PipelineComponent(
             embedder_provider=get("embedder", components, instantiated_providers),
-            llm_provider=get("llm", components, instantiated_providers),
+            llm_provider=llm_provider,
             document_store_provider=get(
                 "document_store", components, instantiated_providers
             ),
@@ -393,3 +401,45 @@ def generate_components(configs: list[dict]) -> dict[str, PipelineComponent]:
         pipe_name: componentize(components, instantiated_providers)
         for pipe_name, components in config.pipelines.items()
     }
+
+
+# the counters reported by the providers, by the name of their method
+PROVIDER_STATS = {
+    "cache": "cache_stats",
+    "single_flight": "single_flight_stats",
+}
+
+
+def provider_stats(pipe_components: dict[str, PipelineComponent]) -> dict:
+    """
+    Collect the counters of the llm and embedder providers used by the pipelines, by provider and model,
+    e.g. {"embedder text-embedding-3-large": {"cache": {"hits": 10, "misses": 2, "size": 12}}}.
+    """
+    stats = {}
+    for component in pipe_components.values():
+        for type, _provider in (
+            ("llm", component.llm_provider),
+            ("embedder", component.embedder_provider),
+        ):
+            if _provider is None:
+                continue
+
+            key = f"{type} {_provider.get_model()}"
+            for name, method in PROVIDER_STATS.items():
+                # e.g. the cache counters of a provider without cache are empty
+                if value := getattr(_provider, method, lambda: None)():
+                    stats.setdefault(key, {})[name] = value
+
+    return stats
+
+
+async def log_provider_stats(
+    pipe_components: dict[str, PipelineComponent], interval: float
+):
+    """
+    Log the counters of the providers every `interval` seconds, until cancelled.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        if stats := provider_stats(pipe_components):
+            logger.info(f"Provider stats: {stats}")
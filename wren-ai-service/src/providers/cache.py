@@ -0,0 +1,216 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import orjson
+from cachetools import LRUCache, TTLCache
+
+logger = logging.getLogger("wren-ai-service")
+
+
+def cache_key(*parts: Any) -> str:
+    """
+    Build a stable cache key from the given parts, e.g. the model name, the request kwargs and the normalized input text.
+    """
+    return hashlib.sha256(
+        orjson.dumps(parts, option=orjson.OPT_SORT_KEYS, default=str)
+    ).hexdigest()
+
+
+class _SqliteTier:
+    # the rows over the limits are pruned every so many written rows, not on every write
+    PRUNE_INTERVAL = 1_000
+
+    def __init__(
+        self,
+        path: str,
+        namespace: str,
+        maxsize: int = 1_000_000,
+        ttl: Optional[int] = None,
+    ):
+        path = os.path.expanduser(path)
+        if directory := os.path.dirname(path):
+            os.makedirs(directory, exist_ok=True)
+
+        self._namespace = namespace
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._writes_since_prune = self.PRUNE_INTERVAL
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, "
+            "created_at REAL NOT NULL DEFAULT 0, "
+            "PRIMARY KEY (namespace, key))"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(cache)")}
+        if "created_at" not in columns:
+            # the files written before the rows were timestamped, their rows are the oldest
+            self._conn.execute(
+                "ALTER TABLE cache ADD COLUMN created_at REAL NOT NULL DEFAULT 0"
+            )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS cache_created_at ON cache (namespace, created_at)"
+        )
+        self._conn.commit()
+
+    def _oldest_valid(self) -> float:
+        return time.time() - self._ttl if self._ttl else 0
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        results = {}
+        with self._lock:
+            # stay well below the default sqlite limit of host parameters
+            for i in range(0, len(keys), 500):
+                chunk = keys[i : i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM cache WHERE namespace = ? AND created_at >= ? AND key IN ({','.join('?' * len(chunk))})",
+                    [self._namespace, self._oldest_valid(), *chunk],
+                ).fetchall()
+                results.update(rows)
+        return results
+
+    def set_many(self, items: Dict[str, bytes]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, created_at) VALUES (?, ?, ?, ?)",
+                [(self._namespace, key, value, now) for key, value in items.items()],
+            )
+            self._writes_since_prune += len(items)
+            if self._writes_since_prune >= self.PRUNE_INTERVAL:
+                self._prune()
+                self._writes_since_prune = 0
+            self._conn.commit()
+
+    def _prune(self):
+        # the expired rows, then the oldest rows over the size limit
+        self._conn.execute(
+            "DELETE FROM cache WHERE namespace = ? AND created_at < ?",
+            (self._namespace, self._oldest_valid()),
+        )
+        self._conn.execute(
+            "DELETE FROM cache WHERE namespace = ? AND key IN ("
+            "SELECT key FROM cache WHERE namespace = ? "
+            "ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self._namespace, self._namespace, self._maxsize),
+        )
+
+
+class TieredCache:
+    """
+    A two-tier cache: a bounded in-memory LRU in front of an optional SQLite file on disk.
+
+    The disk tier keeps up to `disk_maxsize` rows per namespace, the oldest rows are deleted first,
+    and with `ttl` the entries of both tiers expire after that many seconds.
+
+    Values are kept as-is in memory and go through `dumps`/`loads` when they are persisted to disk.
+    With `maxbytes`, the memory tier keeps the dumped values instead, bounded by their total size in bytes
+    rather than their count, and every read loads its own copy, so the callers may modify their values.
+    Disk lookups run in a worker thread so they do not block the event loop, and disk hits are
+    promoted to the memory tier.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        maxsize: int = 10_000,
+        path: Optional[str] = None,
+        dumps: Callable[[Any], bytes] = orjson.dumps,
+        loads: Callable[[bytes], Any] = orjson.loads,
+        maxbytes: Optional[int] = None,
+        disk_maxsize: int = 1_000_000,
+        ttl: Optional[int] = None,
+    ):
+        self._maxbytes = maxbytes
+        memory_kwargs = (
+            {"maxsize": maxbytes, "getsizeof": len}
+            if maxbytes
+            else {"maxsize": maxsize}
+        )
+        self._memory = (
+            TTLCache(ttl=ttl, **memory_kwargs) if ttl else LRUCache(**memory_kwargs)
+        )
+        self._dumps = dumps
+        self._loads = loads
+        self._disk = None
+        if path:
+            try:
+                self._disk = _SqliteTier(path, namespace, maxsize=disk_maxsize, ttl=ttl)
+            except sqlite3.Error as e:
+                logger.warning(
+                    f"Failed to open cache file {path}, disk tier disabled: {e}"
+                )
+
+        self.hits = 0
+        self.misses = 0
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        found = {}
+        missing = []
+        for key in keys:
+            if key in self._memory:
+                found[key] = (
+                    self._loads(self._memory[key])
+                    if self._maxbytes
+                    else self._memory[key]
+                )
+            else:
+                missing.append(key)
+
+        if missing and self._disk:
+            try:
+                rows = await asyncio.to_thread(self._disk.get_many, missing)
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to read from cache file: {e}")
+                rows = {}
+
+            for key, value in rows.items():
+                found[key] = self._loads(value)
+                self._remember(key, value if self._maxbytes else found[key])
+
+        self.hits += len(found)
+        self.misses += sum(1 for key in missing if key not in found)
+        return found
+
+    async def set_many(self, items: Dict[str, Any]) -> None:
+        if not items:
+            return
+
+        dumped = (
+            {key: self._dumps(value) for key, value in items.items()}
+            if self._maxbytes or self._disk
+            else {}
+        )
+        for key, value in items.items():
+            self._remember(key, dumped[key] if self._maxbytes else value)
+
+        if self._disk:
+            try:
+                await asyncio.to_thread(self._disk.set_many, dumped)
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to write to cache file: {e}")
+
+    def _remember(self, key: str, value: Any):
+        # a value larger than the whole memory tier is only kept on disk
+        if self._maxbytes and len(value) > self._maxbytes:
+            return
+
+        self._memory[key] = value
+
+    async def get(self, key: str) -> Optional[Any]:
+        return (await self.get_many([key])).get(key)
+
+    async def set(self, key: str, value: Any) -> None:
+        await self.set_many({key: value})
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._memory)}
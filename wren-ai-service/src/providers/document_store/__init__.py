@@ -0,0 +1,31 @@
+from typing import Any, Dict, Optional, Tuple
+
+
+def project_id_of(filters: Optional[Dict[str, Any]]) -> Tuple[bool, Optional[str]]:
+    """
+    Return whether the filters only match the documents of a single project, and which one.
+    """
+    if not filters:
+        return False, None
+
+    conditions = [filters]
+    if filters.get("operator") == "AND":
+        conditions = filters["conditions"]
+
+    for condition in conditions:
+        if condition.get("field") == "project_id" and condition["operator"] == "==":
+            return True, condition["value"]
+
+    return False, None
+
+
+def is_project_filter(filters: Optional[Dict[str, Any]]) -> bool:
+    """
+    Return whether the filters match all the documents of a single project, and only them.
+    """
+    if filters and filters.get("operator") == "AND":
+        if len(filters["conditions"]) != 1:
+            return False
+        filters = filters["conditions"][0]
+
+    return bool(filters) and project_id_of(filters)[0]
@@ -0,0 +1,635 @@
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import orjson
+from haystack import Document, component, default_to_dict
+from haystack.dataclasses import SparseEmbedding
+from haystack.document_stores.errors import DuplicateDocumentError
+from haystack.document_stores.types import DuplicatePolicy
+
+from src.core.provider import DocumentStoreProvider
+from src.providers.document_store import project_id_of
+from src.providers.loader import provider
+
+logger = logging.getLogger("wren-ai-service")
+
+
+def _field_value(payload: Dict[str, Any], field_name: str) -> Any:
+    # the payloads are flattened the same way as the Qdrant payloads, i.e. {"id", "content", **meta}
+    if field_name.startswith("meta."):
+        field_name = field_name[len("meta.") :]
+    return payload.get(field_name)
+
+
+def _compare(operator: str, value: Any, expected: Any) -> bool:
+    if operator == "==":
+        return value == expected
+    if operator == "!=":
+        return value != expected
+    if operator == "in":
+        return value in expected
+    if operator == "not in":
+        return value not in expected
+    if value is None or expected is None:
+        return False
+    if operator == ">":
+        return value > expected
+    if operator == ">=":
+        return value >= expected
+    if operator == "<":
+        return value < expected
+    if operator == "<=":
+        return value <= expected
+
+    raise ValueError(f"Unsupported filter operator: {operator}")
+
+
+def matches_filters(payload: Dict[str, Any], filters: Optional[Dict[str, Any]]) -> bool:
+    """
+    Check if a flattened payload matches the Haystack filters used by the pipelines.
+    """
+    if not filters:
+        return True
+
+    if "field" in filters:
+        return _compare(
+            filters["operator"],
+            _field_value(payload, filters["field"]),
+            filters["value"],
+        )
+
+    operator = filters["operator"]
+    conditions = filters["conditions"]
+    if operator == "AND":
+        return all(matches_filters(payload, condition) for condition in conditions)
+    if operator == "OR":
+        return any(matches_filters(payload, condition) for condition in conditions)
+    if operator == "NOT":
+        return not all(matches_filters(payload, condition) for condition in conditions)
+
+    raise ValueError(f"Unsupported logical operator: {operator}")
+
+
+def _partition_key(project_id: Optional[str]) -> str:
+    return hashlib.sha1((project_id or "").encode()).hexdigest()[:16]
+
+
+@dataclass
+class _Partition:
+    """
+    The documents of one project in a collection, with their embeddings in a contiguous float32 matrix.
+
+    The arrays are never modified in place, writes and deletes replace them,
+    so the memory-mapped arrays loaded from disk can be shared safely.
+    """
+
+    project_id: Optional[str]
+    payloads: List[Dict[str, Any]] = field(default_factory=list)
+    # normalized embeddings, the rows of documents without embedding are zeros
+    embeddings: np.ndarray = field(
+        default_factory=lambda: np.zeros((0, 0), dtype=np.float32)
+    )
+    has_embedding: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=bool))
+
+    def __len__(self) -> int:
+        return len(self.payloads)
+
+
+class EmbeddedDocumentStore:
+    """
+    A document store kept in the process, searched with brute-force numpy dot products.
+
+    The documents are partitioned by project, so the queries filtered by a project only scan its documents.
+    If `path` is set, each partition is persisted as a float32 `.npy` file, memory-mapped on startup,
+    along with a JSON file of the payloads.
+    """
+
+    def __init__(
+        self,
+        index: str = "Document",
+        embedding_dim: int = 0,
+        path: Optional[str] = None,
+        recreate_index: bool = False,
+        scroll_size: int = 1_000,
+    ):
+        self.index = index
+        self.embedding_dim = embedding_dim
+        self.scroll_size = scroll_size
+        self._path = Path(path) / index if path else None
+        self._partitions: Dict[Optional[str], _Partition] = {}
+        self._lock = asyncio.Lock()
+
+        if self._path is not None:
+            if recreate_index and self._path.exists():
+                shutil.rmtree(self._path)
+            self._path.mkdir(parents=True, exist_ok=True)
+            self._load()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return default_to_dict(
+            self,
+            index=self.index,
+            embedding_dim=self.embedding_dim,
+            path=str(self._path.parent) if self._path else None,
+            scroll_size=self.scroll_size,
+        )
+
+    def _load(self):
+        for payloads_file in self._path.glob("*.json"):
+            data = orjson.loads(payloads_file.read_bytes())
+            embeddings = np.load(payloads_file.with_suffix(".npy"), mmap_mode="r")
+            self._partitions[data["project_id"]] = _Partition(
+                project_id=data["project_id"],
+                payloads=data["payloads"],
+                embeddings=embeddings,
+                has_embedding=np.asarray(data["has_embedding"], dtype=bool),
+            )
+            if not self.embedding_dim and embeddings.shape[1]:
+                self.embedding_dim = embeddings.shape[1]
+
+        logger.info(
+            f"Loaded {sum(map(len, self._partitions.values()))} documents into {self.index}"
+        )
+
+    def _persist(self, partition: _Partition):
+        key = _partition_key(partition.project_id)
+        payloads_file = self._path / f"{key}.json"
+        embeddings_file = self._path / f"{key}.npy"
+
+        if not partition:
+            payloads_file.unlink(missing_ok=True)
+            embeddings_file.unlink(missing_ok=True)
+            return
+
+        # write to temporary files first, so a crash never leaves a partition half written
+        with open(embeddings_file.with_suffix(".npy.tmp"), "wb") as f:
+            np.save(f, partition.embeddings)
+        payloads_file.with_suffix(".json.tmp").write_bytes(
+            orjson.dumps(
+                {
+                    "project_id": partition.project_id,
+                    "payloads": partition.payloads,
+                    "has_embedding": partition.has_embedding.tolist(),
+                },
+                option=orjson.OPT_SERIALIZE_NUMPY,
+            )
+        )
+        os.replace(embeddings_file.with_suffix(".npy.tmp"), embeddings_file)
+        os.replace(payloads_file.with_suffix(".json.tmp"), payloads_file)
+
+    def _select(
+        self, filters: Optional[Dict[str, Any]]
+    ) -> Iterator[Tuple[_Partition, np.ndarray]]:
+        """
+        Yield the partitions along with the rows matching the filters.
+        """
+        single_project, project_id = project_id_of(filters)
+        if single_project:
+            partitions = (
+                [self._partitions[project_id]] if project_id in self._partitions else []
+            )
+        else:
+            partitions = list(self._partitions.values())
+
+        for partition in partitions:
+            rows = np.fromiter(
+                (
+                    row
+                    for row, payload in enumerate(partition.payloads)
+                    if matches_filters(payload, filters)
+                ),
+                dtype=np.int64,
+            )
+            if len(rows):
+                yield partition, rows
+
+    @staticmethod
+    def _to_document(
+        partition: _Partition,
+        row: int,
+        score: Optional[float] = None,
+        return_embedding: bool = False,
+        payload_fields: Optional[List[str]] = None,
+    ) -> Document:
+        payload = partition.payloads[row]
+        if payload_fields:
+            payload = {
+                key: payload[key] for key in ["id", *payload_fields] if key in payload
+            }
+        else:
+            payload = {**payload}
+
+        if score is not None:
+            payload["score"] = score
+        if return_embedding and partition.has_embedding[row]:
+            payload["embedding"] = partition.embeddings[row].tolist()
+
+        return Document.from_dict(payload)
+
+    def filter_documents(
+        self, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        return [
+            self._to_document(partition, row)
+            for partition, rows in self._select(filters)
+            for row in rows
+        ]
+
+    async def _query_by_embedding(
+        self,
+        query_embedding: List[float],
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: int = 10,
+        scale_score: bool = True,
+        return_embedding: bool = False,
+        payload_fields: Optional[List[str]] = None,
+    ) -> List[Document]:
+        query = np.asarray(query_embedding, dtype=np.float32)
+        if norm := np.linalg.norm(query):
+            query = query / norm
+
+        candidates = []
+        scores = []
+        for partition, rows in self._select(filters):
+            rows = rows[partition.has_embedding[rows]]
+            if len(rows):
+                candidates.extend((partition, row) for row in rows)
+                scores.append(partition.embeddings[rows] @ query)
+
+        if not candidates:
+            return []
+
+        scores = np.concatenate(scores)
+        if len(scores) > top_k:
+            top = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        return [
+            self._to_document(
+                *candidates[i],
+                # the same scaling as the Qdrant document store with cosine similarity
+                score=float((scores[i] + 1) / 2) if scale_score else float(scores[i]),
+                return_embedding=return_embedding,
+                payload_fields=payload_fields,
+            )
+            for i in top
+        ]
+
+    async def _query_groups(
+        self,
+        group_by: str,
+        query_embedding: Optional[List[float]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        limit: int = 10,
+        group_size: int = 100,
+        scale_score: bool = True,
+        return_embedding: bool = False,
+        payload_fields: Optional[List[str]] = None,
+    ) -> List[Document]:
+        """
+        Return the documents of up to `limit` groups sharing the same `group_by` payload value,
+        with up to `group_size` documents per group, the groups are ranked by their best document.
+        """
+        if payload_fields:
+            payload_fields = [*payload_fields, group_by]
+
+        if query_embedding:
+            documents = await self._query_by_embedding(
+                query_embedding,
+                filters=filters,
+                top_k=sum(map(len, self._partitions.values())),
+                scale_score=scale_score,
+                return_embedding=return_embedding,
+                payload_fields=payload_fields,
+            )
+        else:
+            documents = await self._query_by_filters(
+                filters,
+                return_embedding=return_embedding,
+                payload_fields=payload_fields,
+            )
+
+        groups: Dict[Any, List[Document]] = {}
+        for document in documents:
+            if (key := document.meta.get(group_by)) is None:
+                continue
+            if key in groups or len(groups) < limit:
+                group = groups.setdefault(key, [])
+                if len(group) < group_size:
+                    group.append(document)
+
+        return [document for group in groups.values() for document in group]
+
+    async def _query_by_filters(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: Optional[int] = None,
+        return_embedding: bool = False,
+        payload_fields: Optional[List[str]] = None,
+    ) -> List[Document]:
+        return [
+            self._to_document(
+                partition,
+                row,
+                return_embedding=return_embedding,
+                payload_fields=payload_fields,
+            )
+            for partition, rows in self._select(filters)
+            for row in rows
+        ]
+
+    async def get_document_ids(
+        self, filters: Optional[Dict[str, Any]] = None
+    ) -> List[str]:
+        return [
+            partition.payloads[row]["id"]
+            for partition, rows in self._select(filters)
+            for row in rows
+        ]
+
+    async def count_documents(self, filters: Optional[Dict[str, Any]] = None) -> int:
+        if not filters:
+            return sum(map(len, self._partitions.values()))
+
+        return sum(len(rows) for _, rows in self._select(filters))
+
+    async def delete_documents(self, filters: Optional[Dict[str, Any]] = None):
+        async with self._lock:
+            changed = []
+            for partition, rows in list(self._select(filters)):
+                keep = np.ones(len(partition), dtype=bool)
+                keep[rows] = False
+                changed.append(
+                    _Partition(
+                        project_id=partition.project_id,
+                        payloads=[
+                            payload
+                            for payload, kept in zip(partition.payloads, keep)
+                            if kept
+                        ],
+                        embeddings=partition.embeddings[keep],
+                        has_embedding=partition.has_embedding[keep],
+                    )
+                )
+
+            await self._commit(changed)
+
+    async def write_documents(
+        self, documents: List[Document], policy: DuplicatePolicy = DuplicatePolicy.FAIL
+    ):
+        for doc in documents:
+            if not isinstance(doc, Document):
+                msg = f"DocumentStore.write_documents() expects a list of Documents but got an element of {type(doc)}."
+                raise ValueError(msg)
+
+        if len(documents) == 0:
+            logger.warning(
+                "Calling EmbeddedDocumentStore.write_documents() with empty list"
+            )
+            return 0
+
+        async with self._lock:
+            # the last document wins among the documents with the same id
+            documents = list({document.id: document for document in documents}.values())
+            existing = {
+                payload["id"]: partition.project_id
+                for partition in self._partitions.values()
+                for payload in partition.payloads
+            }
+
+            if policy == DuplicatePolicy.SKIP:
+                documents = [
+                    document for document in documents if document.id not in existing
+                ]
+            elif policy != DuplicatePolicy.OVERWRITE:
+                if duplicates := [
+                    document.id for document in documents if document.id in existing
+                ]:
+                    msg = f"Document with ids '{', '.join(duplicates)} already exists in index = '{self.index}'."
+                    raise DuplicateDocumentError(msg)
+
+            if not documents:
+                return 0
+
+            if not self.embedding_dim:
+                self.embedding_dim = next(
+                    (len(d.embedding) for d in documents if d.embedding), 0
+                )
+
+            overwritten = {document.id for document in documents}
+            by_project: Dict[Optional[str], List[Document]] = {}
+            for document in documents:
+                by_project.setdefault(document.meta.get("project_id"), []).append(
+                    document
+                )
+
+            changed = []
+            for project_id in {
+                *by_project,
+                *(existing[id] for id in overwritten if id in existing),
+            }:
+                partition = self._partitions.get(project_id) or _Partition(
+                    project_id=project_id,
+                    embeddings=np.zeros((0, self.embedding_dim), dtype=np.float32),
+                )
+                keep = np.fromiter(
+                    (
+                        payload["id"] not in overwritten
+                        for payload in partition.payloads
+                    ),
+                    dtype=bool,
+                    count=len(partition),
+                )
+                new_documents = by_project.get(project_id, [])
+                embeddings = np.zeros(
+                    (len(new_documents), self.embedding_dim), dtype=np.float32
+                )
+                for i, document in enumerate(new_documents):
+                    if document.embedding:
+                        embedding = np.asarray(document.embedding, dtype=np.float32)
+                        embeddings[i] = embedding / (np.linalg.norm(embedding) or 1)
+
+                changed.append(
+                    _Partition(
+                        project_id=project_id,
+                        payloads=[
+                            payload
+                            for payload, kept in zip(partition.payloads, keep)
+                            if kept
+                        ]
+                        + [
+                            {
+                                "id": document.id,
+                                "content": document.content,
+                                **document.meta,
+                            }
+                            for document in new_documents
+                        ],
+                        embeddings=np.concatenate(
+                            [partition.embeddings[keep], embeddings]
+                        ),
+                        has_embedding=np.concatenate(
+                            [
+                                partition.has_embedding[keep],
+                                [bool(d.embedding) for d in new_documents],
+                            ]
+                        ).astype(bool),
+                    )
+                )
+
+            await self._commit(changed)
+
+        return len(documents)
+
+    async def _commit(self, partitions: List[_Partition]):
+        for partition in partitions:
+            if partition:
+                self._partitions[partition.project_id] = partition
+            else:
+                self._partitions.pop(partition.project_id, None)
+
+        if self._path is not None:
+            await asyncio.gather(
+                *[
+                    asyncio.to_thread(self._persist, partition)
+                    for partition in partitions
+                ]
+            )
+
+
+@component
+class EmbeddedEmbeddingRetriever:
+    def __init__(
+        self,
+        document_store: EmbeddedDocumentStore,
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: int = 10,
+        scale_score: bool = True,
+        return_embedding: bool = False,
+        payload_fields: Optional[List[str]] = None,
+        group_by: Optional[str] = None,
+        group_size: int = 100,
+    ):
+        self._document_store = document_store
+        self._filters = filters
+        self._top_k = top_k
+        self._scale_score = scale_score
+        self._return_embedding = return_embedding
+        self._payload_fields = payload_fields
+        self._group_by = group_by
+        self._group_size = group_size
+
+    @component.output_types(documents=List[Document])
+    async def run(
+        self,
+        query_embedding: List[float],
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: Optional[int] = None,
+        scale_score: Optional[bool] = None,
+        return_embedding: Optional[bool] = None,
+        # the embedded store has no sparse vectors, the searches are dense only
+        query_sparse_embedding: Optional[SparseEmbedding] = None,
+    ):
+        if self._group_by:
+            docs = await self._document_store._query_groups(
+                group_by=self._group_by,
+                query_embedding=query_embedding,
+                filters=filters or self._filters,
+                limit=top_k or self._top_k,
+                group_size=self._group_size,
+                scale_score=scale_score or self._scale_score,
+                return_embedding=return_embedding or self._return_embedding,
+                payload_fields=self._payload_fields,
+            )
+        elif query_embedding:
+            docs = await self._document_store._query_by_embedding(
+                query_embedding=query_embedding,
+                filters=filters or self._filters,
+                top_k=top_k or self._top_k,
+                scale_score=scale_score or self._scale_score,
+                return_embedding=return_embedding or self._return_embedding,
+                payload_fields=self._payload_fields,
+            )
+        else:
+            docs = await self._document_store._query_by_filters(
+                filters=filters,
+                top_k=top_k,
+                return_embedding=return_embedding or self._return_embedding,
+                payload_fields=self._payload_fields,
+            )
+
+        return {"documents": docs}
+
+
+@provider("embedded")
+class EmbeddedProvider(DocumentStoreProvider):
+    def __init__(
+        self,
+        path: Optional[str] = os.getenv("EMBEDDED_STORE_PATH") or None,
+        embedding_model_dim: int = (
+            int(os.getenv("EMBEDDING_MODEL_DIMENSION"))
+            if os.getenv("EMBEDDING_MODEL_DIMENSION")
+            else 0
+        ),
+        recreate_index: bool = (
+            bool(os.getenv("SHOULD_FORCE_DEPLOY"))
+            if os.getenv("SHOULD_FORCE_DEPLOY")
+            else False
+        ),
+        **_,
+    ):
+        self._path = path
+        self._embedding_model_dim = embedding_model_dim
+        self._stores: Dict[str, EmbeddedDocumentStore] = {}
+        self._reset_document_store(recreate_index)
+
+    def _reset_document_store(self, recreate_index: bool):
+        self.get_store(recreate_index=recreate_index)
+        self.get_store(dataset_name="table_descriptions", recreate_index=recreate_index)
+        self.get_store(dataset_name="view_questions", recreate_index=recreate_index)
+        self.get_store(dataset_name="sql_pairs", recreate_index=recreate_index)
+        self.get_store(dataset_name="instructions", recreate_index=recreate_index)
+        self.get_store(dataset_name="project_meta", recreate_index=recreate_index)
+
+    def get_store(
+        self,
+        dataset_name: Optional[str] = None,
+        recreate_index: bool = False,
+    ):
+        index = dataset_name or "Document"
+        if not recreate_index and index in self._stores:
+            return self._stores[index]
+
+        self._stores[index] = EmbeddedDocumentStore(
+            index=index,
+            embedding_dim=self._embedding_model_dim,
+            path=self._path,
+            recreate_index=recreate_index,
+        )
+
+        return self._stores[index]
+
+    def get_retriever(
+        self,
+        document_store: EmbeddedDocumentStore,
+        top_k: int = 10,
+        payload_fields: Optional[List[str]] = None,
+        group_by: Optional[str] = None,
+        group_size: int = 100,
+    ):
+        return EmbeddedEmbeddingRetriever(
+            document_store=document_store,
+            top_k=top_k,
+            payload_fields=payload_fields,
+            group_by=group_by,
+            group_size=group_size,
+        )
@@ -1,10 +1,15 @@
+import asyncio
+import contextlib
 import logging
 import os
-from typing import Any, Dict, List, Optional
+import re
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import qdrant_client
 from haystack import Document, component
+from haystack.dataclasses import SparseEmbedding
+from haystack.document_stores.errors import DuplicateDocumentError
 from haystack.document_stores.types import DuplicatePolicy
 from haystack.utils import Secret
 from haystack_integrations.components.retrievers.qdrant import QdrantEmbeddingRetriever
@@ -25,10 +30,21 @@ from qdrant_client.http import models as rest
 from tqdm import tqdm
 
 from src.core.provider import DocumentStoreProvider
+from src.providers.document_store import is_project_filter, project_id_of
 from src.providers.loader import provider
 
 logger = logging.getLogger("wren-ai-service")
 
+# the shard key of the documents without project id, when the collections are sharded by project
+DEFAULT_SHARD_KEY = "default"
+_MISSING_SHARD_KEY = re.compile(
+    r"shard key .* (not found|does not exist|doesn't exist)", re.IGNORECASE
+)
+
+
+def _is_missing_shard_key(error: Exception) -> bool:
+    return bool(_MISSING_SHARD_KEY.search(str(error)))
+
 
 def convert_haystack_documents_to_qdrant_points(
     documents: List[Document],
@@ -52,6 +68,7 @@ def convert_haystack_documents_to_qdrant_points(
 
         else:
             vector = payload.pop("embedding") or {}
+            payload.pop("sparse_embedding", None)
         _id = convert_id(payload.get("id"))
 
         point = rest.PointStruct(
@@ -63,6 +80,116 @@ def convert_haystack_documents_to_qdrant_points(
     return points
 
 
+def convert_filters(
+    filters: Optional[Dict[str, Any] | rest.Filter],
+) -> Optional[rest.Filter]:
+    """
+    Convert haystack filters to qdrant filters, like `convert_filters_to_qdrant` except that
+
+    - `==` and `in` are exact keyword matches (`MatchValue` and a single `MatchAny`), which are served
+      by the payload indexes, instead of full text matches and one condition per value
+    - `==` with a `None` value matches the documents without the field
+    """
+    if not filters or isinstance(filters, rest.Filter):
+        return filters
+
+    condition = _convert_filter(filters)
+    return (
+        condition
+        if isinstance(condition, rest.Filter)
+        else rest.Filter(must=[condition])
+    )
+
+
+def _convert_filter(filters: Dict[str, Any]) -> rest.Filter | rest.Condition:
+    operator = filters.get("operator")
+    if operator in ("AND", "OR"):
+        conditions = [_convert_filter(condition) for condition in filters["conditions"]]
+        return (
+            rest.Filter(must=conditions)
+            if operator == "AND"
+            else rest.Filter(should=conditions)
+        )
+
+    field, value = filters.get("field"), filters.get("value")
+    if operator == "==" and value is None:
+        return rest.IsEmptyCondition(is_empty=rest.PayloadField(key=field))
+    if operator == "==" and isinstance(value, (str, int, bool)):
+        return rest.FieldCondition(key=field, match=rest.MatchValue(value=value))
+    if (
+        operator == "in"
+        and isinstance(value, list)
+        and all(
+            isinstance(item, (str, int)) and not isinstance(item, bool)
+            for item in value
+        )
+    ):
+        return rest.FieldCondition(key=field, match=rest.MatchAny(any=value))
+
+    return convert_filters_to_qdrant(filters)
+
+
+# the payload fields the pipelines filter on per collection, besides `project_id` and `id`
+PAYLOAD_FIELDS_TO_INDEX = {
+    "Document": {"type": "keyword", "name": "keyword"},
+    "table_descriptions": {"type": "keyword", "name": "keyword"},
+    "sql_pairs": {"sql_pair_id": "keyword"},
+    "instructions": {
+        "instruction_id": "keyword",
+        "is_default": "bool",
+        "scope": "keyword",
+    },
+}
+
+# (location, api_key, timeout, prefer_grpc, grpc_port) -> (sync client, async client)
+_CLIENTS: Dict[
+    tuple, Tuple[qdrant_client.QdrantClient, qdrant_client.AsyncQdrantClient]
+] = {}
+
+
+def _payload_selector(payload_fields: Optional[List[str]]) -> bool | List[str]:
+    """
+    Select only the given payload fields, along with the document id, or the whole payload if no fields are given.
+    """
+    if not payload_fields:
+        return True
+    return list(dict.fromkeys(["id", *payload_fields]))
+
+
+def get_clients(
+    location: Optional[str],
+    api_key: Optional[Secret] = None,
+    timeout: Optional[int] = None,
+    prefer_grpc: bool = False,
+    grpc_port: int = 6334,
+) -> Tuple[qdrant_client.QdrantClient, qdrant_client.AsyncQdrantClient]:
+    """
+    Return the clients shared by all the collections and pipelines using the same Qdrant endpoint,
+    so the service keeps one connection pool (or gRPC channel) per endpoint instead of one per store.
+    """
+    key = (
+        location,
+        api_key.resolve_value() if api_key else None,
+        timeout,
+        prefer_grpc,
+        grpc_port,
+    )
+    if key not in _CLIENTS:
+        params = {
+            "location": location,
+            "api_key": key[1],
+            "timeout": timeout,
+            "prefer_grpc": prefer_grpc,
+            "grpc_port": grpc_port,
+        }
+        _CLIENTS[key] = (
+            qdrant_client.QdrantClient(**params),
+            qdrant_client.AsyncQdrantClient(**params),
+        )
+
+    return _CLIENTS[key]
+
+
 class AsyncQdrantDocumentStore(QdrantDocumentStore):
     def __init__(
         self,
@@ -101,6 +228,10 @@ class AsyncQdrantDocumentStore(QdrantDocumentStore):
         write_batch_size: int = 100,
         scroll_size: int = 10_000,
         payload_fields_to_index: Optional[List[dict]] = None,
+        client: Optional[qdrant_client.QdrantClient] = None,
+        async_client: Optional[qdrant_client.AsyncQdrantClient] = None,
+        max_concurrent_writes: int = 4,
+        shard_by_project: bool = False,
     ):
         super(AsyncQdrantDocumentStore, self).__init__(
             location=location,
@@ -140,7 +271,13 @@ class AsyncQdrantDocumentStore(QdrantDocumentStore):
             payload_fields_to_index=payload_fields_to_index,
         )
 
-        self.async_client = qdrant_client.AsyncQdrantClient(
+        self._shared_client = client
+        self.max_concurrent_writes = max_concurrent_writes
+        # route the documents of each project to its own custom shard key,
+        # see https://qdrant.tech/documentation/guides/distributed_deployment/#user-defined-sharding
+        self.shard_by_project = shard_by_project
+        self._shard_keys = set()
+        self.async_client = async_client or qdrant_client.AsyncQdrantClient(
             location=location,
             url=url,
             port=port,
@@ -156,11 +293,223 @@ class AsyncQdrantDocumentStore(QdrantDocumentStore):
             metadata=metadata or {},
         )
 
-        # to improve the indexing performance
+        # the collection is set up with the async client on first use, see `_ensure_collection`
+        self._collection_ready = False
+        self._collection_lock = asyncio.Lock()
+
+    @property
+    def client(self):
+        if not self._client and self._shared_client is not None:
+            self._client = self._shared_client
+            # Make sure the collection is properly set up
+            self._set_up_collection(
+                self.index,
+                self.embedding_dim,
+                self.recreate_index,
+                self.similarity,
+                self.use_sparse_embeddings,
+                self.sparse_idf,
+                self.on_disk,
+                self.payload_fields_to_index,
+            )
+
+        return super(AsyncQdrantDocumentStore, self).client
+
+    async def _ensure_collection(self):
+        """
+        Set up the collection once for the lifetime of the store, without blocking the event loop.
+        """
+        if self._collection_ready:
+            return
+
+        async with self._collection_lock:
+            if not self._collection_ready:
+                await self._set_up_collection_async()
+                self._collection_ready = True
+
+    async def _set_up_collection_async(self):
+        distance = self.get_distance(self.similarity)
+        exists = await self.async_client.collection_exists(self.index)
+
+        if self.recreate_index or not exists:
+            await self._recreate_collection_async(distance, exists)
+        else:
+            self._check_collection(
+                await self.async_client.get_collection(self.index), distance
+            )
+
+        # to improve the indexing and filtering performance, the filtered payload fields are indexed
         # see https://qdrant.tech/documentation/guides/multiple-partitions/?q=mul#calibrate-performance
-        self.client.create_payload_index(
-            collection_name=index, field_name="project_id", field_schema="keyword"
+        payload_fields_to_index = {
+            "project_id": "keyword",
+            "id": "keyword",
+            **{
+                payload_index["field_name"]: payload_index["field_schema"]
+                for payload_index in self.payload_fields_to_index or []
+            },
+        }
+        await asyncio.gather(
+            *(
+                self.async_client.create_payload_index(
+                    collection_name=self.index,
+                    field_name=field_name,
+                    field_schema=field_schema,
+                )
+                for field_name, field_schema in payload_fields_to_index.items()
+            )
+        )
+
+    async def _recreate_collection_async(self, distance: rest.Distance, exists: bool):
+        vectors_config = rest.VectorParams(
+            size=self.embedding_dim, on_disk=self.on_disk, distance=distance
+        )
+        sparse_vectors_config = None
+        if self.use_sparse_embeddings:
+            vectors_config = {DENSE_VECTORS_NAME: vectors_config}
+            sparse_vectors_config = {
+                SPARSE_VECTORS_NAME: rest.SparseVectorParams(
+                    index=rest.SparseIndexParams(on_disk=self.on_disk),
+                    modifier=rest.Modifier.IDF if self.sparse_idf else None,
+                ),
+            }
+
+        if exists:
+            await self.async_client.delete_collection(self.index)
+
+        await self.async_client.create_collection(
+            collection_name=self.index,
+            vectors_config=vectors_config,
+            sparse_vectors_config=sparse_vectors_config,
+            shard_number=self.shard_number,
+            replication_factor=self.replication_factor,
+            write_consistency_factor=self.write_consistency_factor,
+            on_disk_payload=self.on_disk_payload,
+            hnsw_config=self.hnsw_config,
+            optimizers_config=self.optimizers_config,
+            wal_config=self.wal_config,
+            quantization_config=self.quantization_config,
+            init_from=self.init_from,
+            sharding_method=(
+                rest.ShardingMethod.CUSTOM if self.shard_by_project else None
+            ),
+        )
+        self._shard_keys.clear()
+
+    def _check_collection(
+        self, collection_info: rest.CollectionInfo, distance: rest.Distance
+    ):
+        vectors = collection_info.config.params.vectors
+        has_named_vectors = isinstance(vectors, dict) and DENSE_VECTORS_NAME in vectors
+
+        if self.use_sparse_embeddings != has_named_vectors:
+            msg = (
+                f"Collection '{self.index}' already exists in Qdrant, "
+                f"but it has been originally created {'without' if self.use_sparse_embeddings else 'with'} "
+                "sparse embedding vectors, please recreate the collection."
+            )
+            raise document_store.QdrantStoreError(msg)
+
+        if has_named_vectors:
+            vectors = vectors[DENSE_VECTORS_NAME]
+
+        if vectors.distance != distance:
+            msg = (
+                f"Collection '{self.index}' already exists in Qdrant, "
+                f"but it is configured with a similarity '{vectors.distance.name}'. "
+                f"If you want to use that collection, but with a different "
+                f"similarity, please set `recreate_index=True` argument."
+            )
+            raise ValueError(msg)
+
+        if vectors.size != self.embedding_dim:
+            msg = (
+                f"Collection '{self.index}' already exists in Qdrant, "
+                f"but it is configured with a vector size '{vectors.size}'. "
+                f"If you want to use that collection, but with a different "
+                f"vector size, please set `recreate_index=True` argument."
+            )
+            raise ValueError(msg)
+
+        sharded = (
+            collection_info.config.params.sharding_method == rest.ShardingMethod.CUSTOM
         )
+        if self.shard_by_project != sharded:
+            msg = (
+                f"Collection '{self.index}' already exists in Qdrant, "
+                f"but it has been originally created {'with' if sharded else 'without'} "
+                "shard keys per project, please migrate the collection with "
+                "tools/migrate_qdrant_shards.py or recreate it."
+            )
+            raise document_store.QdrantStoreError(msg)
+
+    def _shard_key(self, project_id: Optional[str]) -> Optional[str]:
+        """
+        Return the shard key of a project, or None if the collection is not sharded.
+        """
+        if not self.shard_by_project:
+            return None
+
+        return project_id or DEFAULT_SHARD_KEY
+
+    async def _create_shard_key(self, shard_key: Optional[str]):
+        """
+        Create the shard key of a project on its first write, the reads never create shards.
+        """
+        if shard_key is None or shard_key in self._shard_keys:
+            return
+
+        try:
+            await self.async_client.create_shard_key(self.index, shard_key)
+        except Exception as e:
+            if "already exists" not in str(e):
+                raise
+        self._shard_keys.add(shard_key)
+
+    def _shard_key_selector(self, filters: Optional[Dict[str, Any]]) -> Optional[str]:
+        """
+        Route the operations filtered by a project to its shard, the others go to all the shards.
+        """
+        single_project, project_id = project_id_of(filters)
+        if not single_project:
+            return None
+
+        return self._shard_key(project_id)
+
+    @contextlib.contextmanager
+    def _missing_shard_is_empty(self, shard_key: Optional[str]):
+        """
+        A project without shard, e.g. never indexed or deleted, has no documents:
+        the operations on its shard are skipped, and the results are left to their empty defaults.
+        """
+        try:
+            yield
+        except Exception as e:
+            if shard_key is None or not _is_missing_shard_key(e):
+                raise
+            self._shard_keys.discard(shard_key)
+
+    async def _handle_duplicate_documents_async(
+        self, documents: List[Document], policy: DuplicatePolicy
+    ) -> List[Document]:
+        if policy not in (DuplicatePolicy.SKIP, DuplicatePolicy.FAIL):
+            return documents
+
+        documents = self._drop_duplicate_documents(documents)
+        records = await self.async_client.retrieve(
+            collection_name=self.index,
+            ids=[convert_id(document.id) for document in documents],
+            with_payload=["id"],
+            with_vectors=False,
+        )
+        ids_exist_in_db = {record.payload["id"] for record in records}
+
+        if ids_exist_in_db and policy == DuplicatePolicy.FAIL:
+            msg = f"Document with ids '{', '.join(ids_exist_in_db)} already exists in index = '{self.index}'."
+            raise DuplicateDocumentError(msg)
+
+        return [
+            document for document in documents if document.id not in ids_exist_in_db
+        ]
 
     async def _query_by_embedding(
         self,
@@ -169,30 +518,27 @@ class AsyncQdrantDocumentStore(QdrantDocumentStore):
         top_k: int = 10,
         scale_score: bool = True,
         return_embedding: bool = False,
+        payload_fields: Optional[List[str]] = None,
     ) -> List[Document]:
-        qdrant_filters = convert_filters_to_qdrant(filters)
+        await self._ensure_collection()
+        qdrant_filters = convert_filters(filters)
+        shard_key_selector = self._shard_key_selector(filters)
 
-        points = await self.async_client.search(
-            collection_name=self.index,
-            query_vector=rest.NamedVector(
-                name=DENSE_VECTORS_NAME if self.use_sparse_embeddings else "",
-                vector=query_embedding,
-            ),
-            search_params=(
-                rest.SearchParams(
-                    quantization=rest.QuantizationSearchParams(
-                        rescore=True,
-                        oversampling=3.0,
-                    ),
-                )
-                if len(query_embedding)
-                >= 1024  # reference: https://qdrant.tech/articles/binary-quantization/#when-should-you-not-use-bq
-                else None
-            ),
-            query_filter=qdrant_filters,
-            limit=top_k,
-            with_vectors=return_embedding,
-        )
+        points = []
+        with self._missing_shard_is_empty(shard_key_selector):
+            points = await self.async_client.search(
+                collection_name=self.index,
+                query_vector=rest.NamedVector(
+                    name=DENSE_VECTORS_NAME if self.use_sparse_embeddings else "",
+                    vector=query_embedding,
+                ),
+                search_params=self._search_params(query_embedding),
+                query_filter=qdrant_filters,
+                limit=top_k,
+                shard_key_selector=shard_key_selector,
+                with_payload=_payload_selector(payload_fields),
+                with_vectors=return_embedding,
+            )
         results = [
             convert_qdrant_point_to_haystack_document(
                 point, use_sparse_embeddings=self.use_sparse_embeddings
@@ -201,33 +547,172 @@ class AsyncQdrantDocumentStore(QdrantDocumentStore):
         ]
         if scale_score:
             for document in results:
-                score = document.score
-                if self.similarity == "cosine":
-                    score = (score + 1) / 2
-                else:
-                    score = float(1 / (1 + np.exp(-score / 100)))
-                document.score = score
+                document.score = self._scale_score(document.score)
+        return results
+
+    async def _query_hybrid(
+        self,
+        query_embedding: List[float],
+        query_sparse_embedding: SparseEmbedding,
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: int = 10,
+        prefetch_limit: Optional[int] = None,
+        return_embedding: bool = False,
+        payload_fields: Optional[List[str]] = None,
+    ) -> List[Document]:
+        """
+        Fuse the dense and sparse searches with Reciprocal Rank Fusion, the scores are the fused ranks.
+        """
+        await self._ensure_collection()
+        qdrant_filters = convert_filters(filters)
+        prefetch_limit = prefetch_limit or top_k * 2
+        shard_key_selector = self._shard_key_selector(filters)
+
+        points = []
+        with self._missing_shard_is_empty(shard_key_selector):
+            points = (
+                await self.async_client.query_points(
+                    collection_name=self.index,
+                    prefetch=[
+                        rest.Prefetch(
+                            query=query_embedding,
+                            using=DENSE_VECTORS_NAME,
+                            params=self._search_params(query_embedding),
+                            filter=qdrant_filters,
+                            limit=prefetch_limit,
+                        ),
+                        rest.Prefetch(
+                            query=rest.SparseVector(
+                                indices=query_sparse_embedding.indices,
+                                values=query_sparse_embedding.values,
+                            ),
+                            using=SPARSE_VECTORS_NAME,
+                            filter=qdrant_filters,
+                            limit=prefetch_limit,
+                        ),
+                    ],
+                    query=rest.FusionQuery(fusion=rest.Fusion.RRF),
+                    limit=top_k,
+                    shard_key_selector=shard_key_selector,
+                    with_payload=_payload_selector(payload_fields),
+                    with_vectors=return_embedding,
+                )
+            ).points
+
+        return [
+            convert_qdrant_point_to_haystack_document(
+                point, use_sparse_embeddings=self.use_sparse_embeddings
+            )
+            for point in points
+        ]
+
+    async def _query_groups(
+        self,
+        group_by: str,
+        query_embedding: Optional[List[float]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        limit: int = 10,
+        group_size: int = 100,
+        scale_score: bool = True,
+        return_embedding: bool = False,
+        payload_fields: Optional[List[str]] = None,
+    ) -> List[Document]:
+        """
+        Return the documents of up to `limit` groups sharing the same `group_by` payload value,
+        e.g. all the chunks of the tables, with up to `group_size` documents per group, in one call.
+        """
+        await self._ensure_collection()
+        shard_key_selector = self._shard_key_selector(filters)
+
+        groups = []
+        with self._missing_shard_is_empty(shard_key_selector):
+            groups = (
+                await self.async_client.query_points_groups(
+                    collection_name=self.index,
+                    group_by=group_by,
+                    query=query_embedding or None,
+                    using=(
+                        DENSE_VECTORS_NAME
+                        if self.use_sparse_embeddings and query_embedding
+                        else None
+                    ),
+                    search_params=(
+                        self._search_params(query_embedding)
+                        if query_embedding
+                        else None
+                    ),
+                    query_filter=convert_filters(filters),
+                    limit=limit,
+                    group_size=group_size,
+                    shard_key_selector=shard_key_selector,
+                    with_payload=_payload_selector(payload_fields),
+                    with_vectors=return_embedding,
+                )
+            ).groups
+
+        results = []
+        for group in groups:
+            if len(group.hits) == group_size:
+                logger.warning(
+                    f"Group {group.id} of {self.index} may be truncated to {group_size} documents"
+                )
+            for point in group.hits:
+                document = convert_qdrant_point_to_haystack_document(
+                    point, use_sparse_embeddings=self.use_sparse_embeddings
+                )
+                if scale_score and query_embedding:
+                    document.score = self._scale_score(document.score)
+                results.append(document)
+
         return results
 
+    def _search_params(
+        self, query_embedding: List[float]
+    ) -> Optional[rest.SearchParams]:
+        # reference: https://qdrant.tech/articles/binary-quantization/#when-should-you-not-use-bq
+        if len(query_embedding) < 1024:
+            return None
+
+        return rest.SearchParams(
+            quantization=rest.QuantizationSearchParams(
+                rescore=True,
+                oversampling=3.0,
+            ),
+        )
+
+    def _scale_score(self, score: float) -> float:
+        if self.similarity == "cosine":
+            return (score + 1) / 2
+
+        return float(1 / (1 + np.exp(-score / 100)))
+
     async def _query_by_filters(
         self,
         filters: Optional[Dict[str, Any]] = None,
         top_k: Optional[int] = None,
+        return_embedding: bool = False,
+        payload_fields: Optional[List[str]] = None,
     ) -> List[Document]:
-        qdrant_filters = convert_filters_to_qdrant(filters)
+        await self._ensure_collection()
+        qdrant_filters = convert_filters(filters)
+        shard_key_selector = self._shard_key_selector(filters)
         points_list = []
         offset = None
-        while True:
-            points = await self.async_client.scroll(
-                collection_name=self.index,
-                offset=offset,
-                scroll_filter=qdrant_filters,
-                limit=top_k,
-            )
-            points_list.extend(points[0])
-            if points[1] is None:
-                break
-            offset = points[1]
+        with self._missing_shard_is_empty(shard_key_selector):
+            while True:
+                points = await self.async_client.scroll(
+                    collection_name=self.index,
+                    offset=offset,
+                    scroll_filter=qdrant_filters,
+                    limit=top_k or self.scroll_size,
+                    shard_key_selector=shard_key_selector,
+                    with_payload=_payload_selector(payload_fields),
+                    with_vectors=return_embedding,
+                )
+                points_list.extend(points[0])
+                if points[1] is None:
+                    break
+                offset = points[1]
 
         if points_list:
             return [
@@ -239,34 +724,80 @@ class AsyncQdrantDocumentStore(QdrantDocumentStore):
         else:
             return []
 
+    async def get_document_ids(
+        self, filters: Optional[Dict[str, Any]] = None
+    ) -> List[str]:
+        await self._ensure_collection()
+        qdrant_filters = convert_filters(filters)
+        shard_key_selector = self._shard_key_selector(filters)
+        document_ids = []
+        offset = None
+        with self._missing_shard_is_empty(shard_key_selector):
+            while True:
+                points, offset = await self.async_client.scroll(
+                    collection_name=self.index,
+                    offset=offset,
+                    scroll_filter=qdrant_filters,
+                    limit=self.scroll_size,
+                    shard_key_selector=shard_key_selector,
+                    with_payload=["id"],
+                    with_vectors=False,
+                )
+                document_ids.extend(point.payload["id"] for point in points)
+                if offset is None:
+                    break
+
+        return document_ids
+
     async def delete_documents(self, filters: Optional[Dict[str, Any]] = None):
+        await self._ensure_collection()
+        if self.shard_by_project and is_project_filter(filters):
+            # dropping the shard of the project is much cheaper than deleting its points
+            shard_key = self._shard_key(project_id_of(filters)[1])
+            with self._missing_shard_is_empty(shard_key):
+                await self.async_client.delete_shard_key(self.index, shard_key)
+            # the other workers may still know the key, their next write recreates it, see write_documents
+            self._shard_keys.discard(shard_key)
+            return
+
         if not filters:
             qdrant_filters = rest.Filter()
         else:
-            qdrant_filters = convert_filters_to_qdrant(filters)
+            qdrant_filters = convert_filters(filters)
 
+        shard_key_selector = self._shard_key_selector(filters)
         try:
-            await self.async_client.delete(
-                collection_name=self.index,
-                points_selector=qdrant_filters,
-                wait=self.wait_result_from_api,
-            )
+            with self._missing_shard_is_empty(shard_key_selector):
+                await self.async_client.delete(
+                    collection_name=self.index,
+                    points_selector=qdrant_filters,
+                    wait=self.wait_result_from_api,
+                    shard_key_selector=shard_key_selector,
+                )
         except KeyError:
             logger.warning(
                 "Called QdrantDocumentStore.delete_documents() on a non-existing ID",
             )
 
     async def count_documents(self, filters: Optional[Dict[str, Any]] = None) -> int:
+        await self._ensure_collection()
         if not filters:
             qdrant_filters = rest.Filter()
         else:
-            qdrant_filters = convert_filters_to_qdrant(filters)
+            qdrant_filters = convert_filters(filters)
 
-        return (
-            await self.async_client.count(
-                collection_name=self.index, count_filter=qdrant_filters
-            )
-        ).count
+        shard_key_selector = self._shard_key_selector(filters)
+        count = 0
+        with self._missing_shard_is_empty(shard_key_selector):
+            count = (
+                await self.async_client.count(
+                    collection_name=self.index,
+                    count_filter=qdrant_filters,
+                    shard_key_selector=shard_key_selector,
+                )
+            ).count
+
+        return count
 
     async def write_documents(
         self, documents: List[Document], policy: DuplicatePolicy = DuplicatePolicy.FAIL
@@ -276,16 +807,7 @@ class AsyncQdrantDocumentStore(QdrantDocumentStore):
                 msg = f"DocumentStore.write_documents() expects a list of Documents but got an element of {type(doc)}."
                 raise ValueError(msg)
 
-        self._set_up_collection(
-            self.index,
-            self.embedding_dim,
-            False,
-            self.similarity,
-            self.use_sparse_embeddings,
-            self.sparse_idf,
-            self.on_disk,
-            self.payload_fields_to_index,
-        )
+        await self._ensure_collection()
 
         if len(documents) == 0:
             logger.warning(
@@ -293,30 +815,94 @@ class AsyncQdrantDocumentStore(QdrantDocumentStore):
             )
             return
 
-        document_objects = self._handle_duplicate_documents(
+        document_objects = await self._handle_duplicate_documents_async(
             documents=documents,
             policy=policy,
         )
 
-        batched_documents = document_store.get_batches_from_generator(
-            document_objects, self.write_batch_size
-        )
+        if not document_objects:
+            return 0
+
+        documents_by_project: Dict[Optional[str], List[Document]] = {}
+        for document in document_objects:
+            project_id = (
+                document.meta.get("project_id") if self.shard_by_project else None
+            )
+            documents_by_project.setdefault(project_id, []).append(document)
+
+        # the batches of each shard, the collection has a single group without sharding
+        shards = [
+            (
+                self._shard_key(project_id),
+                [
+                    convert_haystack_documents_to_qdrant_points(
+                        document_batch,
+                        use_sparse_embeddings=self.use_sparse_embeddings,
+                    )
+                    for document_batch in document_store.get_batches_from_generator(
+                        documents, self.write_batch_size
+                    )
+                ],
+            )
+            for project_id, documents in documents_by_project.items()
+        ]
+        for shard_key, _ in shards:
+            await self._create_shard_key(shard_key)
+        semaphore = asyncio.Semaphore(self.max_concurrent_writes)
+
         with tqdm(
             total=len(document_objects), disable=not self.progress_bar
         ) as progress_bar:
-            for document_batch in batched_documents:
-                batch = convert_haystack_documents_to_qdrant_points(
-                    document_batch,
-                    use_sparse_embeddings=self.use_sparse_embeddings,
-                )
 
-                await self.async_client.upsert(
-                    collection_name=self.index,
-                    points=batch,
-                    wait=self.wait_result_from_api,
+            async def _upsert(
+                batch: List[rest.PointStruct], wait: bool, shard_key: Optional[str]
+            ):
+                async with semaphore:
+                    try:
+                        await self.async_client.upsert(
+                            collection_name=self.index,
+                            points=batch,
+                            wait=wait,
+                            shard_key_selector=shard_key,
+                        )
+                    except Exception as e:
+                        if shard_key is None or not _is_missing_shard_key(e):
+                            raise
+                        # the shard was dropped by another worker, e.g. on delete_documents
+                        self._shard_keys.discard(shard_key)
+                        await self._create_shard_key(shard_key)
+                        await self.async_client.upsert(
+                            collection_name=self.index,
+                            points=batch,
+                            wait=wait,
+                            shard_key_selector=shard_key,
+                        )
+                progress_bar.update(len(batch))
+
+            # keep several batches in flight without waiting for them to be applied,
+            # then write the last batch of each shard as a barrier: the updates are applied in order,
+            # so once it is applied, all the previous batches of the shard are applied as well
+            tasks = [
+                asyncio.create_task(_upsert(batch, wait=False, shard_key=shard_key))
+                for shard_key, batches in shards
+                for batch in batches[:-1]
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+
+            await asyncio.gather(
+                *(
+                    _upsert(
+                        batches[-1], wait=self.wait_result_from_api, shard_key=shard_key
+                    )
+                    for shard_key, batches in shards
                 )
+            )
 
-                progress_bar.update(self.write_batch_size)
         return len(document_objects)
 
 
@@ -328,6 +914,9 @@ class AsyncQdrantEmbeddingRetriever(QdrantEmbeddingRetriever):
         top_k: int = 10,
         scale_score: bool = True,
         return_embedding: bool = False,
+        payload_fields: Optional[List[str]] = None,
+        group_by: Optional[str] = None,
+        group_size: int = 100,
     ):
         super(AsyncQdrantEmbeddingRetriever, self).__init__(
             document_store=document_store,
@@ -337,6 +926,11 @@ class AsyncQdrantEmbeddingRetriever(QdrantEmbeddingRetriever):
             return_embedding=return_embedding,
         )
         self._document_store = document_store
+        # the payload fields used by the pipeline, e.g. ["content", "name"], or None for the whole payload
+        self._payload_fields = payload_fields
+        # retrieve whole groups of documents, e.g. all the chunks of a table, top_k is then the number of groups
+        self._group_by = group_by
+        self._group_size = group_size
 
     @component.output_types(documents=List[Document])
     async def run(
@@ -346,19 +940,47 @@ class AsyncQdrantEmbeddingRetriever(QdrantEmbeddingRetriever):
         top_k: Optional[int] = None,
         scale_score: Optional[bool] = None,
         return_embedding: Optional[bool] = None,
+        query_sparse_embedding: Optional[SparseEmbedding] = None,
     ):
-        if query_embedding:
+        if self._group_by:
+            docs = await self._document_store._query_groups(
+                group_by=self._group_by,
+                query_embedding=query_embedding,
+                filters=filters or self._filters,
+                limit=top_k or self._top_k,
+                group_size=self._group_size,
+                scale_score=scale_score or self._scale_score,
+                return_embedding=return_embedding or self._return_embedding,
+                payload_fields=self._payload_fields,
+            )
+        elif (
+            query_embedding
+            and query_sparse_embedding
+            and self._document_store.use_sparse_embeddings
+        ):
+            docs = await self._document_store._query_hybrid(
+                query_embedding=query_embedding,
+                query_sparse_embedding=query_sparse_embedding,
+                filters=filters or self._filters,
+                top_k=top_k or self._top_k,
+                return_embedding=return_embedding or self._return_embedding,
+                payload_fields=self._payload_fields,
+            )
+        elif query_embedding:
             docs = await self._document_store._query_by_embedding(
                 query_embedding=query_embedding,
                 filters=filters or self._filters,
                 top_k=top_k or self._top_k,
                 scale_score=scale_score or self._scale_score,
                 return_embedding=return_embedding or self._return_embedding,
+                payload_fields=self._payload_fields,
             )
         else:
             docs = await self._document_store._query_by_filters(
                 filters=filters,
                 top_k=top_k,
+                return_embedding=return_embedding or self._return_embedding,
+                payload_fields=self._payload_fields,
             )
 
         return {"documents": docs}
@@ -383,12 +1005,37 @@ class QdrantProvider(DocumentStoreProvider):
             if os.getenv("SHOULD_FORCE_DEPLOY")
             else False
         ),
+        prefer_grpc: bool = (
+            os.getenv("QDRANT_PREFER_GRPC", "").lower() in ("1", "true")
+        ),
+        grpc_port: int = int(os.getenv("QDRANT_GRPC_PORT", 6334)),
+        write_batch_size: int = 100,
+        max_concurrent_writes: int = 4,
+        scroll_size: int = 1_000,
+        shard_by_project: bool = (
+            os.getenv("QDRANT_SHARD_BY_PROJECT", "").lower() in ("1", "true")
+        ),
+        hybrid_table_retrieval: bool = (
+            os.getenv("QDRANT_HYBRID_TABLE_RETRIEVAL", "").lower() in ("1", "true")
+        ),
+        collections: Optional[Dict[str, dict]] = None,
         **_,
     ):
         self._location = location
         self._api_key = Secret.from_token(api_key) if api_key else None
         self._timeout = timeout
         self._embedding_model_dim = embedding_model_dim
+        self._prefer_grpc = prefer_grpc
+        self._grpc_port = grpc_port
+        self._write_batch_size = write_batch_size
+        self._max_concurrent_writes = max_concurrent_writes
+        self._scroll_size = scroll_size
+        self._shard_by_project = shard_by_project
+        # index the sparse vectors of the table descriptions, to fuse the dense and sparse searches of the tables
+        self._hybrid_table_retrieval = hybrid_table_retrieval
+        # per collection overrides, e.g. {"Document": {"write_batch_size": 200}}
+        self._collections = collections or {}
+        self._stores: Dict[str, AsyncQdrantDocumentStore] = {}
         self._reset_document_store(recreate_index)
 
     def _reset_document_store(self, recreate_index: bool):
@@ -404,14 +1051,48 @@ class QdrantProvider(DocumentStoreProvider):
         dataset_name: Optional[str] = None,
         recreate_index: bool = False,
     ):
-        return AsyncQdrantDocumentStore(
+        index = dataset_name or "Document"
+        # the stores are shared by the pipelines, the collection is only set up once
+        if not recreate_index and index in self._stores:
+            return self._stores[index]
+
+        client, async_client = get_clients(
+            location=self._location,
+            api_key=self._api_key,
+            timeout=self._timeout,
+            prefer_grpc=self._prefer_grpc,
+            grpc_port=self._grpc_port,
+        )
+        self._stores[index] = AsyncQdrantDocumentStore(
             location=self._location,
             api_key=self._api_key,
             embedding_dim=self._embedding_model_dim,
-            index=dataset_name or "Document",
+            index=index,
             recreate_index=recreate_index,
             on_disk=True,
             timeout=self._timeout,
+            prefer_grpc=self._prefer_grpc,
+            grpc_port=self._grpc_port,
+            client=client,
+            async_client=async_client,
+            payload_fields_to_index=[
+                {"field_name": field_name, "field_schema": field_schema}
+                for field_name, field_schema in PAYLOAD_FIELDS_TO_INDEX.get(
+                    index, {}
+                ).items()
+            ],
+            **{
+                "write_batch_size": self._write_batch_size,
+                "max_concurrent_writes": self._max_concurrent_writes,
+                "scroll_size": self._scroll_size,
+                "shard_by_project": self._shard_by_project,
+                **(
+                    {"use_sparse_embeddings": True, "sparse_idf": True}
+                    if self._hybrid_table_retrieval and index == "table_descriptions"
+                    else {}
+                ),
+                **self._collections.get(index, {}),
+            },
             quantization_config=(
                 rest.BinaryQuantization(
                     binary=rest.BinaryQuantizationConfig(
@@ -429,12 +1110,20 @@ class QdrantProvider(DocumentStoreProvider):
             ),
         )
 
+        return self._stores[index]
+
     def get_retriever(
         self,
         document_store: AsyncQdrantDocumentStore,
         top_k: int = 10,
+        payload_fields: Optional[List[str]] = None,
+        group_by: Optional[str] = None,
+        group_size: int = 100,
     ):
         return AsyncQdrantEmbeddingRetriever(
             document_store=document_store,
             top_k=top_k,
+            payload_fields=payload_fields,
+            group_by=group_by,
+            group_size=group_size,
         )
@@ -4,12 +4,17 @@ import os
 from typing import Any, Dict, List, Optional, Tuple
 
 import backoff
+import numpy as np
 import openai
 from haystack import Document, component
 from litellm import aembedding
 
-from src.core.provider import EmbedderProvider
+from src.config import settings
+from src.core.provider import EmbedderProvider, get_embedding_scope
+from src.providers.cache import TieredCache, cache_key
+from src.providers.embedder.scheduler import EmbeddingBatchScheduler
 from src.providers.loader import provider
+from src.providers.singleflight import SingleFlight
 from src.utils import remove_trailing_slash
 
 logger = logging.getLogger("wren-ai-service")
@@ -25,11 +30,23 @@ def _prepare_texts_to_embed(documents: List[Document]) -> List[str]:
 
         # copied from OpenAI embedding_utils (https://github.com/openai/openai-python/blob/main/openai/embeddings_utils.py)
         # replace newlines, which can negatively affect performance.
-        text_to_embed = text_to_embed.replace("\n", " ")
+        text_to_embed = text_to_embed.replace("\n", " ").strip()
         texts_to_embed.append(text_to_embed)
     return texts_to_embed
 
 
+def _dump_embedding(embedding: List[float]) -> bytes:
+    return np.asarray(embedding, dtype=np.float32).tobytes()
+
+
+def _load_embedding(value: bytes) -> List[float]:
+    return np.frombuffer(value, dtype=np.float32).tolist()
+
+
+def _empty_usage() -> Dict[str, int]:
+    return {"prompt_tokens": 0, "total_tokens": 0}
+
+
 @component
 class AsyncTextEmbedder:
     def __init__(
@@ -38,16 +55,19 @@ class AsyncTextEmbedder:
         api_key: Optional[str] = None,
         api_base_url: Optional[str] = None,
         timeout: Optional[float] = None,
+        cache: Optional[TieredCache] = None,
+        single_flight: Optional[SingleFlight] = None,
         **kwargs,
     ):
         self._api_key = api_key
         self._model = model
         self._api_base_url = api_base_url
         self._timeout = timeout
+        self._cache = cache
+        self._single_flight = single_flight
         self._kwargs = kwargs
 
     @component.output_types(embedding=List[float], meta=Dict[str, Any])
-    @backoff.on_exception(backoff.expo, openai.APIError, max_time=60.0, max_tries=3)
     async def run(self, text: str):
         if not isinstance(text, str):
             raise TypeError(
@@ -57,7 +77,41 @@ class AsyncTextEmbedder:
 
         # copied from OpenAI embedding_utils (https://github.com/openai/openai-python/blob/main/openai/embeddings_utils.py)
         # replace newlines, which can negatively affect performance.
-        text_to_embed = text.replace("\n", " ")
+        text_to_embed = text.replace("\n", " ").strip()
+        key = cache_key(self._model, self._kwargs, text_to_embed)
+
+        if (scope := get_embedding_scope()) is None:
+            return await self._embed_once(text_to_embed, key)
+
+        # share the embedding, or the in-flight request, with the other embedders in the scope
+        if key not in scope:
+            scope[key] = asyncio.ensure_future(self._embed_once(text_to_embed, key))
+
+        try:
+            # shielded, so a cancelled caller does not cancel the request for the others
+            return await asyncio.shield(scope[key])
+        except Exception:
+            scope.pop(key, None)
+            raise
+
+    async def _embed_once(self, text_to_embed: str, key: str) -> Dict[str, Any]:
+        if self._single_flight is None:
+            return await self._embed(text_to_embed, key)
+
+        # the texts embedded concurrently by other scopes, e.g. concurrent asks, share one request
+        return await self._single_flight.do(
+            key, lambda: self._embed(text_to_embed, key)
+        )
+
+    @backoff.on_exception(backoff.expo, openai.APIError, max_time=60.0, max_tries=3)
+    async def _embed(self, text_to_embed: str, key: str) -> Dict[str, Any]:
+        if self._cache and (embedding := await self._cache.get(key)) is not None:
+            meta = {
+                "model": self._model,
+                "usage": _empty_usage(),
+                "cache": {"hits": 1, "misses": 0},
+            }
+            return {"embedding": embedding, "meta": meta}
 
         response = await aembedding(
             model=self._model,
@@ -68,12 +122,17 @@ class AsyncTextEmbedder:
             **self._kwargs,
         )
 
+        embedding = response.data[0]["embedding"]
+        if self._cache:
+            await self._cache.set(key, embedding)
+
         meta = {
             "model": response.model,
             "usage": dict(response.usage) if hasattr(response, "usage") else {},
+            "cache": {"hits": 0, "misses": 1},
         }
 
-        return {"embedding": response.data[0]["embedding"], "meta": meta}
+        return {"embedding": embedding, "meta": meta}
 
 
 @component
@@ -85,17 +144,20 @@ class AsyncDocumentEmbedder:
         api_key: Optional[str] = None,
         api_base_url: Optional[str] = None,
         timeout: Optional[float] = None,
+        cache: Optional[TieredCache] = None,
+        scheduler: Optional[EmbeddingBatchScheduler] = None,
         **kwargs,
     ):
         self._api_key = api_key
         self._model = model
-        self._batch_size = batch_size
         self._api_base_url = api_base_url
         self._timeout = timeout
+        self._cache = cache
+        self._scheduler = scheduler or EmbeddingBatchScheduler(batch_size=batch_size)
         self._kwargs = kwargs
 
     async def _embed_batch(
-        self, texts_to_embed: List[str], batch_size: int
+        self, texts_to_embed: List[str]
     ) -> Tuple[List[List[float]], Dict[str, Any]]:
         async def embed_single_batch(batch: List[str]) -> Any:
             return await aembedding(
@@ -107,14 +169,7 @@ class AsyncDocumentEmbedder:
                 **self._kwargs,
             )
 
-        batches = [
-            texts_to_embed[i : i + batch_size]
-            for i in range(0, len(texts_to_embed), batch_size)
-        ]
-
-        responses = await asyncio.gather(
-            *[embed_single_batch(batch) for batch in batches]
-        )
+        responses = await self._scheduler.run(texts_to_embed, embed_single_batch)
 
         all_embeddings = []
         meta: Dict[str, Any] = {}
@@ -137,7 +192,6 @@ class AsyncDocumentEmbedder:
         return all_embeddings, meta
 
     @component.output_types(documents=List[Document], meta=Dict[str, Any])
-    @backoff.on_exception(backoff.expo, openai.APIError, max_time=60.0, max_tries=3)
     async def run(self, documents: List[Document]):
         if (
             not isinstance(documents, list)
@@ -150,14 +204,29 @@ class AsyncDocumentEmbedder:
             )
 
         texts_to_embed = _prepare_texts_to_embed(documents=documents)
+        keys = [cache_key(self._model, self._kwargs, text) for text in texts_to_embed]
+
+        # look up the cache first and only embed the texts we have not seen yet,
+        # identical texts in the same run are embedded once as well
+        cached = await self._cache.get_many(set(keys)) if self._cache else {}
+        missing = {
+            key: text for key, text in zip(keys, texts_to_embed) if key not in cached
+        }
 
         embeddings, meta = await self._embed_batch(
-            texts_to_embed=texts_to_embed,
-            batch_size=self._batch_size,
+            texts_to_embed=list(missing.values())
         )
+        computed = dict(zip(missing.keys(), embeddings))
+        if self._cache:
+            await self._cache.set_many(computed)
 
-        for doc, emb in zip(documents, embeddings):
-            doc.embedding = emb
+        for doc, key in zip(documents, keys):
+            doc.embedding = cached[key] if key in cached else computed[key]
+
+        hits = sum(1 for key in keys if key in cached)
+        meta.setdefault("model", self._model)
+        meta.setdefault("usage", _empty_usage())
+        meta["cache"] = {"hits": hits, "misses": len(keys) - hits}
 
         return {"documents": documents, "meta": meta}
 
@@ -172,6 +241,10 @@ class LitellmEmbedderProvider(EmbedderProvider):
         ] = None,  # e.g. EMBEDDER_OPENAI_API_KEY, EMBEDDER_ANTHROPIC_API_KEY, etc.
         api_base: Optional[str] = None,
         timeout: float = 120.0,
+        batch_size: int = 32,
+        max_concurrent_batches: int = 4,
+        tokens_per_minute: Optional[int] = None,
+        max_retries: int = 5,
         **kwargs,
     ):
         self._api_key = os.getenv(api_key_name) if api_key_name else None
@@ -181,6 +254,32 @@ class LitellmEmbedderProvider(EmbedderProvider):
         if "provider" in kwargs:
             del kwargs["provider"]
         self._kwargs = kwargs
+        self._scheduler = EmbeddingBatchScheduler(
+            batch_size=batch_size,
+            max_concurrent_batches=max_concurrent_batches,
+            tokens_per_minute=tokens_per_minute,
+            max_retries=max_retries,
+        )
+        self._cache = (
+            TieredCache(
+                namespace="embedding",
+                path=settings.embedding_cache_path,
+                disk_maxsize=settings.embedding_cache_disk_maxsize,
+                dumps=_dump_embedding,
+                loads=_load_embedding,
+                # float32 bytes in memory, a list of python floats takes ~8 times more
+                maxbytes=settings.embedding_cache_max_bytes,
+            )
+            if settings.enable_embedding_cache
+            else None
+        )
+        self._single_flight = SingleFlight(name=f"embedding {model}")
+
+    def cache_stats(self) -> Dict[str, int]:
+        return self._cache.stats() if self._cache else {}
+
+    def single_flight_stats(self) -> Dict[str, int]:
+        return self._single_flight.stats()
 
     def get_text_embedder(self):
         return AsyncTextEmbedder(
@@ -188,6 +287,8 @@ class LitellmEmbedderProvider(EmbedderProvider):
             api_base_url=self._api_base,
             model=self._embedding_model,
             timeout=self._timeout,
+            cache=self._cache,
+            single_flight=self._single_flight,
             **self._kwargs,
         )
 
@@ -197,5 +298,7 @@ class LitellmEmbedderProvider(EmbedderProvider):
             api_base_url=self._api_base,
             model=self._embedding_model,
             timeout=self._timeout,
+            cache=self._cache,
+            scheduler=self._scheduler,
             **self._kwargs,
         )
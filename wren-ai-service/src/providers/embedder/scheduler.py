@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import random
+from typing import Any, Awaitable, Callable, List, Optional
+
+import openai
+
+logger = logging.getLogger("wren-ai-service")
+
+
+def estimate_tokens(texts: List[str]) -> int:
+    # a rough estimation, about 4 characters per token for english text
+    return sum(len(text) // 4 + 1 for text in texts)
+
+
+class EmbeddingBatchScheduler:
+    """
+    Schedules embedding batches against a rate limited provider.
+
+    - at most `max_concurrent_batches` batches are in flight at the same time
+    - when `tokens_per_minute` is set, batches wait for the (estimated) token budget before they are sent
+    - failed batches are retried on their own, so one rate limited batch does not restart the whole run
+    - the batch size adapts between 1 and `batch_size`: it is halved on rate limits or slow responses
+      and grows back gradually while responses stay fast
+
+    The scheduler is shared by all document embedders of the same model, so the limits apply per model.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 32,
+        max_concurrent_batches: int = 4,
+        tokens_per_minute: Optional[int] = None,
+        max_retries: int = 5,
+        target_batch_latency: float = 10.0,
+    ):
+        self._max_batch_size = batch_size
+        self._max_concurrent_batches = max_concurrent_batches
+        self._tokens_per_minute = tokens_per_minute
+        self._max_retries = max_retries
+        self._target_batch_latency = target_batch_latency
+
+        self.batch_size = batch_size
+        self._loop = None
+
+    def _ensure_loop(self):
+        # asyncio primitives are bound to the event loop they are first used in
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self._max_concurrent_batches)
+            self._token_lock = asyncio.Lock()
+            self._tokens = float(self._tokens_per_minute or 0)
+            self._last_refill = loop.time()
+
+    async def _acquire_tokens(self, tokens: int):
+        if not self._tokens_per_minute:
+            return
+
+        # a single batch larger than the budget can never be satisfied, cap it to the full budget
+        tokens = min(tokens, self._tokens_per_minute)
+        rate = self._tokens_per_minute / 60
+
+        async with self._token_lock:
+            while True:
+                now = self._loop.time()
+                self._tokens = min(
+                    self._tokens_per_minute,
+                    self._tokens + (now - self._last_refill) * rate,
+                )
+                self._last_refill = now
+
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+
+                await asyncio.sleep((tokens - self._tokens) / rate)
+
+    def _on_success(self, latency: float):
+        if latency > self._target_batch_latency:
+            self.batch_size = max(1, self.batch_size // 2)
+        elif latency < self._target_batch_latency / 2:
+            self.batch_size = min(
+                self._max_batch_size, self.batch_size + max(1, self.batch_size // 4)
+            )
+
+    def _on_rate_limit(self):
+        self.batch_size = max(1, self.batch_size // 2)
+
+    async def _send(
+        self, batch: List[str], embed: Callable[[List[str]], Awaitable[Any]]
+    ) -> Any:
+        for attempt in range(self._max_retries + 1):
+            await self._acquire_tokens(estimate_tokens(batch))
+
+            start = self._loop.time()
+            try:
+                response = await embed(batch)
+            except openai.APIError as e:
+                if attempt == self._max_retries or not _is_retryable(e):
+                    raise
+
+                if isinstance(e, openai.RateLimitError):
+                    self._on_rate_limit()
+
+                delay = min(60.0, 2**attempt) * (0.5 + random.random())
+                logger.warning(
+                    f"Embedding batch of {len(batch)} failed ({type(e).__name__}), retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+            else:
+                self._on_success(self._loop.time() - start)
+                return response
+
+    async def run(
+        self, texts: List[str], embed: Callable[[List[str]], Awaitable[Any]]
+    ) -> List[Any]:
+        """
+        Embed the texts in batches with `embed` and return the responses in the order of the texts.
+        """
+        self._ensure_loop()
+
+        async def _process(batch: List[str]) -> Any:
+            # the task owns its slot, a task cancelled before it starts never takes one
+            async with self._semaphore:
+                return await self._send(batch, embed)
+
+        tasks = []
+        in_flight = set()
+        cursor = 0
+        try:
+            while cursor < len(texts):
+                # the batches are cut when a slot frees up, so they follow the adapted batch size
+                if len(in_flight) >= self._max_concurrent_batches:
+                    _, in_flight = await asyncio.wait(
+                        in_flight, return_when=asyncio.FIRST_COMPLETED
+                    )
+                # fail fast if one of the batches already failed for good
+                if failed := next(
+                    (
+                        task
+                        for task in tasks
+                        if task.done() and not task.cancelled() and task.exception()
+                    ),
+                    None,
+                ):
+                    raise failed.exception()
+
+                batch = texts[cursor : cursor + self.batch_size]
+                cursor += len(batch)
+                task = asyncio.create_task(_process(batch))
+                tasks.append(task)
+                in_flight.add(task)
+
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+
+def _is_retryable(e: openai.APIError) -> bool:
+    if isinstance(
+        e,
+        (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError),
+    ):
+        return True
+
+    return getattr(e, "status_code", None) in (408, 409, 429, 500, 502, 503, 504)
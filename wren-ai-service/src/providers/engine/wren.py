@@ -8,7 +8,12 @@ import aiohttp
 import orjson
 
 from src.config import settings
-from src.core.engine import Engine, remove_limit_statement
+from src.core.engine import (
+    Engine,
+    cache_dry_run,
+    manifest_hash,
+    remove_limit_statement,
+)
 from src.providers.loader import provider
 
 logger = logging.getLogger("wren-ai-service")
@@ -23,6 +28,7 @@ class WrenUI(Engine):
     ):
         self._endpoint = endpoint
 
+    @cache_dry_run
     async def execute_sql(
         self,
         sql: str,
@@ -155,7 +161,13 @@ class WrenIbis(Engine):
         self._connection_info = (
             orjson.loads(base64.b64decode(connection_info)) if connection_info else {}
         )
+        self._cache_scope = (source, manifest_hash(manifest))
 
+    @property
+    def cache_scope(self):
+        return self._cache_scope
+
+    @cache_dry_run
     async def execute_sql(
         self,
         sql: str,
@@ -206,6 +218,7 @@ class WrenIbis(Engine):
         except asyncio.TimeoutError:
             return False, None, f"Request timed out: {timeout} seconds"
 
+    @cache_dry_run
     async def dry_plan(
         self,
         session: aiohttp.ClientSession,
@@ -296,7 +309,13 @@ class WrenEngine(Engine):
     ):
         self._endpoint = endpoint
         self._manifest = manifest
+        self._cache_scope = manifest_hash(manifest)
+
+    @property
+    def cache_scope(self):
+        return self._cache_scope
 
+    @cache_dry_run
     async def execute_sql(
         self,
         sql: str,
@@ -148,12 +148,36 @@ def build_message(completion: Any, choice: Any) -> ChatMessage:
             "model": completion.model,
             "index": choice.index,
             "finish_reason": choice.finish_reason,
-            "usage": dict(completion.usage) if hasattr(completion, "usage") else {},
+            "usage": build_usage(getattr(completion, "usage", None)),
         }
     )
     return chat_message
 
 
+def build_usage(usage: Any) -> Dict[str, Any]:
+    """
+    Converts the usage returned by the OpenAI API to a dict, with the prompt tokens read from the provider's prompt cache.
+
+    :param usage:
+        The usage returned by the OpenAI API, if any.
+    :returns:
+        The usage, with `cached_tokens`.
+    """
+    if not usage:
+        return {}
+
+    usage = dict(usage)
+    details = usage.get("prompt_tokens_details")
+    if isinstance(details, dict):
+        cached_tokens = details.get("cached_tokens")
+    else:
+        cached_tokens = getattr(details, "cached_tokens", None)
+    # Anthropic reports the cache reads separately
+    usage["cached_tokens"] = cached_tokens or usage.get("cache_read_input_tokens") or 0
+
+    return usage
+
+
 def check_finish_reason(message: ChatMessage) -> None:
     """
     Check the `finish_reason` returned with the OpenAI completions.
@@ -191,7 +215,7 @@ def connect_chunks(chunk: Any, chunks: List[StreamingChunk]) -> ChatMessage:
             "model": chunk.model,
             "index": 0,
             "finish_reason": chunk.choices[0].finish_reason,
-            "usage": dict(chunk.usage) if hasattr(chunk, "usage") else {},
+            "usage": build_usage(getattr(chunk, "usage", None)),
         }
     )
     return complete_response
@@ -221,6 +245,24 @@ def build_chunk(chunk: Any) -> StreamingChunk:
     return chunk_message
 
 
+def add_cache_control(openai_msg: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Mark the end of an OpenAI formatted message as a prompt cache breakpoint.
+
+    The providers caching the prompt prefixes explicitly, e.g. Anthropic, cache the prompt up to the breakpoint,
+    litellm removes the marker for the other providers.
+    """
+    content = openai_msg.get("content")
+    if not content:
+        return openai_msg
+
+    if isinstance(content, str):
+        content = [{"type": "text", "text": content}]
+    content[-1] = {**content[-1], "cache_control": {"type": "ephemeral"}}
+
+    return {**openai_msg, "content": content}
+
+
 def convert_message_to_openai_format(message: ChatMessage) -> Dict[str, str]:
     """
     Convert a message to the format expected by OpenAI's Chat API.
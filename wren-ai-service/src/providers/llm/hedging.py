@@ -0,0 +1,98 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+
+class LatencyTracker:
+    """
+    Tracks the recent latencies of the models, to derive the delay after which a request is hedged.
+
+    The hedge delay of a model is the `quantile` of its last `window` latencies, e.g. its p95,
+    and `default_delay` until `min_samples` latencies are recorded.
+    """
+
+    def __init__(
+        self,
+        window: int = 200,
+        quantile: float = 0.95,
+        min_samples: int = 20,
+        default_delay: float = 10.0,
+        min_delay: float = 0.5,
+    ):
+        self._window = window
+        self._quantile = quantile
+        self._min_samples = min_samples
+        self._default_delay = default_delay
+        self._min_delay = min_delay
+        self._latencies: Dict[str, Deque[float]] = {}
+
+    def record(self, model: str, latency: float):
+        if (latencies := self._latencies.get(model)) is None:
+            latencies = self._latencies[model] = deque(maxlen=self._window)
+
+        latencies.append(latency)
+
+    def hedge_delay(self, model: str) -> float:
+        latencies = self._latencies.get(model)
+        if not latencies or len(latencies) < self._min_samples:
+            return self._default_delay
+
+        ordered = sorted(latencies)
+        return max(self._min_delay, ordered[round(self._quantile * (len(ordered) - 1))])
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            model: {"samples": len(latencies), "hedge_delay": self.hedge_delay(model)}
+            for model, latencies in self._latencies.items()
+        }
+
+
+async def timed(
+    tracker: LatencyTracker, model: str, request: Callable[[], Awaitable[Any]]
+) -> Any:
+    """
+    Send the request and record its latency, including the time a cancelled request ran for,
+    as the latency of a request losing a hedge is at least as long.
+    """
+    start = time.perf_counter()
+    try:
+        result = await request()
+    except asyncio.CancelledError:
+        tracker.record(model, time.perf_counter() - start)
+        raise
+
+    tracker.record(model, time.perf_counter() - start)
+    return result
+
+
+async def hedge(
+    primary: Callable[[], Awaitable[Any]],
+    backup: Callable[[], Awaitable[Any]],
+    delay: float,
+    on_hedge: Optional[Callable[[], None]] = None,
+) -> Any:
+    """
+    Send the primary request and, if it is still running after `delay` seconds, the backup request as well,
+    then return the result of the first one to succeed and cancel the other.
+    """
+    tasks = {asyncio.ensure_future(primary())}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            if on_hedge:
+                on_hedge()
+            tasks.add(asyncio.ensure_future(backup()))
+
+        error = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = error or task.exception()
+
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -1,3 +1,5 @@
+import copy
+import logging
 import os
 from typing import Any, Callable, Dict, List, Optional
 
@@ -5,19 +7,28 @@ import backoff
 import openai
 from litellm import Router, acompletion
 
-from src.core.provider import LLMProvider
+from src.config import settings
+from src.core.provider import LLMProvider, get_llm_priority
+from src.providers.cache import TieredCache, cache_key
+from src.providers.embedder.scheduler import estimate_tokens
 from src.providers.llm import (
     ChatMessage,
     StreamingChunk,
+    add_cache_control,
     build_chunk,
     build_message,
     check_finish_reason,
     connect_chunks,
     convert_message_to_openai_format,
 )
+from src.providers.llm.hedging import LatencyTracker, hedge, timed
+from src.providers.llm.scheduler import LLMScheduler
 from src.providers.loader import provider
+from src.providers.singleflight import SingleFlight
 from src.utils import extract_braces_content, remove_trailing_slash
 
+logger = logging.getLogger("wren-ai-service")
+
 
 @provider("litellm_llm")
 class LitellmLLMProvider(LLMProvider):
@@ -34,6 +45,13 @@ class LitellmLLMProvider(LLMProvider):
         context_window_size: int = 100000,
         fallback_model_list: Optional[List[Dict[str, Any]]] = None,
         fallback_testing: bool = False,
+        prompt_caching: bool = False,
+        max_concurrent_requests: Optional[int] = None,
+        priority_concurrency: Optional[Dict[str, int]] = None,
+        priority_tokens_per_minute: Optional[Dict[str, int]] = None,
+        hedging: bool = False,
+        hedge_delay: float = 10.0,
+        hedge_quantile: float = 0.95,
         **_,
     ):
         self._model = model
@@ -58,13 +76,85 @@ class LitellmLLMProvider(LLMProvider):
             fallbacks=fallbacks,
         )
         self._enable_fallback_testing = fallback_testing and self._has_fallbacks
+        # mark the stable prefix of the prompts, i.e. the system prompt and the history, as cache breakpoints
+        self._prompt_caching = prompt_caching
+        # the responses are only cached for the pipelines enabling it, see with_response_cache
+        self._response_cache: Optional[TieredCache] = None
+        self._cache_responses = False
+        self._single_flight = SingleFlight(name=f"llm {model}")
+        # the interactive requests are sent first when the model is saturated, see llm_priority
+        self._scheduler = LLMScheduler(
+            max_concurrent_requests=max_concurrent_requests,
+            concurrency=priority_concurrency,
+            tokens_per_minute=priority_tokens_per_minute,
+        )
+        # a request slower than the usual latencies of the model is also sent to the first fallback model,
+        # hedge_delay is used until enough latencies are recorded to derive it from the hedge_quantile
+        self._hedging = hedging and self._has_fallbacks
+        self._hedge_model = (
+            fallback_model_list[1]["model_name"] if self._has_fallbacks else None
+        )
+        self._latencies = LatencyTracker(
+            quantile=hedge_quantile, default_delay=hedge_delay
+        )
+        self._hedged = 0
+
+    def with_response_cache(self) -> "LitellmLLMProvider":
+        if self._response_cache is None:
+            self._response_cache = TieredCache(
+                namespace="llm_response",
+                maxsize=settings.llm_response_cache_maxsize,
+                path=settings.llm_response_cache_path,
+                disk_maxsize=settings.llm_response_cache_disk_maxsize,
+                ttl=settings.llm_response_cache_ttl,
+            )
+
+        # a view of the provider sharing its router and cache with the other pipelines
+        provider = copy.copy(self)
+        provider._cache_responses = True
+        return provider
+
+    def cache_stats(self) -> Dict[str, int]:
+        return self._response_cache.stats() if self._response_cache else {}
+
+    def single_flight_stats(self) -> Dict[str, int]:
+        return self._single_flight.stats()
+
+    def hedging_stats(self) -> Dict[str, Any]:
+        return {"hedged": self._hedged, "latencies": self._latencies.stats()}
+
+    def _on_hedge(self):
+        self._hedged += 1
+        logger.debug(f"LLM request to {self._model} hedged with {self._hedge_model}")
+
+    async def _route(self, **kwargs):
+        # the streamed requests cannot be raced, their chunks are sent to the callback as they come
+        if not self._hedging or kwargs.get("stream"):
+            return await self._router.acompletion(model=self._model, **kwargs)
+
+        def _request(model: str):
+            return lambda: timed(
+                self._latencies,
+                model,
+                lambda: self._router.acompletion(model=model, **kwargs),
+            )
+
+        return await hedge(
+            _request(self._model),
+            _request(self._hedge_model),
+            delay=self._latencies.hedge_delay(self._model),
+            on_hedge=self._on_hedge,
+        )
 
     def get_generator(
         self,
         system_prompt: Optional[str] = None,
         generation_kwargs: Optional[Dict[str, Any]] = None,
         streaming_callback: Optional[Callable[[StreamingChunk], None]] = None,
+        prompt_caching: Optional[bool] = None,
     ):
+        if prompt_caching is None:
+            prompt_caching = self._prompt_caching
         combined_generation_kwargs = {
             **(generation_kwargs or {}),
             **(self._model_kwargs or {}),
@@ -98,69 +188,130 @@ class LitellmLLMProvider(LLMProvider):
             openai_formatted_messages = [
                 convert_message_to_openai_format(message) for message in messages
             ]
+            if prompt_caching and len(openai_formatted_messages) > 1:
+                # the user prompt is the last message, the system prompt and the history before it
+                # are the same for the next calls, they are marked up to the last of them
+                for index in {0, len(openai_formatted_messages) - 2}:
+                    openai_formatted_messages[index] = add_cache_control(
+                        openai_formatted_messages[index]
+                    )
 
             generation_kwargs = {
                 **combined_generation_kwargs,
                 **(generation_kwargs or {}),
             }
 
-            allowed_openai_params = generation_kwargs.get(
-                "allowed_openai_params", []
-            ) + (["reasoning_effort"] if self._model.startswith("gpt-5") else [])
-
-            if self._has_fallbacks:
-                completion = await self._router.acompletion(
-                    model=self._model,
-                    messages=openai_formatted_messages,
-                    stream=streaming_callback is not None,
-                    allowed_openai_params=allowed_openai_params,
-                    mock_testing_fallbacks=self._enable_fallback_testing,
-                    **generation_kwargs,
-                )
-            else:
-                completion = await acompletion(
-                    model=self._model,
-                    api_key=self._api_key,
-                    api_base=self._api_base,
-                    api_version=self._api_version,
-                    timeout=self._timeout,
-                    messages=openai_formatted_messages,
-                    stream=streaming_callback is not None,
-                    allowed_openai_params=allowed_openai_params,
-                    **generation_kwargs,
+            # only the deterministic, non-streaming generations are cached and coalesced
+            response_key = None
+            if streaming_callback is None and not generation_kwargs.get("temperature"):
+                response_key = cache_key(
+                    self._model, openai_formatted_messages, generation_kwargs
                 )
 
-            completions: List[ChatMessage] = []
-            if streaming_callback is not None:
-                num_responses = generation_kwargs.pop("n", 1)
-                if num_responses > 1:
-                    raise ValueError(
-                        "Cannot stream multiple responses, please set n=1."
+            if response_key and self._cache_responses:
+                if (
+                    response := await self._response_cache.get(response_key)
+                ) is not None:
+                    return copy.deepcopy(response)
+
+            async def _generate() -> Dict[str, Any]:
+                allowed_openai_params = generation_kwargs.get(
+                    "allowed_openai_params", []
+                ) + (["reasoning_effort"] if self._model.startswith("gpt-5") else [])
+
+                priority = get_llm_priority()
+                async with self._scheduler.slot(
+                    priority,
+                    tokens=estimate_tokens(
+                        [message.content or "" for message in messages]
                     )
-                chunks: List[StreamingChunk] = []
-
-                async for chunk in completion:
-                    if chunk.choices and streaming_callback:
-                        chunk_delta: StreamingChunk = build_chunk(chunk)
-                        chunks.append(chunk_delta)
-                        streaming_callback(
-                            chunk_delta, query_id
-                        )  # invoke callback with the chunk_delta
-                completions = [connect_chunks(chunk, chunks)]
-            else:
-                completions = [
-                    build_message(completion, choice) for choice in completion.choices
-                ]
-
-            # before returning, do post-processing of the completions
-            for response in completions:
-                check_finish_reason(response)
-
-            return {
-                "replies": [
-                    extract_braces_content(message.content) for message in completions
-                ],
-                "meta": [message.meta for message in completions],
-            }
+                    + (
+                        generation_kwargs.get("max_tokens")
+                        or generation_kwargs.get("max_completion_tokens")
+                        or 0
+                    ),
+                ) as queue_wait:
+                    if self._has_fallbacks:
+                        completion = await self._route(
+                            messages=openai_formatted_messages,
+                            stream=streaming_callback is not None,
+                            allowed_openai_params=allowed_openai_params,
+                            mock_testing_fallbacks=self._enable_fallback_testing,
+                            **generation_kwargs,
+                        )
+                    else:
+                        completion = await acompletion(
+                            model=self._model,
+                            api_key=self._api_key,
+                            api_base=self._api_base,
+                            api_version=self._api_version,
+                            timeout=self._timeout,
+                            messages=openai_formatted_messages,
+                            stream=streaming_callback is not None,
+                            allowed_openai_params=allowed_openai_params,
+                            **generation_kwargs,
+                        )
+
+                    completions: List[ChatMessage] = []
+                    if streaming_callback is not None:
+                        num_responses = generation_kwargs.pop("n", 1)
+                        if num_responses > 1:
+                            raise ValueError(
+                                "Cannot stream multiple responses, please set n=1."
+                            )
+                        chunks: List[StreamingChunk] = []
+
+                        async for chunk in completion:
+                            if chunk.choices and streaming_callback:
+                                chunk_delta: StreamingChunk = build_chunk(chunk)
+                                chunks.append(chunk_delta)
+                                streaming_callback(
+                                    chunk_delta, query_id
+                                )  # invoke callback with the chunk_delta
+                        completions = [connect_chunks(chunk, chunks)]
+                    else:
+                        completions = [
+                            build_message(completion, choice)
+                            for choice in completion.choices
+                        ]
+
+                for message in completions:
+                    message.meta.update(
+                        {"priority": priority, "queue_wait": queue_wait}
+                    )
+
+                # before returning, do post-processing of the completions
+                for response in completions:
+                    check_finish_reason(response)
+
+                response = {
+                    "replies": [
+                        extract_braces_content(message.content)
+                        for message in completions
+                    ],
+                    "meta": [message.meta for message in completions],
+                }
+                if response_key and self._cache_responses:
+                    # the cached responses are free, their usage is not reported again
+                    await self._response_cache.set(
+                        response_key,
+                        {
+                            "replies": response["replies"],
+                            "meta": [
+                                {**meta, "usage": {}} for meta in response["meta"]
+                            ],
+                        },
+                    )
+
+                return response
+
+            if response_key:
+                # the identical requests in flight, e.g. of concurrent asks, share one completion,
+                # only within a priority class, so an ask never waits in the queue of a background request
+                return await self._single_flight.do(
+                    f"{get_llm_priority()}:{response_key}", _generate
+                )
+
+            return await _generate()
 
         return _run
@@ -0,0 +1,147 @@
+import asyncio
+import contextlib
+import heapq
+import itertools
+import logging
+from collections import Counter
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from src.core.provider import LLM_PRIORITIES
+
+logger = logging.getLogger("wren-ai-service")
+
+
+class LLMScheduler:
+    """
+    Schedules the LLM requests of a model by priority class, i.e. interactive > followup > background.
+
+    - at most `max_concurrent_requests` requests are in flight at the same time, the free slots are given
+      to the waiting requests of the highest priority first
+    - each class can be capped to fewer concurrent requests in `concurrency`, e.g. {"background": 2},
+      a class at its cap does not hold back the requests of the other classes
+    - when a class has a budget in `tokens_per_minute`, its requests wait for their (estimated) tokens
+      before they queue for a slot
+
+    The scheduler is shared by all the generators of the same model, so the limits apply per model.
+    """
+
+    def __init__(
+        self,
+        max_concurrent_requests: Optional[int] = None,
+        concurrency: Optional[Dict[str, int]] = None,
+        tokens_per_minute: Optional[Dict[str, int]] = None,
+    ):
+        for priority in {**(concurrency or {}), **(tokens_per_minute or {})}:
+            if priority not in LLM_PRIORITIES:
+                raise ValueError(f"Unknown LLM priority: {priority}")
+
+        self._max_concurrent_requests = max_concurrent_requests
+        self._concurrency = concurrency or {}
+        self._tokens_per_minute = tokens_per_minute or {}
+        self._loop = None
+
+    def _ensure_loop(self):
+        # asyncio primitives are bound to the event loop they are first used in
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._in_flight: Counter = Counter()
+            self._waiters: List[Tuple[int, int, str, asyncio.Future]] = []
+            self._sequence = itertools.count()
+            self._token_locks = {
+                priority: asyncio.Lock() for priority in self._tokens_per_minute
+            }
+            self._tokens = {
+                priority: float(tokens)
+                for priority, tokens in self._tokens_per_minute.items()
+            }
+            self._last_refill = dict.fromkeys(self._tokens_per_minute, loop.time())
+
+    async def _acquire_tokens(self, priority: str, tokens: int):
+        if not (tokens_per_minute := self._tokens_per_minute.get(priority)):
+            return
+
+        # a single request larger than the budget can never be satisfied, cap it to the full budget
+        tokens = min(tokens, tokens_per_minute)
+        rate = tokens_per_minute / 60
+
+        async with self._token_locks[priority]:
+            while True:
+                now = self._loop.time()
+                self._tokens[priority] = min(
+                    tokens_per_minute,
+                    self._tokens[priority] + (now - self._last_refill[priority]) * rate,
+                )
+                self._last_refill[priority] = now
+
+                if self._tokens[priority] >= tokens:
+                    self._tokens[priority] -= tokens
+                    return
+
+                await asyncio.sleep((tokens - self._tokens[priority]) / rate)
+
+    def _is_full(self) -> bool:
+        return bool(self._max_concurrent_requests) and (
+            sum(self._in_flight.values()) >= self._max_concurrent_requests
+        )
+
+    def _wake(self):
+        blocked = []
+        while self._waiters and not self._is_full():
+            waiter = heapq.heappop(self._waiters)
+            _, _, priority, future = waiter
+            if future.done():
+                # the caller was cancelled while waiting
+                continue
+
+            if (cap := self._concurrency.get(priority)) and self._in_flight[
+                priority
+            ] >= cap:
+                # the class is at its cap, the lower classes may still be sent
+                blocked.append(waiter)
+                continue
+
+            self._in_flight[priority] += 1
+            future.set_result(None)
+
+        for waiter in blocked:
+            heapq.heappush(self._waiters, waiter)
+
+    async def _acquire(self, priority: str):
+        future = self._loop.create_future()
+        heapq.heappush(
+            self._waiters,
+            (LLM_PRIORITIES.index(priority), next(self._sequence), priority, future),
+        )
+        self._wake()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            # the slot was given to the caller right before it was cancelled
+            if not future.cancelled():
+                self._release(priority)
+            raise
+
+    def _release(self, priority: str):
+        self._in_flight[priority] -= 1
+        self._wake()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: str, tokens: int = 0) -> AsyncIterator[float]:
+        """
+        Wait for the tokens and a slot of the priority class, and yield the time spent waiting in seconds.
+        """
+        self._ensure_loop()
+        start = self._loop.time()
+
+        await self._acquire_tokens(priority, tokens)
+        await self._acquire(priority)
+        queue_wait = self._loop.time() - start
+        if queue_wait > 1:
+            logger.debug(f"LLM request of priority {priority} queued {queue_wait:.1f}s")
+
+        try:
+            yield queue_wait
+        finally:
+            self._release(priority)
@@ -0,0 +1,48 @@
+import asyncio
+import copy
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger("wren-ai-service")
+
+
+class SingleFlight:
+    """
+    Coalesce the identical concurrent requests: the first request of a key is sent,
+    and the requests of the same key made while it is in flight await its result instead.
+
+    The request runs in its own task, so a cancelled caller does not cancel it for the others,
+    and it is forgotten once done, so the next requests of the key are sent again.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, request: Callable[[], Awaitable[Any]]) -> Any:
+        if (task := self._in_flight.get(key)) is not None:
+            self.coalesced += 1
+            logger.debug(f"{self._name}: coalesced a request in flight")
+        else:
+            self.calls += 1
+            task = self._in_flight[key] = asyncio.ensure_future(request())
+            task.add_done_callback(lambda _: self._forget(key, task))
+
+        # the callers may modify their results, they all get their own copies
+        return copy.deepcopy(await asyncio.shield(task))
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # retrieve the exception of a request whose callers were all cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+        }
@@ -172,6 +172,11 @@ def trace_cost(func):
                 langfuse_context.update_current_observation(
                     model=model,
                     usage_details=meta[0].get("usage", {}),
+                    # the time the request waited for the llm scheduler, per pipeline
+                    metadata={
+                        "llm_priority": meta[0].get("priority"),
+                        "queue_wait": meta[0].get("queue_wait"),
+                    },
                 )
                 langfuse_context.update_current_trace(
                     metadata={"fallback_is_triggered": model != generator_name}
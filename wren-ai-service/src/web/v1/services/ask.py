@@ -1,12 +1,15 @@
 import asyncio
 import logging
-from typing import Dict, List, Literal, Optional
+from typing import Any, Dict, Iterable, List, Literal, Optional
 
+import numpy as np
 from cachetools import TTLCache
 from langfuse.decorators import observe
 from pydantic import AliasChoices, BaseModel, Field
 
 from src.core.pipeline import BasicPipeline
+from src.core.provider import embedding_scope
+from src.providers.cache import cache_key
 from src.utils import trace_metadata
 from src.web.v1.services import BaseRequest, SSEEvent
 
@@ -94,6 +97,109 @@ class AskResultResponse(_AskResultResponse):
     ] = Field(None, exclude=True)
 
 
+class AnswerCache:
+    """
+    Caches the answers of the asks by the embedding of the question, per project, mdl hash and ask options,
+    i.e. the custom instruction and the configurations, so a question similar enough to an answered one
+    returns the same sql without calling the llm.
+
+    The embedder is expected to be the one of the historical question retrieval, so the question
+    is embedded only once per ask. The answers of a project are invalidated on re-deploy,
+    and when its instructions or sql pairs change.
+    """
+
+    def __init__(
+        self,
+        embedder: Any,
+        similarity_threshold: float = 0.95,
+        max_entries: int = 1000,
+        maxsize: int = 1_000_000,
+        ttl: int = 86400,
+    ):
+        self._embedder = embedder
+        self._similarity_threshold = similarity_threshold
+        self._max_entries = max_entries
+        # (project_id, mdl_hash, options key) -> {"embeddings": normalized embeddings, "answers": answers}
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def _embed(self, query: str) -> Optional[np.ndarray]:
+        # the cache is an optimization, a failed embedding must not fail the ask
+        try:
+            embedding = np.asarray(
+                (await self._embedder.run(query))["embedding"], dtype=np.float32
+            )
+        except Exception as e:
+            logger.warning(f"Failed to embed the question for the answer cache: {e}")
+            return None
+
+        return embedding / (np.linalg.norm(embedding) or 1.0)
+
+    @staticmethod
+    def _key(
+        project_id: Optional[str],
+        mdl_hash: Optional[str],
+        options: Optional[Dict[str, Any]],
+    ) -> tuple:
+        return (project_id, mdl_hash, cache_key(options or {}))
+
+    async def get(
+        self,
+        project_id: Optional[str],
+        mdl_hash: Optional[str],
+        query: str,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Optional[dict]:
+        if (entry := self._cache.get(self._key(project_id, mdl_hash, options))) is None:
+            return None
+
+        if (embedding := await self._embed(query)) is None:
+            return None
+
+        similarities = entry["embeddings"] @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] < self._similarity_threshold:
+            return None
+
+        return entry["answers"][best]
+
+    async def set(
+        self,
+        project_id: Optional[str],
+        mdl_hash: Optional[str],
+        query: str,
+        answer: dict,
+        options: Optional[Dict[str, Any]] = None,
+    ):
+        if (embedding := await self._embed(query)) is None:
+            return
+
+        key = self._key(project_id, mdl_hash, options)
+        if (entry := self._cache.get(key)) is None:
+            entry = {"embeddings": embedding[np.newaxis, :], "answers": [answer]}
+        else:
+            # the oldest answers are dropped first
+            entry = {
+                "embeddings": np.vstack([entry["embeddings"], embedding])[
+                    -self._max_entries :
+                ],
+                "answers": [*entry["answers"], answer][-self._max_entries :],
+            }
+        self._cache[key] = entry
+
+    def invalidate(self, project_id: Optional[str], mdl_hash: Optional[str] = None):
+        for key in [key for key in list(self._cache.keys()) if key[0] == project_id]:
+            self._cache.pop(key, None)
+
+
+def _cancel_tasks(tasks: Iterable[asyncio.Future]):
+    for task in tasks:
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            # mark the exception as retrieved, it is irrelevant once the task is discarded
+            task.exception()
+
+
 class AskService:
     def __init__(
         self,
@@ -106,10 +212,12 @@ class AskService:
         enable_column_pruning: bool = False,
         max_sql_correction_retries: int = 3,
         max_histories: int = 5,
+        answer_cache: Optional[AnswerCache] = None,
         maxsize: int = 1_000_000,
         ttl: int = 120,
     ):
         self._pipelines = pipelines
+        self._answer_cache = answer_cache
         self._ask_results: Dict[str, AskResultResponse] = TTLCache(
             maxsize=maxsize, ttl=ttl
         )
@@ -132,6 +240,7 @@ class AskService:
 
     @observe(name="Ask Question")
     @trace_metadata
+    @embedding_scope
     async def ask(
         self,
         ask_request: AskRequest,
@@ -176,6 +285,16 @@ class AskService:
         use_dry_plan = ask_request.use_dry_plan
         allow_dry_plan_fallback = ask_request.allow_dry_plan_fallback
         sql_knowledge = None
+        speculative_tasks: Dict[str, asyncio.Future] = {}
+        # follow-up questions depend on the histories, so their answers are not cached
+        use_answer_cache = self._answer_cache is not None and not histories
+        # the answers depend on the instruction and the language and timezone of the ask
+        answer_cache_options = {
+            "custom_instruction": ask_request.custom_instruction,
+            "configurations": ask_request.configurations.model_dump(),
+        }
+        cached_answer = None
+        historical_question_result = []
 
         try:
             user_query = ask_request.query
@@ -189,6 +308,14 @@ class AskService:
                     is_followup=True if histories else False,
                 )
 
+                speculative_tasks = self._start_speculative_tasks(
+                    ask_request,
+                    histories=histories,
+                    enable_column_pruning=enable_column_pruning,
+                    allow_sql_functions_retrieval=allow_sql_functions_retrieval,
+                    allow_sql_knowledge_retrieval=allow_sql_knowledge_retrieval,
+                )
+
                 historical_question = await self._pipelines["historical_question"].run(
                     query=user_query,
                     project_id=ask_request.project_id,
@@ -211,19 +338,23 @@ class AskService:
                         for result in historical_question_result
                     ]
                     sql_generation_reasoning = ""
-                else:
-                    # Run both pipeline operations concurrently
-                    sql_samples_task, instructions_task = await asyncio.gather(
-                        self._pipelines["sql_pairs_retrieval"].run(
-                            query=user_query,
-                            project_id=ask_request.project_id,
-                        ),
-                        self._pipelines["instructions_retrieval"].run(
-                            query=user_query,
-                            project_id=ask_request.project_id,
-                            scope="sql",
-                        ),
+                elif use_answer_cache and (
+                    cached_answer := await self._answer_cache.get(
+                        ask_request.project_id,
+                        ask_request.mdl_hash,
+                        user_query,
+                        answer_cache_options,
                     )
+                ):
+                    api_results = [
+                        AskResult(**result) for result in cached_answer["response"]
+                    ]
+                    sql_generation_reasoning = cached_answer["sql_generation_reasoning"]
+                    table_names = cached_answer["retrieved_tables"]
+                else:
+                    sql_samples_task, instructions_task = await speculative_tasks[
+                        "sql_samples_and_instructions"
+                    ]
 
                     # Extract results from completed tasks
                     sql_samples = sql_samples_task["formatted_output"].get(
@@ -343,12 +474,23 @@ class AskService:
                     is_followup=True if histories else False,
                 )
 
-                retrieval_result = await self._pipelines["db_schema_retrieval"].run(
-                    query=user_query,
-                    histories=histories,
-                    project_id=ask_request.project_id,
-                    enable_column_pruning=enable_column_pruning,
-                )
+                # the speculative retrieval is only valid if the question was not rephrased
+                if (
+                    retrieval_task := speculative_tasks.pop("db_schema_retrieval", None)
+                ) and user_query.strip() != ask_request.query.strip():
+                    retrieval_task.cancel()
+                    retrieval_task = None
+
+                if retrieval_task:
+                    retrieval_result = await retrieval_task
+                else:
+                    retrieval_result = await self._pipelines["db_schema_retrieval"].run(
+                        query=user_query,
+                        histories=histories,
+                        project_id=ask_request.project_id,
+                        enable_column_pruning=enable_column_pruning,
+                        mdl_hash=ask_request.mdl_hash,
+                    )
                 _retrieval_result = retrieval_result.get(
                     "construct_retrieval_results", {}
                 )
@@ -438,20 +580,12 @@ class AskService:
                 )
 
                 if allow_sql_functions_retrieval:
-                    sql_functions = await self._pipelines[
-                        "sql_functions_retrieval"
-                    ].run(
-                        project_id=ask_request.project_id,
-                    )
+                    sql_functions = await speculative_tasks["sql_functions"]
                 else:
                     sql_functions = []
 
                 if allow_sql_knowledge_retrieval:
-                    sql_knowledge = await self._pipelines[
-                        "sql_knowledge_retrieval"
-                    ].run(
-                        project_id=ask_request.project_id,
-                    )
+                    sql_knowledge = await speculative_tasks["sql_knowledge"]
 
                 has_calculated_field = _retrieval_result.get(
                     "has_calculated_field", False
@@ -595,6 +729,23 @@ class AskService:
                     )
                 results["ask_result"] = api_results
                 results["metadata"]["type"] = "TEXT_TO_SQL"
+
+                if (
+                    use_answer_cache
+                    and not cached_answer
+                    and not historical_question_result
+                ):
+                    await self._answer_cache.set(
+                        ask_request.project_id,
+                        ask_request.mdl_hash,
+                        ask_request.query,
+                        {
+                            "response": [result.model_dump() for result in api_results],
+                            "sql_generation_reasoning": sql_generation_reasoning,
+                            "retrieved_tables": table_names,
+                        },
+                        answer_cache_options,
+                    )
             else:
                 logger.exception(f"ask pipeline - NO_RELEVANT_SQL: {user_query}")
                 if not self._is_stopped(query_id, self._ask_results):
@@ -636,6 +787,65 @@ class AskService:
             results["metadata"]["error_message"] = str(e)
             results["metadata"]["type"] = "TEXT_TO_SQL"
             return results
+        finally:
+            # results of the speculative stages are discarded if the ask ends early,
+            # e.g. a historical question is found or the question is not a text-to-sql one
+            _cancel_tasks(speculative_tasks.values())
+
+    def _start_speculative_tasks(
+        self,
+        ask_request: AskRequest,
+        histories: list[AskHistory],
+        enable_column_pruning: bool,
+        allow_sql_functions_retrieval: bool,
+        allow_sql_knowledge_retrieval: bool,
+    ) -> Dict[str, asyncio.Future]:
+        """
+        Start the stages that don't depend on the historical question lookup and the intent
+        classification, so they run concurrently with them instead of after them.
+        """
+        tasks = {
+            "sql_samples_and_instructions": asyncio.gather(
+                self._pipelines["sql_pairs_retrieval"].run(
+                    query=ask_request.query,
+                    project_id=ask_request.project_id,
+                ),
+                self._pipelines["instructions_retrieval"].run(
+                    query=ask_request.query,
+                    project_id=ask_request.project_id,
+                    scope="sql",
+                ),
+            )
+        }
+
+        if allow_sql_functions_retrieval:
+            tasks["sql_functions"] = asyncio.create_task(
+                self._pipelines["sql_functions_retrieval"].run(
+                    project_id=ask_request.project_id,
+                )
+            )
+
+        if allow_sql_knowledge_retrieval:
+            tasks["sql_knowledge"] = asyncio.create_task(
+                self._pipelines["sql_knowledge_retrieval"].run(
+                    project_id=ask_request.project_id,
+                )
+            )
+
+        # follow-up questions are usually rephrased by the intent classification,
+        # so the retrieval with the original question would be wasted
+        if not histories or not self._allow_intent_classification:
+            tasks["db_schema_retrieval"] = asyncio.create_task(
+                self._pipelines["db_schema_retrieval"].run(
+                    query=ask_request.query,
+                    histories=histories,
+                    project_id=ask_request.project_id,
+                    enable_column_pruning=enable_column_pruning,
+                    mdl_hash=ask_request.mdl_hash,
+                )
+            )
+
+        return tasks
 
     def stop_ask(
         self,
@@ -6,6 +6,7 @@ from langfuse.decorators import observe
 from pydantic import BaseModel
 
 from src.core.pipeline import BasicPipeline
+from src.core.provider import llm_priority
 from src.utils import trace_metadata
 from src.web.v1.services import BaseRequest
 
@@ -81,6 +82,7 @@ class ChartService:
 
     @observe(name="Generate Chart")
     @trace_metadata
+    @llm_priority("followup")
     async def chart(
         self,
         chart_request: ChartRequest,
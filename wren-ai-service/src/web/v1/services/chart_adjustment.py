@@ -6,6 +6,7 @@ from langfuse.decorators import observe
 from pydantic import BaseModel
 
 from src.core.pipeline import BasicPipeline
+from src.core.provider import llm_priority
 from src.utils import trace_metadata
 from src.web.v1.services import BaseRequest
 
@@ -93,6 +94,7 @@ class ChartAdjustmentService:
 
     @observe(name="Adjust Chart")
     @trace_metadata
+    @llm_priority("followup")
     async def chart_adjustment(
         self,
         chart_adjustment_request: ChartAdjustmentRequest,
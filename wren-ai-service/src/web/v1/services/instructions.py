@@ -1,5 +1,5 @@
 import logging
-from typing import Dict, List, Literal, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 from cachetools import TTLCache
 from langfuse.decorators import observe
@@ -36,10 +36,14 @@ class InstructionsService:
     def __init__(
         self,
         pipelines: Dict[str, BasicPipeline],
+        caches: Optional[List[Any]] = None,
         maxsize: int = 1_000_000,
         ttl: int = 120,
     ):
         self._pipelines = pipelines
+        # caches derived from the indexed documents, e.g. the project catalog,
+        # they are invalidated whenever the documents of a project are indexed or deleted
+        self._caches = caches or []
         self._cache: Dict[str, self.Event] = TTLCache(maxsize=maxsize, ttl=ttl)
 
     # todo: move it to utils for super class?
@@ -120,6 +124,8 @@ class InstructionsService:
                 trace_id=trace_id,
                 request_from=request.request_from,
             )
+        finally:
+            self._invalidate_caches(request.project_id)
 
         return self._cache[request.event_id].with_metadata()
 
@@ -158,9 +164,15 @@ class InstructionsService:
                 trace_id=trace_id,
                 request_from=request.request_from,
             )
+        finally:
+            self._invalidate_caches(request.project_id)
 
         return self._cache[request.event_id].with_metadata()
 
+    def _invalidate_caches(self, project_id: Optional[str]):
+        for cache in self._caches:
+            cache.invalidate(project_id)
+
     def __getitem__(self, event_id: str) -> Event:
         response = self._cache.get(event_id)
 
@@ -8,6 +8,7 @@ from langfuse.decorators import observe
 from pydantic import BaseModel
 
 from src.core.pipeline import BasicPipeline
+from src.core.provider import llm_priority
 from src.utils import trace_metadata
 from src.web.v1.services import BaseRequest, MetadataTraceable
 
@@ -193,6 +194,7 @@ class QuestionRecommendation:
 
     @observe(name="Generate Question Recommendation")
     @trace_metadata
+    @llm_priority("background")
     async def recommend(self, input: Request, **kwargs) -> Event:
         logger.info(
             f"Request {input.event_id}: Generate Question Recommendation pipeline is running..."
@@ -7,6 +7,7 @@ from langfuse.decorators import observe
 from pydantic import BaseModel
 
 from src.core.pipeline import BasicPipeline
+from src.core.provider import llm_priority
 from src.utils import trace_metadata
 from src.web.v1.services import BaseRequest, MetadataTraceable
 
@@ -60,6 +61,7 @@ class RelationshipRecommendation:
 
     @observe(name="Generate Relationship Recommendation")
     @trace_metadata
+    @llm_priority("background")
     async def recommend(self, request: Input, **kwargs) -> Resource:
         logger.info("Generate Relationship Recommendation pipeline is running...")
         trace_id = kwargs.get("trace_id")
@@ -8,6 +8,7 @@ from langfuse.decorators import observe
 from pydantic import BaseModel
 
 from src.core.pipeline import BasicPipeline
+from src.core.provider import llm_priority
 from src.utils import trace_metadata
 from src.web.v1.services import BaseRequest, MetadataTraceable
 
@@ -102,6 +103,7 @@ class SemanticsDescription:
 
     @observe(name="Generate Semantics Description")
     @trace_metadata
+    @llm_priority("background")
     async def generate(self, request: GenerateRequest, **kwargs) -> Resource:
         logger.info("Generate Semantics Description pipeline is running...")
         trace_id = kwargs.get("trace_id")
@@ -1,6 +1,6 @@
 import asyncio
 import logging
-from typing import Dict, Literal, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 from cachetools import TTLCache
 from langfuse.decorators import observe
@@ -47,10 +47,14 @@ class SemanticsPreparationService:
     def __init__(
         self,
         pipelines: Dict[str, BasicPipeline],
+        caches: Optional[List[Any]] = None,
         maxsize: int = 1_000_000,
         ttl: int = 120,
     ):
         self._pipelines = pipelines
+        # caches derived from the indexed semantics, e.g. the schema cache of db_schema_retrieval,
+        # they are invalidated whenever the semantics of a project are prepared or deleted
+        self._caches = caches or []
         self._prepare_semantics_statuses: Dict[
             str, SemanticsPreparationStatusResponse
         ] = TTLCache(maxsize=maxsize, ttl=ttl)
@@ -90,6 +94,10 @@ class SemanticsPreparationService:
             ]
 
             await asyncio.gather(*tasks)
+            self._invalidate_caches(
+                prepare_semantics_request.project_id,
+                prepare_semantics_request.mdl_hash,
+            )
 
             self._prepare_semantics_statuses[
                 prepare_semantics_request.mdl_hash
@@ -112,8 +120,17 @@ class SemanticsPreparationService:
             results["metadata"]["error_type"] = "INDEXING_FAILED"
             results["metadata"]["error_message"] = str(e)
 
+            # the documents may be partially re-indexed
+            self._invalidate_caches(prepare_semantics_request.project_id)
+
         return results
 
+    def _invalidate_caches(
+        self, project_id: Optional[str], mdl_hash: Optional[str] = None
+    ):
+        for cache in self._caches:
+            cache.invalidate(project_id, mdl_hash)
+
     def get_prepare_semantics_status(
         self, prepare_semantics_status_request: SemanticsPreparationStatusRequest
     ) -> SemanticsPreparationStatusResponse:
@@ -157,3 +174,4 @@ class SemanticsPreparationService:
         ]
 
         await asyncio.gather(*tasks)
+        self._invalidate_caches(project_id)
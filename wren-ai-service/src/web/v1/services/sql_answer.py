@@ -7,6 +7,7 @@ from langfuse.decorators import observe
 from pydantic import BaseModel
 
 from src.core.pipeline import BasicPipeline
+from src.core.provider import llm_priority
 from src.utils import trace_metadata
 from src.web.v1.services import BaseRequest, SSEEvent
 
@@ -55,6 +56,7 @@ class SqlAnswerService:
 
     @observe(name="SQL Answer")
     @trace_metadata
+    @llm_priority("followup")
     async def sql_answer(
         self,
         sql_answer_request: SqlAnswerRequest,
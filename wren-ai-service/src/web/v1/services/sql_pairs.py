@@ -1,11 +1,12 @@
 import logging
-from typing import Dict, List, Literal, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 from cachetools import TTLCache
 from langfuse.decorators import observe
 from pydantic import BaseModel
 
 from src.core.pipeline import BasicPipeline
+from src.core.provider import llm_priority
 from src.pipelines.indexing.sql_pairs import SqlPair
 from src.utils import trace_metadata
 from src.web.v1.services import BaseRequest, MetadataTraceable
@@ -28,10 +29,14 @@ class SqlPairsService:
     def __init__(
         self,
         pipelines: Dict[str, BasicPipeline],
+        caches: Optional[List[Any]] = None,
         maxsize: int = 1_000_000,
         ttl: int = 120,
     ):
         self._pipelines = pipelines
+        # caches derived from the indexed documents, e.g. the project catalog,
+        # they are invalidated whenever the documents of a project are indexed or deleted
+        self._caches = caches or []
         self._cache: Dict[str, self.Event] = TTLCache(maxsize=maxsize, ttl=ttl)
 
     def _handle_exception(
@@ -57,6 +62,7 @@ class SqlPairsService:
 
     @observe(name="Prepare SQL Pairs")
     @trace_metadata
+    @llm_priority("background")
     async def index(
         self,
         request: IndexRequest,
@@ -91,6 +97,8 @@ class SqlPairsService:
                 trace_id=trace_id,
                 request_from=request.request_from,
             )
+        finally:
+            self._invalidate_caches(request.project_id)
 
         return self._cache[request.id].with_metadata()
 
@@ -124,9 +132,15 @@ class SqlPairsService:
                 f"Failed to delete SQL pairs: {e}",
                 request_from=request.request_from,
             )
+        finally:
+            self._invalidate_caches(request.project_id)
 
         return self._cache[request.id].with_metadata()
 
+    def _invalidate_caches(self, project_id: Optional[str]):
+        for cache in self._caches:
+            cache.invalidate(project_id)
+
     def __getitem__(self, id: str) -> Event:
         response = self._cache.get(id)
 
@@ -296,6 +296,9 @@ async def test_pipeline_run(mocker: MockFixture):
 
     # Mock document store provider
     document_store = mocker.Mock()
+    mocker.patch.object(
+        document_store, "get_document_ids", new_callable=AsyncMock, return_value=[]
+    )
     mocker.patch.object(
         document_store, "delete_documents", new_callable=AsyncMock, return_value=None
     )
@@ -347,6 +350,9 @@ async def test_pipeline_run_embedder_error(mocker: MockFixture):
 
     # Mock document store provider
     document_store = mocker.Mock()
+    mocker.patch.object(
+        document_store, "get_document_ids", new_callable=AsyncMock, return_value=[]
+    )
     mocker.patch.object(
         document_store, "delete_documents", new_callable=AsyncMock, return_value=None
     )
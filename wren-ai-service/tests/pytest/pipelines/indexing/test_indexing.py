@@ -2,7 +2,13 @@ import pytest
 from haystack import Document
 from haystack.document_stores.types import DocumentStore
 
-from src.pipelines.indexing import AsyncDocumentWriter, DocumentCleaner, MDLValidator
+from src.pipelines.indexing import (
+    AsyncDocumentWriter,
+    DocumentCleaner,
+    DocumentDiffer,
+    MDLValidator,
+    build_document_id,
+)
 
 
 class MockDocumentStore(DocumentStore):
@@ -16,6 +22,9 @@ class MockDocumentStore(DocumentStore):
         self.documents.extend(documents)
         return len(documents)
 
+    async def get_document_ids(self, filters=None):
+        return [document.id for document in self.documents]
+
     async def delete_documents(self, filters=None):
         self.deleted = True
         self.documents = []
@@ -41,6 +50,48 @@ async def test_document_cleaner():
     assert store2.deleted
 
 
+@pytest.mark.asyncio
+async def test_document_cleaner_with_document_ids():
+    store = MockDocumentStore(["document 1", "document 2"])
+    cleaner = DocumentCleaner(stores=[store])
+
+    # Nothing to remove, the store should be untouched
+    await cleaner.run(project_id="123", document_ids=[])
+    assert not store.deleted
+
+    await cleaner.run(project_id="123", document_ids=["fake-id"])
+    assert store.deleted
+
+
+def test_build_document_id():
+    meta = {"type": "TABLE_SCHEMA", "name": "user", "project_id": "123"}
+
+    assert build_document_id("content", meta) == build_document_id("content", {**meta})
+    assert build_document_id("content", meta) != build_document_id(
+        "changed content", meta
+    )
+    assert build_document_id("content", meta) != build_document_id(
+        "content", {**meta, "project_id": "456"}
+    )
+
+
+@pytest.mark.asyncio
+async def test_document_differ():
+    def _document(content: str) -> Document:
+        meta = {"name": "user", "project_id": "123"}
+        return Document(id=build_document_id(content, meta), content=content, meta=meta)
+
+    store = MockDocumentStore([_document("unchanged"), _document("removed")])
+    differ = DocumentDiffer(store=store)
+
+    result = await differ.run(
+        documents=[_document("unchanged"), _document("added")], project_id="123"
+    )
+
+    assert [document.content for document in result["documents"]] == ["added"]
+    assert result["stale_ids"] == [_document("removed").id]
+
+
 def test_mdl_validator():
     validator = MDLValidator()
 
@@ -0,0 +1,184 @@
+import orjson
+import pytest
+import qdrant_client
+from haystack import Document
+
+from src.pipelines.indexing.db_schema import DDLChunker
+from src.pipelines.retrieval.db_schema_retrieval import (
+    SchemaCache,
+    check_using_db_schemas_without_pruning,
+    construct_db_schemas,
+    dbschema_retrieval,
+)
+from src.providers.document_store.qdrant import (
+    AsyncQdrantDocumentStore,
+    AsyncQdrantEmbeddingRetriever,
+)
+
+
+class MockRetriever:
+    def __init__(self, documents: list[Document]):
+        self.documents = documents
+        self.requested_names = []
+
+    async def run(self, query_embedding, filters, top_k=None):
+        names = filters["conditions"][1]["value"]
+        self.requested_names.append(names)
+        return {
+            "documents": [
+                document
+                for document in self.documents
+                if document.meta["name"] in names
+            ]
+        }
+
+
+def _document(name: str, payload: dict) -> Document:
+    return Document(
+        content=orjson.dumps(payload).decode(),
+        meta={"type": "TABLE_SCHEMA", "name": name},
+    )
+
+
+def _table_retrieval(*names: str) -> dict:
+    return {
+        "documents": [
+            Document(content=orjson.dumps({"name": name}).decode()) for name in names
+        ]
+    }
+
+
+COLUMN = {
+    "type": "COLUMN",
+    "comment": "",
+    "name": "id",
+    "data_type": "INTEGER",
+    "is_primary_key": True,
+}
+DOCUMENTS = [
+    _document("user", {"type": "TABLE_COLUMNS", "columns": [COLUMN]}),
+    _document("user", {"type": "TABLE", "comment": "", "name": "user"}),
+    _document(
+        "user_view",
+        {"type": "VIEW", "comment": "", "name": "user_view", "statement": "SELECT 1"},
+    ),
+    # a table without columns is incomplete
+    _document("empty", {"type": "TABLE", "comment": "", "name": "empty"}),
+]
+
+
+@pytest.mark.asyncio
+async def test_dbschema_retrieval_with_schema_cache():
+    retriever = MockRetriever(DOCUMENTS)
+    cache = SchemaCache()
+
+    schemas = await dbschema_retrieval(
+        _table_retrieval("user", "user_view", "empty"),
+        "project",
+        "mdl",
+        retriever,
+        cache,
+    )
+    assert [schema["type"] for schema in schemas] == ["TABLE", "VIEW"]
+    assert schemas[0]["ddl"] == "CREATE TABLE user (\n  id INTEGER PRIMARY KEY\n);"
+    assert schemas[1]["ddl"] == "CREATE VIEW user_view\nAS SELECT 1"
+    assert construct_db_schemas(schemas) == [
+        {"type": "TABLE", "comment": "", "name": "user", "columns": [COLUMN]}
+    ]
+
+    # the cached tables are not fetched again, including the incomplete one
+    schemas = await dbschema_retrieval(
+        _table_retrieval("user", "empty"), "project", "mdl", retriever, cache
+    )
+    assert [schema["content"]["name"] for schema in schemas] == ["user"]
+    assert retriever.requested_names == [["user", "user_view", "empty"]]
+
+    # other projects and invalidated projects are fetched from the store
+    await dbschema_retrieval(_table_retrieval("user"), "other", "mdl", retriever, cache)
+    cache.invalidate("project", "new-mdl")
+    await dbschema_retrieval(
+        _table_retrieval("user"), "project", "new-mdl", retriever, cache
+    )
+    assert retriever.requested_names[1:] == [["user"], ["user"]]
+
+    # a re-deploy this cache was not invalidated for is fetched from the store too
+    await dbschema_retrieval(
+        _table_retrieval("user"), "project", "newer-mdl", retriever, cache
+    )
+    await dbschema_retrieval(
+        _table_retrieval("user"), "project", "newer-mdl", retriever, cache
+    )
+    assert retriever.requested_names[3:] == [["user"]]
+
+
+@pytest.mark.asyncio
+async def test_check_using_db_schemas_without_pruning():
+    schemas = await dbschema_retrieval(
+        _table_retrieval("user_view", "user"), "", "", MockRetriever(DOCUMENTS), None
+    )
+
+    class MockEncoding:
+        def encode(self, text):
+            return text.split()
+
+    result = check_using_db_schemas_without_pruning(
+        schemas, MockEncoding(), enable_column_pruning=False, context_window_size=100
+    )
+    assert [schema["table_name"] for schema in result["db_schemas"]] == [
+        "user",
+        "user_view",
+    ]
+    assert not result["has_metric"]
+
+    result = check_using_db_schemas_without_pruning(
+        schemas, MockEncoding(), enable_column_pruning=True, context_window_size=100
+    )
+    assert result["db_schemas"] == []
+
+
+@pytest.mark.asyncio
+async def test_dbschema_retrieval_of_wide_tables():
+    mdl = {
+        "models": [
+            {
+                "name": name,
+                "columns": [
+                    {"name": f"column_{i}", "type": "INTEGER"}
+                    for i in range(column_count)
+                ],
+                "primaryKey": "column_0",
+            }
+            for name, column_count in [("wide", 1_000), ("narrow", 2), ("other", 2)]
+        ],
+        "views": [],
+        "relationships": [],
+        "metrics": [],
+    }
+    documents = (await DDLChunker().run(mdl, column_batch_size=50, project_id="p"))[
+        "documents"
+    ]
+    for document in documents:
+        document.embedding = [1.0, 0.0]
+
+    store = AsyncQdrantDocumentStore(
+        embedding_dim=2,
+        progress_bar=False,
+        async_client=qdrant_client.AsyncQdrantClient(":memory:"),
+    )
+    await store.write_documents(documents)
+    # the wide table is split into 21 chunks, they are all retrieved in its group
+    retriever = AsyncQdrantEmbeddingRetriever(
+        document_store=store,
+        payload_fields=["content", "name"],
+        group_by="name",
+        group_size=100,
+    )
+
+    schemas = await dbschema_retrieval(
+        _table_retrieval("wide", "narrow"), "p", "", retriever, None
+    )
+    assert [schema["content"]["name"] for schema in schemas] == ["wide", "narrow"]
+    assert {column["name"] for column in schemas[0]["content"]["columns"]} == {
+        f"column_{i}" for i in range(1_000)
+    }
+    assert len(schemas[1]["content"]["columns"]) == 2
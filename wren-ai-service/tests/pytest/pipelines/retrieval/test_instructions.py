@@ -0,0 +1,82 @@
+import pytest
+from haystack import Document
+
+from src.pipelines.common import ProjectCatalog
+from src.pipelines.retrieval.instructions import Instructions
+from src.providers.document_store.embedded import EmbeddedProvider
+
+
+class MockEmbedder:
+    async def run(self, text):
+        return {"embedding": [1.0, 0.0]}
+
+
+class MockEmbedderProvider:
+    def get_text_embedder(self):
+        return MockEmbedder()
+
+
+def _instruction(id: str, is_default: bool) -> Document:
+    return Document(
+        id=id,
+        content="" if is_default else "question",
+        embedding=[1.0, 0.0],
+        meta={
+            "project_id": "project",
+            "instruction": f"instruction {id}",
+            "instruction_id": id,
+            "is_default": is_default,
+            "scope": "sql",
+        },
+    )
+
+
+@pytest.mark.asyncio
+async def test_instructions_retrieval_with_project_catalog():
+    document_store_provider = EmbeddedProvider()
+    store = document_store_provider.get_store(dataset_name="instructions")
+    catalog = ProjectCatalog()
+    pipeline = Instructions(
+        embedder_provider=MockEmbedderProvider(),
+        document_store_provider=document_store_provider,
+        project_catalog=catalog,
+    )
+
+    lookups = []
+    count_documents = store.count_documents
+    query_by_filters = store._query_by_filters
+
+    async def _count_documents(*args, **kwargs):
+        lookups.append("count")
+        return await count_documents(*args, **kwargs)
+
+    async def _query_by_filters(*args, **kwargs):
+        lookups.append("default_instructions")
+        return await query_by_filters(*args, **kwargs)
+
+    store.count_documents = _count_documents
+    store._query_by_filters = _query_by_filters
+
+    # an empty project is only counted once
+    assert await pipeline.run("question", project_id="project") == {
+        "formatted_output": {"documents": []}
+    }
+    await pipeline.run("question", project_id="project")
+    assert lookups == ["count"]
+
+    await store.write_documents([_instruction("1", True), _instruction("2", False)])
+    catalog.invalidate("project")
+    lookups.clear()
+
+    for _ in range(2):
+        result = await pipeline.run("question", project_id="project")
+        assert [
+            document["instruction_id"]
+            for document in result["formatted_output"]["documents"]
+        ] == ["1", "2"]
+    assert lookups == ["count", "default_instructions"]
+
+    # other scopes and projects are looked up separately
+    await pipeline.run("question", project_id="project", scope="answer")
+    await pipeline.run("question", project_id="other")
+    assert lookups[2:] == ["default_instructions", "count"]
@@ -0,0 +1,452 @@
+import asyncio
+
+import pytest
+import qdrant_client
+from haystack import Document
+from haystack.document_stores.errors import DuplicateDocumentError
+from haystack.document_stores.types import DuplicatePolicy
+from qdrant_client.http import models as rest
+
+from src.pipelines.common import SparseEncoder
+from src.providers.document_store.embedded import EmbeddedProvider
+from src.providers.document_store.qdrant import (
+    AsyncQdrantDocumentStore,
+    AsyncQdrantEmbeddingRetriever,
+    QdrantProvider,
+    convert_filters,
+    get_clients,
+)
+
+
+def test_qdrant_clients_are_shared():
+    provider = QdrantProvider(location=":memory:", embedding_model_dim=4)
+    store = provider.get_store()
+
+    # the stores are shared by the pipelines and the collections share the clients
+    assert provider.get_store() is store
+    table_descriptions = provider.get_store(dataset_name="table_descriptions")
+    assert table_descriptions is not store
+    assert table_descriptions.async_client is store.async_client
+    assert table_descriptions.client is store.client
+    assert get_clients(":memory:", timeout=120)[1] is store.async_client
+
+    # recreating the index sets up a new store
+    assert provider.get_store(recreate_index=True) is not store
+
+
+class BlockingClient:
+    def __getattr__(self, name):
+        raise AssertionError(f"blocking call to QdrantClient.{name}")
+
+
+@pytest.mark.asyncio
+async def test_write_documents_does_not_block():
+    async_client = qdrant_client.AsyncQdrantClient(":memory:")
+    store = AsyncQdrantDocumentStore(
+        index="test",
+        embedding_dim=4,
+        progress_bar=False,
+        client=BlockingClient(),
+        async_client=async_client,
+    )
+
+    calls = []
+    collection_exists = async_client.collection_exists
+
+    async def _collection_exists(*args, **kwargs):
+        calls.append(args)
+        return await collection_exists(*args, **kwargs)
+
+    async_client.collection_exists = _collection_exists
+
+    documents = [
+        Document(
+            id=str(i), content=f"document {i}", embedding=[1.0, i, 0.0, 0.0], meta={}
+        )
+        for i in range(3)
+    ]
+    assert await store.write_documents(documents, policy=DuplicatePolicy.OVERWRITE) == 3
+    assert await store.write_documents(documents, policy=DuplicatePolicy.SKIP) == 0
+    with pytest.raises(DuplicateDocumentError):
+        await store.write_documents(documents[:1], policy=DuplicatePolicy.FAIL)
+    assert await store.count_documents() == 3
+
+    # the collection is set up only once
+    assert calls == [("test",)]
+
+
+@pytest.mark.asyncio
+async def test_write_documents_pipelines_batches():
+    async_client = qdrant_client.AsyncQdrantClient(":memory:")
+    store = AsyncQdrantDocumentStore(
+        index="test",
+        embedding_dim=4,
+        progress_bar=False,
+        write_batch_size=2,
+        max_concurrent_writes=2,
+        async_client=async_client,
+    )
+
+    upserts = []
+    in_flight = []
+    upsert = async_client.upsert
+
+    async def _upsert(*args, **kwargs):
+        in_flight.append(kwargs["points"])
+        upserts.append((len(in_flight), len(kwargs["points"]), kwargs["wait"]))
+        await asyncio.sleep(0.01)
+        in_flight.remove(kwargs["points"])
+        return await upsert(*args, **kwargs)
+
+    async_client.upsert = _upsert
+
+    documents = [
+        Document(id=str(i), content=f"document {i}", embedding=[1.0, i, 0.0, 0.0])
+        for i in range(7)
+    ]
+    assert await store.write_documents(documents, policy=DuplicatePolicy.OVERWRITE) == 7
+    assert await store.count_documents() == 7
+
+    # at most 2 batches in flight, only the last one waits for the writes to be applied
+    assert max(concurrency for concurrency, _, _ in upserts) == 2
+    assert [(size, wait) for _, size, wait in upserts] == [
+        (2, False),
+        (2, False),
+        (2, False),
+        (1, True),
+    ]
+    assert upserts[-1][0] == 1
+
+
+def test_convert_filters():
+    filters = convert_filters(
+        {
+            "operator": "AND",
+            "conditions": [
+                {"field": "type", "operator": "==", "value": "TABLE_SCHEMA"},
+                {"field": "name", "operator": "in", "value": ["a", "b c"]},
+                {"field": "scope", "operator": "==", "value": None},
+            ],
+        }
+    )
+
+    assert filters == rest.Filter(
+        must=[
+            rest.FieldCondition(
+                key="type", match=rest.MatchValue(value="TABLE_SCHEMA")
+            ),
+            rest.FieldCondition(key="name", match=rest.MatchAny(any=["a", "b c"])),
+            rest.IsEmptyCondition(is_empty=rest.PayloadField(key="scope")),
+        ]
+    )
+
+
+@pytest.mark.asyncio
+async def test_query_by_filters_with_scope():
+    store = AsyncQdrantDocumentStore(
+        index="instructions",
+        embedding_dim=4,
+        progress_bar=False,
+        async_client=qdrant_client.AsyncQdrantClient(":memory:"),
+    )
+    await store.write_documents(
+        [
+            Document(id="1", content="sql", meta={"scope": "sql"}),
+            Document(id="2", content="answer", meta={"scope": "answer"}),
+            Document(id="3", content="no scope", meta={}),
+        ]
+    )
+
+    documents = await store._query_by_filters(
+        filters={
+            "operator": "OR",
+            "conditions": [
+                {"field": "scope", "operator": "==", "value": "sql"},
+                {"field": "scope", "operator": "==", "value": None},
+            ],
+        },
+        top_k=10,
+    )
+    assert sorted(document.content for document in documents) == ["no scope", "sql"]
+
+    documents = await store._query_by_filters(
+        filters={"field": "content", "operator": "in", "value": ["answer", "sql"]},
+        top_k=10,
+    )
+    assert sorted(document.content for document in documents) == ["answer", "sql"]
+
+
+@pytest.mark.asyncio
+async def test_retriever_projects_payload_fields():
+    store = AsyncQdrantDocumentStore(
+        index="Document",
+        embedding_dim=4,
+        progress_bar=False,
+        async_client=qdrant_client.AsyncQdrantClient(":memory:"),
+        scroll_size=1,
+    )
+    await store.write_documents(
+        [
+            Document(
+                id=str(i),
+                content=f"table {i}",
+                embedding=[0.1, 0.2, 0.3, float(i)],
+                meta={"name": f"table_{i}", "type": "TABLE_SCHEMA"},
+            )
+            for i in range(3)
+        ]
+    )
+    retriever = AsyncQdrantEmbeddingRetriever(
+        document_store=store, payload_fields=["content", "name"]
+    )
+
+    # the documents are scrolled in pages of scroll_size, without the vectors
+    documents = (await retriever.run(query_embedding=[]))["documents"]
+    assert sorted(document.id for document in documents) == ["0", "1", "2"]
+    for document in documents:
+        assert document.meta == {"name": f"table_{document.id}"}
+        assert document.content == f"table {document.id}"
+        assert document.embedding is None
+
+    documents = (await retriever.run(query_embedding=[0.1, 0.2, 0.3, 2.0]))["documents"]
+    assert len(documents) == 3
+    assert all(set(document.meta) == {"name"} for document in documents)
+    assert all(document.embedding is None for document in documents)
+
+    # the whole payload is returned without payload fields
+    documents = await store._query_by_filters(return_embedding=True)
+    assert all(
+        document.meta["type"] == "TABLE_SCHEMA" and document.embedding
+        for document in documents
+    )
+
+
+@pytest.mark.asyncio
+async def test_hybrid_table_retrieval():
+    encoder = SparseEncoder()
+    assert encoder.tokenize("orderItems, order_items") == [
+        "order",
+        "item",
+        "orderitems",
+        "order",
+        "item",
+        "order_items",
+    ]
+
+    store = AsyncQdrantDocumentStore(
+        index="table_descriptions",
+        embedding_dim=2,
+        progress_bar=False,
+        async_client=qdrant_client.AsyncQdrantClient(":memory:"),
+        use_sparse_embeddings=True,
+        sparse_idf=True,
+    )
+    tables = {
+        "customers": "id, name, email",
+        "orders": "id, customer_id, status",
+        "products": "id, name, price",
+    }
+    await store.write_documents(
+        [
+            Document(
+                id=str(i),
+                content=name,
+                # the dense search alone ranks the products first
+                embedding=[1.0, float(i)],
+                sparse_embedding=encoder.encode_document(f"{name} {columns}"),
+                meta={"type": "TABLE_DESCRIPTION"},
+            )
+            for i, (name, columns) in enumerate(tables.items())
+        ]
+    )
+    retriever = AsyncQdrantEmbeddingRetriever(document_store=store, top_k=1)
+
+    documents = (await retriever.run(query_embedding=[0.0, 1.0]))["documents"]
+    assert [document.content for document in documents] == ["products"]
+
+    documents = (
+        await retriever.run(
+            query_embedding=[0.0, 1.0],
+            query_sparse_embedding=encoder.encode_query("status of the orders"),
+        )
+    )["documents"]
+    assert [document.content for document in documents] == ["orders"]
+
+
+class ShardedClient:
+    """
+    The local Qdrant client ignores the shard keys, record them instead,
+    and reject the operations on missing shard keys like a distributed Qdrant.
+    """
+
+    def __init__(self):
+        self._client = qdrant_client.AsyncQdrantClient(":memory:")
+        self.shard_keys = set()
+        self.selectors = []
+
+    async def create_shard_key(self, collection_name, shard_key):
+        if shard_key in self.shard_keys:
+            raise Exception(f"Shard key {shard_key} already exists")
+        self.shard_keys.add(shard_key)
+
+    async def delete_shard_key(self, collection_name, shard_key):
+        self.shard_keys.remove(shard_key)
+        await self._client.delete(
+            collection_name,
+            points_selector=rest.Filter(
+                must=[
+                    rest.FieldCondition(
+                        key="project_id", match=rest.MatchValue(value=shard_key)
+                    )
+                ]
+            ),
+        )
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+
+        async def _record(*args, **kwargs):
+            if "shard_key_selector" in kwargs:
+                selector = kwargs["shard_key_selector"]
+                self.selectors.append((name, selector))
+                if selector is not None and selector not in self.shard_keys:
+                    raise Exception(f"Wrong input: Shard key {selector} not found")
+            return await method(*args, **kwargs)
+
+        return _record
+
+
+@pytest.mark.asyncio
+async def test_shard_by_project():
+    client = ShardedClient()
+    store = AsyncQdrantDocumentStore(
+        index="sql_pairs",
+        embedding_dim=2,
+        progress_bar=False,
+        async_client=client,
+        shard_by_project=True,
+    )
+    await store.write_documents(
+        [
+            Document(id=str(i), content="question", embedding=[1.0, 0.0], meta=meta)
+            for i, meta in enumerate(
+                [{"project_id": "a"}, {"project_id": "a"}, {"project_id": "b"}, {}]
+            )
+        ]
+    )
+    assert client.shard_keys == {"a", "b", "default"}
+    assert sorted(
+        selector for name, selector in client.selectors if name == "upsert"
+    ) == ["a", "b", "default"]
+
+    # the operations filtered by a project only touch its shard
+    client.selectors.clear()
+    project_a = {
+        "operator": "AND",
+        "conditions": [{"field": "project_id", "operator": "==", "value": "a"}],
+    }
+    assert await store.count_documents(project_a) == 2
+    await store._query_by_embedding([1.0, 0.0], filters=project_a)
+    await store.count_documents({"field": "content", "operator": "==", "value": "x"})
+    assert client.selectors == [("count", "a"), ("search", "a"), ("count", None)]
+
+    # deleting all the documents of a project drops its shard
+    await store.delete_documents(project_a)
+    assert client.shard_keys == {"b", "default"}
+    assert await store.count_documents() == 2
+
+    # reading a project without shard is empty and does not create it
+    assert await store.count_documents(project_a) == 0
+    assert await store._query_by_embedding([1.0, 0.0], filters=project_a) == []
+    assert await store.get_document_ids(project_a) == []
+    assert client.shard_keys == {"b", "default"}
+
+    # writing to a shard dropped by another worker recreates it
+    await client.delete_shard_key("sql_pairs", "b")
+    project_b = {
+        "operator": "AND",
+        "conditions": [{"field": "project_id", "operator": "==", "value": "b"}],
+    }
+    await store.write_documents(
+        [
+            Document(
+                id="4",
+                content="question",
+                embedding=[1.0, 0.0],
+                meta={"project_id": "b"},
+            )
+        ]
+    )
+    assert client.shard_keys == {"b", "default"}
+    assert await store.count_documents(project_b) == 1
+
+
+def _documents(project_id: str) -> list[Document]:
+    return [
+        Document(
+            id=f"{project_id}-{i}",
+            content=f"question {i}",
+            embedding=[1.0, float(i), 0.0],
+            meta={"project_id": project_id, "sql": f"SELECT {i}"},
+        )
+        for i in range(3)
+    ] + [Document(id=f"{project_id}-meta", content="", meta={"project_id": project_id})]
+
+
+@pytest.mark.asyncio
+async def test_embedded_document_store(tmp_path):
+    provider = EmbeddedProvider(path=str(tmp_path))
+    store = provider.get_store(dataset_name="sql_pairs")
+    assert provider.get_store(dataset_name="sql_pairs") is store
+
+    assert await store.write_documents(_documents("a")) == 4
+    assert await store.write_documents(_documents("b")) == 4
+    with pytest.raises(DuplicateDocumentError):
+        await store.write_documents(_documents("a"))
+    assert await store.write_documents(_documents("a"), DuplicatePolicy.SKIP) == 0
+    assert await store.count_documents() == 8
+
+    project_a = {"field": "project_id", "operator": "==", "value": "a"}
+    retriever = provider.get_retriever(store, top_k=2, payload_fields=["content"])
+    documents = (
+        await retriever.run(query_embedding=[1.0, 2.0, 0.0], filters=project_a)
+    )["documents"]
+    assert [document.id for document in documents] == ["a-2", "a-1"]
+    assert documents[0].score == pytest.approx(1.0)
+    assert documents[0].meta == {}
+
+    documents = await store._query_by_filters(
+        filters={
+            "operator": "AND",
+            "conditions": [
+                project_a,
+                {"field": "sql", "operator": "in", "value": ["SELECT 0", "SELECT 1"]},
+            ],
+        },
+    )
+    assert sorted(document.id for document in documents) == ["a-0", "a-1"]
+
+    # overwriting and deleting documents is persisted, and loaded on startup
+    await store.write_documents(
+        [Document(id="a-0", content="updated", meta={"project_id": "a"})],
+        DuplicatePolicy.OVERWRITE,
+    )
+    await store.delete_documents(
+        {"field": "project_id", "operator": "==", "value": "b"}
+    )
+
+    store = EmbeddedProvider(path=str(tmp_path)).get_store(dataset_name="sql_pairs")
+    assert sorted(await store.get_document_ids()) == ["a-0", "a-1", "a-2", "a-meta"]
+    documents = store.filter_documents(
+        {"field": "content", "operator": "==", "value": "updated"}
+    )
+    assert [document.id for document in documents] == ["a-0"]
+    assert documents[0].meta == {"project_id": "a"}
+
+    documents = await store._query_by_embedding([0.0, 1.0, 0.0], top_k=10)
+    assert [document.id for document in documents] == ["a-2", "a-1"]
+
+    store = EmbeddedProvider(path=str(tmp_path), recreate_index=True).get_store(
+        dataset_name="sql_pairs"
+    )
+    assert await store.count_documents() == 0
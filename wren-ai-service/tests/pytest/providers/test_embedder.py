@@ -0,0 +1,238 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import openai
+import pytest
+from haystack import Document
+from litellm import Usage
+from pytest_mock import MockerFixture
+
+from src.core.provider import embedding_scope
+from src.providers.cache import TieredCache, _SqliteTier
+from src.providers.embedder.litellm import (
+    AsyncDocumentEmbedder,
+    AsyncTextEmbedder,
+    _dump_embedding,
+    _load_embedding,
+)
+from src.providers.embedder.scheduler import EmbeddingBatchScheduler
+from src.providers.singleflight import SingleFlight
+
+
+def _response(texts):
+    response = MagicMock()
+    response.model = "fake-model"
+    response.data = [{"embedding": [float(len(text)), 1.0]} for text in texts]
+    response.usage = Usage(prompt_tokens=len(texts), total_tokens=len(texts))
+    return response
+
+
+@pytest.fixture
+def aembedding(mocker: MockerFixture):
+    return mocker.patch(
+        "src.providers.embedder.litellm.aembedding",
+        new_callable=AsyncMock,
+        side_effect=lambda input, **kwargs: _response(input),
+    )
+
+
+@pytest.mark.asyncio
+async def test_document_embedder_with_cache(aembedding):
+    cache = TieredCache(namespace="embedding")
+    embedder = AsyncDocumentEmbedder(model="fake-model", cache=cache)
+
+    result = await embedder.run(
+        documents=[Document(content="a"), Document(content="bb"), Document(content="a")]
+    )
+    assert [doc.embedding for doc in result["documents"]] == [
+        [1.0, 1.0],
+        [2.0, 1.0],
+        [1.0, 1.0],
+    ]
+    # identical texts are only sent once
+    assert aembedding.call_args.kwargs["input"] == ["a", "bb"]
+    assert result["meta"]["cache"] == {"hits": 0, "misses": 3}
+
+    aembedding.reset_mock()
+    result = await embedder.run(
+        documents=[Document(content="bb"), Document(content="ccc")]
+    )
+    assert [doc.embedding for doc in result["documents"]] == [[2.0, 1.0], [3.0, 1.0]]
+    assert aembedding.call_args.kwargs["input"] == ["ccc"]
+    assert result["meta"]["cache"] == {"hits": 1, "misses": 1}
+
+    # the text embedder shares the same keys as the document embedder
+    aembedding.reset_mock()
+    text_embedder = AsyncTextEmbedder(model="fake-model", cache=cache)
+    result = await text_embedder.run(text="ccc")
+    assert result["embedding"] == [3.0, 1.0]
+    assert result["meta"]["cache"] == {"hits": 1, "misses": 0}
+    aembedding.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_embedding_cache_persisted_to_disk(aembedding, tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    embedder = AsyncTextEmbedder(
+        model="fake-model", cache=TieredCache(namespace="embedding", path=path)
+    )
+    await embedder.run(text="hello")
+    assert aembedding.call_count == 1
+
+    # a new cache instance, e.g. after a restart, reads from the disk tier
+    cache = TieredCache(namespace="embedding", path=path)
+    embedder = AsyncTextEmbedder(model="fake-model", cache=cache)
+    result = await embedder.run(text="hello")
+    assert result["embedding"] == [5.0, 1.0]
+    assert aembedding.call_count == 1
+    assert cache.stats()["hits"] == 1
+
+    # other models do not share the cached embeddings
+    embedder = AsyncTextEmbedder(model="another-model", cache=cache)
+    await embedder.run(text="hello")
+    assert aembedding.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_embedding_cache_disk_tier_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(_SqliteTier, "PRUNE_INTERVAL", 1)
+    now = 1_000.0
+    monkeypatch.setattr("src.providers.cache.time.time", lambda: now)
+    path = str(tmp_path / "embeddings.sqlite3")
+    cache = TieredCache(namespace="embedding", path=path, disk_maxsize=2, ttl=60)
+
+    for i, key in enumerate(["a", "b", "c"]):
+        now = 1_000.0 + i
+        await cache.set(key, [float(i)])
+
+    # the oldest rows over the limit are deleted, and the rows expire after the ttl
+    disk = TieredCache(namespace="embedding", path=path, ttl=60)
+    assert await disk.get_many(["a", "b", "c"]) == {"b": [1.0], "c": [2.0]}
+    now = 1_061.5
+    assert await TieredCache(namespace="embedding", path=path, ttl=60).get_many(
+        ["b", "c"]
+    ) == {"c": [2.0]}
+
+
+@pytest.mark.asyncio
+async def test_embedding_cache_bounded_by_bytes(aembedding):
+    cache = TieredCache(
+        namespace="embedding",
+        dumps=_dump_embedding,
+        loads=_load_embedding,
+        maxbytes=16,
+    )
+    embedder = AsyncTextEmbedder(model="fake-model", cache=cache)
+
+    # a caller modifying its embedding does not modify the cached one
+    (await embedder.run(text="a"))["embedding"].append(0.0)
+    assert (await embedder.run(text="a"))["embedding"] == [1.0, 1.0]
+    assert aembedding.call_count == 1
+
+    # two float32 embeddings of 2 dimensions fill the 16 bytes, the least recent is evicted
+    await embedder.run(text="bb")
+    await embedder.run(text="ccc")
+    assert cache.stats()["size"] == 2
+    await embedder.run(text="a")
+    assert aembedding.call_count == 4
+
+
+@pytest.mark.asyncio
+async def test_scheduler_bounds_concurrency_and_retries_single_batch():
+    in_flight = 0
+    max_in_flight = 0
+    calls = []
+
+    async def embed(batch):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            calls.append(list(batch))
+            if len(calls) == 2:
+                raise openai.RateLimitError(
+                    "rate limited",
+                    response=httpx.Response(
+                        429, request=httpx.Request("POST", "http://fake")
+                    ),
+                    body=None,
+                )
+            return batch
+        finally:
+            in_flight -= 1
+
+    scheduler = EmbeddingBatchScheduler(batch_size=4, max_concurrent_batches=2)
+    # keep the retry delay short
+    with patch("src.providers.embedder.scheduler.random.random", return_value=0):
+        responses = await scheduler.run([str(i) for i in range(16)], embed)
+
+    assert max_in_flight <= 2
+    # only the rate limited batch is retried and the batches keep the input order
+    assert [text for response in responses for text in response] == [
+        str(i) for i in range(16)
+    ]
+    assert sum(len(batch) for batch in calls) == 16 + len(calls[1])
+    # the batch size shrinks after the rate limit
+    assert min(len(batch) for batch in calls) < 4
+
+
+@pytest.mark.asyncio
+async def test_scheduler_recovers_from_cancelled_run():
+    async def embed(batch):
+        await asyncio.sleep(0)
+        return batch
+
+    scheduler = EmbeddingBatchScheduler(batch_size=1, max_concurrent_batches=4)
+    # cancelled while its batches are scheduled, before they start
+    run = asyncio.create_task(scheduler.run(["a", "b", "c", "d"], embed))
+    await asyncio.sleep(0)
+    run.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await run
+
+    # the slots of the cancelled batches are not lost
+    responses = await asyncio.wait_for(scheduler.run(["a", "b"], embed), timeout=1)
+    assert responses == [["a"], ["b"]]
+
+
+@pytest.mark.asyncio
+async def test_text_embedder_shares_embeddings_in_scope(aembedding):
+    embedder = AsyncTextEmbedder(model="fake-model")
+
+    @embedding_scope
+    async def ask():
+        # a query without histories is prefixed with a newline by some pipelines
+        return await asyncio.gather(
+            embedder.run(text="how many users?"),
+            embedder.run(text="\nhow many users?"),
+            AsyncTextEmbedder(model="fake-model").run(text="how many users?"),
+        )
+
+    results = await ask()
+    assert aembedding.call_count == 1
+    assert all(result["embedding"] == results[0]["embedding"] for result in results)
+
+    # the scope ends with the request
+    await ask()
+    assert aembedding.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_text_embedder_coalesces_concurrent_scopes(aembedding):
+    single_flight = SingleFlight(name="embedding")
+    embedder = AsyncTextEmbedder(model="fake-model", single_flight=single_flight)
+
+    @embedding_scope
+    async def ask():
+        return await embedder.run(text="how many users?")
+
+    # the concurrent asks share one request, their results are not shared objects
+    results = await asyncio.gather(ask(), ask(), ask())
+    assert aembedding.call_count == 1
+    assert results[0] == results[1] and results[0] is not results[1]
+    assert single_flight.stats() == {"calls": 1, "coalesced": 2, "in_flight": 0}
+
+    await ask()
+    assert aembedding.call_count == 2
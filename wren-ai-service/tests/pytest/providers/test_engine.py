@@ -0,0 +1,70 @@
+import pytest
+
+from src.providers.engine.wren import WrenIbis, WrenUI
+
+
+@pytest.mark.asyncio
+async def test_engine_session_is_pooled():
+    engine = WrenUI(endpoint="http://localhost:3000")
+
+    session = engine.session
+    assert engine.session is session
+    # each engine owns its own pool
+    other = WrenIbis(endpoint="http://localhost:8000")
+    assert other.session is not session
+    await other.close()
+
+    await engine.close()
+    assert session.closed
+    assert engine.session is not session
+
+    await engine.close()
+
+
+@pytest.mark.asyncio
+async def test_dry_run_cache(monkeypatch):
+    engine = WrenIbis(endpoint="http://localhost:8000", source="postgres")
+    calls = []
+
+    class MockResponse:
+        def __init__(self, status: int):
+            self.status = status
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *args):
+            pass
+
+        async def text(self):
+            return ""
+
+        async def json(self):
+            return {}
+
+    def post(url, **kwargs):
+        calls.append(kwargs["json"]["sql"])
+        return MockResponse(200 if "orders" in kwargs["json"]["sql"] else 500)
+
+    session = engine.session
+    monkeypatch.setattr(session, "post", post)
+
+    assert (await engine.execute_sql("SELECT * FROM orders", session))[0]
+    # the same sql with different formatting is validated only once
+    assert (await engine.execute_sql("SELECT *\n  FROM orders;", session))[0]
+    assert calls == ["SELECT * FROM orders"]
+
+    # dry plans and previews are cached separately, failures are not cached
+    assert (await engine.dry_plan(session, "SELECT * FROM orders", "postgres"))[0]
+    assert not (await engine.dry_plan(session, "SELECT * FROM users", "postgres"))[0]
+    assert not (await engine.dry_plan(session, "SELECT * FROM users", "postgres"))[0]
+    await engine.execute_sql("SELECT * FROM orders", session, dry_run=False)
+    assert calls == [
+        "SELECT * FROM orders",
+        "SELECT * FROM orders",
+        "SELECT * FROM users",
+        "SELECT * FROM users",
+        "SELECT * FROM orders",
+    ]
+
+    await engine.close()
@@ -0,0 +1,227 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from litellm import ModelResponse, Usage
+from pytest_mock import MockerFixture
+
+from src.core.provider import llm_priority
+from src.providers.llm import ChatMessage
+from src.providers.llm.litellm import LitellmLLMProvider
+from src.providers.llm.scheduler import LLMScheduler
+
+
+def _response():
+    return ModelResponse(
+        model="fake-model",
+        choices=[
+            {
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": '{"sql": "SELECT 1"}'},
+            }
+        ],
+        usage=Usage(
+            prompt_tokens=1_200,
+            completion_tokens=10,
+            total_tokens=1_210,
+            prompt_tokens_details={"cached_tokens": 1_024},
+        ),
+    )
+
+
+@pytest.fixture
+def acompletion(mocker: MockerFixture):
+    return mocker.patch(
+        "src.providers.llm.litellm.acompletion",
+        new_callable=AsyncMock,
+        side_effect=lambda **kwargs: _response(),
+    )
+
+
+@pytest.mark.asyncio
+async def test_generator_with_prompt_caching(acompletion):
+    provider = LitellmLLMProvider(model="fake-model", prompt_caching=True)
+    generator = provider.get_generator(system_prompt="rules")
+
+    result = await generator(
+        prompt="question",
+        history_messages=[
+            ChatMessage.from_user("previous question"),
+            ChatMessage.from_assistant("previous answer"),
+        ],
+    )
+    assert result["replies"] == ['{"sql": "SELECT 1"}']
+    assert result["meta"][0]["usage"]["cached_tokens"] == 1_024
+
+    # the system prompt and the last history message are the cache breakpoints
+    messages = acompletion.call_args.kwargs["messages"]
+    assert [
+        message["content"][-1].get("cache_control")
+        if isinstance(message["content"], list)
+        else None
+        for message in messages
+    ] == [{"type": "ephemeral"}, None, {"type": "ephemeral"}, None]
+    assert messages[0]["content"] == [
+        {"type": "text", "text": "rules", "cache_control": {"type": "ephemeral"}}
+    ]
+
+    # the prompt alone is not cached, and the generators can opt out
+    await provider.get_generator()(prompt="question")
+    assert acompletion.call_args.kwargs["messages"][0]["content"] == "question"
+    generator = provider.get_generator(system_prompt="rules", prompt_caching=False)
+    await generator(prompt="question")
+    assert acompletion.call_args.kwargs["messages"][0]["content"] == "rules"
+
+
+@pytest.mark.asyncio
+async def test_generator_with_response_cache(acompletion):
+    provider = LitellmLLMProvider(model="fake-model", kwargs={"temperature": 0})
+    generator = provider.with_response_cache().get_generator(system_prompt="rules")
+
+    result = await generator(prompt="question")
+    assert result["meta"][0]["usage"]["total_tokens"] == 1_210
+    cached = await generator(prompt="question")
+    assert cached["replies"] == result["replies"]
+    # the cached responses are not billed again
+    assert cached["meta"][0]["usage"] == {}
+    assert acompletion.call_count == 1
+
+    # other prompts, sampled and streamed generations, and the pipelines without cache are not cached
+    await generator(prompt="other question")
+    await generator(prompt="question", generation_kwargs={"temperature": 0.7})
+    await provider.get_generator(system_prompt="rules")(prompt="question")
+    assert acompletion.call_count == 4
+    assert provider.cache_stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_generator_coalesces_concurrent_requests(acompletion):
+    provider = LitellmLLMProvider(model="fake-model")
+    generator = provider.get_generator(system_prompt="rules")
+
+    results = await asyncio.gather(*[generator(prompt="question") for _ in range(3)])
+    assert acompletion.call_count == 1
+    assert all(result == results[0] for result in results)
+    assert provider.single_flight_stats() == {
+        "calls": 1,
+        "coalesced": 2,
+        "in_flight": 0,
+    }
+
+    # the sampled generations are sent separately
+    await asyncio.gather(
+        *[
+            generator(prompt="question", generation_kwargs={"temperature": 0.7})
+            for _ in range(2)
+        ]
+    )
+    assert acompletion.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_scheduler_serves_higher_priorities_first():
+    scheduler = LLMScheduler(max_concurrent_requests=2, concurrency={"background": 1})
+    order = []
+    release = asyncio.Event()
+
+    async def request(name: str, priority: str):
+        async with scheduler.slot(priority):
+            order.append(name)
+            await release.wait()
+
+    # the background class is capped to one slot, the other slot is left to the other classes
+    tasks = [asyncio.create_task(request("background 1", "background"))]
+    tasks.append(asyncio.create_task(request("background 2", "background")))
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(request("interactive 1", "interactive")))
+    await asyncio.sleep(0)
+    assert order == ["background 1", "interactive 1"]
+
+    # the waiting interactive and followup requests go before the waiting background one
+    tasks.append(asyncio.create_task(request("followup", "followup")))
+    tasks.append(asyncio.create_task(request("interactive 2", "interactive")))
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(*tasks)
+    assert order == [
+        "background 1",
+        "interactive 1",
+        "interactive 2",
+        "followup",
+        "background 2",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_generator_reports_priority_and_queue_wait(acompletion):
+    provider = LitellmLLMProvider(model="fake-model", max_concurrent_requests=1)
+    generator = provider.get_generator(system_prompt="rules")
+
+    @llm_priority("background")
+    async def recommend():
+        return await generator(prompt="question", generation_kwargs={"temperature": 1})
+
+    result = await recommend()
+    assert result["meta"][0]["priority"] == "background"
+    assert result["meta"][0]["queue_wait"] >= 0
+    result = await generator(prompt="question")
+    assert result["meta"][0]["priority"] == "interactive"
+
+
+@pytest.mark.asyncio
+async def test_generator_coalesces_requests_of_the_same_priority(acompletion):
+    provider = LitellmLLMProvider(model="fake-model")
+    generator = provider.get_generator(system_prompt="rules")
+
+    @llm_priority("background")
+    async def recommend():
+        return await generator(prompt="question")
+
+    # the ask does not join the background request in flight, it is sent at its own priority
+    results = await asyncio.gather(
+        recommend(), generator(prompt="question"), generator(prompt="question")
+    )
+    assert [result["meta"][0]["priority"] for result in results] == [
+        "background",
+        "interactive",
+        "interactive",
+    ]
+    assert acompletion.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_generator_hedges_slow_requests(mocker: MockerFixture):
+    provider = LitellmLLMProvider(
+        model="primary",
+        fallback_model_list=[
+            {"model_name": "primary", "litellm_params": {"model": "openai/primary"}},
+            {"model_name": "backup", "litellm_params": {"model": "openai/backup"}},
+        ],
+        hedging=True,
+        hedge_delay=0.05,
+    )
+    cancelled = []
+
+    async def _acompletion(model: str, **kwargs):
+        try:
+            if model == "primary":
+                await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(model)
+            raise
+        response = _response()
+        response.model = model
+        return response
+
+    mocker.patch.object(provider._router, "acompletion", side_effect=_acompletion)
+    generator = provider.get_generator(system_prompt="rules")
+
+    # the slow primary request is raced with the backup model, the loser is cancelled
+    result = await generator(prompt="question")
+    assert result["meta"][0]["model"] == "backup"
+    assert cancelled == ["primary"]
+    stats = provider.hedging_stats()
+    assert stats["hedged"] == 1
+    assert stats["latencies"]["primary"]["samples"] == 1
+    assert stats["latencies"]["primary"]["hedge_delay"] == 0.05
@@ -3,7 +3,7 @@ from src.providers import loader
 
 def test_import_mods():
     loader.import_mods("src.providers")
-    assert len(loader.PROVIDERS) == 6
+    assert len(loader.PROVIDERS) == 7
 
 
 def test_get_provider():
@@ -21,6 +21,9 @@ def test_get_provider():
     provider = loader.get_provider("qdrant")
     assert provider.__name__ == "QdrantProvider"
 
+    provider = loader.get_provider("embedded")
+    assert provider.__name__ == "EmbeddedProvider"
+
     # engine provider
     provider = loader.get_provider("wren_ui")
     assert provider.__name__ == "WrenUI"
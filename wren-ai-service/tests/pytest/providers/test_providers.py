@@ -3,7 +3,12 @@ from pytest_mock import MockerFixture
 from src.core.engine import Engine
 from src.core.pipeline import PipelineComponent
 from src.core.provider import DocumentStoreProvider, EmbedderProvider, LLMProvider
-from src.providers import Configuration, generate_components, transform
+from src.providers import (
+    Configuration,
+    generate_components,
+    provider_stats,
+    transform,
+)
 
 
 def test_transform():
@@ -101,3 +106,26 @@ def test_generate_components(mocker: MockerFixture):
     assert isinstance(result["indexing"].llm_provider, LLMProvider)
     assert isinstance(result["indexing"].document_store_provider, DocumentStoreProvider)
     assert isinstance(result["indexing"].engine, Engine)
+
+
+def test_provider_stats(mocker: MockerFixture):
+    embedder = mocker.Mock(spec=EmbedderProvider)
+    embedder.get_model.return_value = "text-embedding-3-large"
+    embedder.cache_stats = lambda: {"hits": 3, "misses": 1, "size": 1}
+    llm = mocker.Mock(spec=LLMProvider)
+    llm.get_model.return_value = "gpt-4.1-mini"
+    llm.single_flight_stats = lambda: {"calls": 4, "coalesced": 2, "in_flight": 0}
+    components = {
+        "indexing": PipelineComponent(embedder_provider=embedder),
+        "retrieval": PipelineComponent(embedder_provider=embedder, llm_provider=llm),
+    }
+
+    # the providers shared by the pipelines are reported once
+    assert provider_stats(components) == {
+        "llm gpt-4.1-mini": {
+            "single_flight": {"calls": 4, "coalesced": 2, "in_flight": 0}
+        },
+        "embedder text-embedding-3-large": {
+            "cache": {"hits": 3, "misses": 1, "size": 1}
+        },
+    }
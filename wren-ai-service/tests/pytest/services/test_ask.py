@@ -1,5 +1,7 @@
+import asyncio
 import json
 import uuid
+from typing import Optional
 
 import orjson
 import pytest
@@ -9,6 +11,7 @@ from src.pipelines import generation, indexing, retrieval
 from src.providers import generate_components
 from src.utils import fetch_wren_ai_docs
 from src.web.v1.services.ask import (
+    AnswerCache,
     AskRequest,
     AskResultRequest,
     AskService,
@@ -153,3 +156,120 @@ async def test_ask_with_successful_query(
     # assert ask_result_response.response[0].sql != ""
     # assert ask_result_response.response[0].summary != ""
     # assert ask_result_response.response[0].type == "llm" or "view"
+
+
+class _PipelineMock:
+    def __init__(self, result: Optional[dict] = None, delay: float = 0):
+        self._result = result or {}
+        self._delay = delay
+        self.calls = []
+        self.cancelled = False
+
+    async def run(self, **kwargs):
+        self.calls.append(kwargs)
+        try:
+            await asyncio.sleep(self._delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return self._result
+
+
+@pytest.mark.asyncio
+async def test_ask_cancels_speculative_stages_on_historical_question():
+    documents = {"formatted_output": {"documents": [{"statement": "SELECT 1"}]}}
+    pipelines = {
+        "historical_question": _PipelineMock(documents),
+        "sql_pairs_retrieval": _PipelineMock(delay=10),
+        "instructions_retrieval": _PipelineMock(delay=10),
+        "sql_functions_retrieval": _PipelineMock(delay=10),
+        "sql_knowledge_retrieval": _PipelineMock(delay=10),
+        "db_schema_retrieval": _PipelineMock(delay=10),
+    }
+    ask_service = AskService(pipelines)
+
+    ask_request = AskRequest(query="How many books are there?", mdl_hash="mdl")
+    ask_request.query_id = str(uuid.uuid4())
+    await ask_service.ask(ask_request)
+    await asyncio.sleep(0)
+
+    result = ask_service.get_ask_result(AskResultRequest(query_id=ask_request.query_id))
+    assert result.status == "finished"
+    assert result.response[0].sql == "SELECT 1"
+
+    # the independent stages were started with the original question, then discarded
+    for name, pipeline in pipelines.items():
+        if name != "historical_question":
+            assert pipeline.calls and pipeline.cancelled, name
+
+
+@pytest.mark.asyncio
+async def test_ask_with_answer_cache():
+    class MockEmbedder:
+        embeddings = {
+            "How many books are there?": [1.0, 0.0],
+            "how many books are there": [0.99, 0.01],
+            "Who wrote the most books?": [0.0, 1.0],
+        }
+
+        async def run(self, text: str):
+            return {"embedding": self.embeddings[text]}
+
+    empty = {"formatted_output": {"documents": []}}
+    pipelines = {
+        "historical_question": _PipelineMock(empty),
+        "sql_pairs_retrieval": _PipelineMock(empty),
+        "instructions_retrieval": _PipelineMock(empty),
+        "db_schema_retrieval": _PipelineMock(
+            {
+                "construct_retrieval_results": {
+                    "retrieval_results": [
+                        {"table_name": "book", "table_ddl": "CREATE TABLE book"}
+                    ]
+                }
+            }
+        ),
+        "sql_generation": _PipelineMock(
+            {"post_process": {"valid_generation_result": {"sql": "SELECT 1"}}}
+        ),
+    }
+    answer_cache = AnswerCache(MockEmbedder())
+    ask_service = AskService(
+        pipelines,
+        allow_intent_classification=False,
+        allow_sql_generation_reasoning=False,
+        allow_sql_functions_retrieval=False,
+        allow_sql_knowledge_retrieval=False,
+        answer_cache=answer_cache,
+    )
+
+    async def ask(query: str, mdl_hash: str = "mdl", **kwargs):
+        ask_request = AskRequest(
+            query=query, mdl_hash=mdl_hash, project_id="project", **kwargs
+        )
+        ask_request.query_id = str(uuid.uuid4())
+        await ask_service.ask(ask_request)
+        return ask_service.get_ask_result(
+            AskResultRequest(query_id=ask_request.query_id)
+        )
+
+    result = await ask("How many books are there?")
+    assert result.response[0].sql == "SELECT 1"
+
+    # a similar question is answered from the cache
+    result = await ask("how many books are there")
+    assert result.status == "finished"
+    assert result.response[0].sql == "SELECT 1"
+    assert result.retrieved_tables == ["book"]
+    assert len(pipelines["sql_generation"].calls) == 1
+
+    # a different question, or the same one after re-deploy, is generated again
+    await ask("Who wrote the most books?")
+    answer_cache.invalidate("project", "new-mdl")
+    await ask("How many books are there?", mdl_hash="new-mdl")
+    assert len(pipelines["sql_generation"].calls) == 3
+
+    # the answers of other instructions and languages are not shared
+    await ask("How many books are there?", custom_instruction="count the editions")
+    await ask("How many books are there?", configurations={"language": "French"})
+    assert len(pipelines["sql_generation"].calls) == 5
@@ -0,0 +1,167 @@
+"""
+Migrate the Qdrant collections to or from custom shard keys per project.
+
+The points are copied to a temporary collection, the collection is recreated with the new sharding method,
+and the points are copied back, routed to the shard key of their project. The payload indexes,
+HNSW and quantization configurations of the collection are kept.
+
+Usage:
+    python tools/migrate_qdrant_shards.py --location http://localhost:6333
+    python tools/migrate_qdrant_shards.py --location http://localhost:6333 --unshard
+"""
+
+import argparse
+import os
+from typing import Optional
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as rest
+
+COLLECTIONS = [
+    "Document",
+    "table_descriptions",
+    "view_questions",
+    "sql_pairs",
+    "instructions",
+    "project_meta",
+]
+# keep in sync with src.providers.document_store.qdrant.DEFAULT_SHARD_KEY
+DEFAULT_SHARD_KEY = "default"
+
+
+def _create_collection(
+    client: QdrantClient,
+    collection_name: str,
+    collection_info: rest.CollectionInfo,
+    sharded: bool,
+):
+    params = collection_info.config.params
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config=params.vectors,
+        sparse_vectors_config=params.sparse_vectors,
+        replication_factor=params.replication_factor,
+        write_consistency_factor=params.write_consistency_factor,
+        on_disk_payload=params.on_disk_payload,
+        hnsw_config=rest.HnswConfigDiff(
+            **collection_info.config.hnsw_config.model_dump()
+        ),
+        quantization_config=collection_info.config.quantization_config,
+        sharding_method=rest.ShardingMethod.CUSTOM if sharded else None,
+    )
+    for field_name, payload_index in collection_info.payload_schema.items():
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=payload_index.data_type,
+        )
+
+
+def _copy_points(
+    client: QdrantClient,
+    source: str,
+    target: str,
+    sharded: bool,
+    batch_size: int,
+) -> int:
+    shard_keys = set()
+    copied = 0
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=source,
+            offset=offset,
+            limit=batch_size,
+            with_payload=True,
+            with_vectors=True,
+        )
+
+        points_by_shard: dict[Optional[str], list[rest.PointStruct]] = {}
+        for record in records:
+            shard_key = (
+                (record.payload.get("project_id") or DEFAULT_SHARD_KEY)
+                if sharded
+                else None
+            )
+            points_by_shard.setdefault(shard_key, []).append(
+                rest.PointStruct(
+                    id=record.id, vector=record.vector, payload=record.payload
+                )
+            )
+
+        for shard_key, points in points_by_shard.items():
+            if shard_key is not None and shard_key not in shard_keys:
+                client.create_shard_key(target, shard_key)
+                shard_keys.add(shard_key)
+
+            client.upsert(
+                collection_name=target,
+                points=points,
+                shard_key_selector=shard_key,
+                wait=True,
+            )
+            copied += len(points)
+
+        if offset is None:
+            return copied
+
+
+def migrate(client: QdrantClient, collection_name: str, sharded: bool, batch_size: int):
+    if not client.collection_exists(collection_name):
+        print(f"{collection_name}: not found, skipped")
+        return
+
+    collection_info = client.get_collection(collection_name)
+    if (
+        collection_info.config.params.sharding_method == rest.ShardingMethod.CUSTOM
+    ) == sharded:
+        print(f"{collection_name}: already migrated, skipped")
+        return
+
+    temporary_name = f"{collection_name}_migration"
+    if client.collection_exists(temporary_name):
+        raise RuntimeError(
+            f"{temporary_name} already exists, a previous migration may have failed: "
+            f"restore {collection_name} from it, then delete it and run the migration again"
+        )
+
+    _create_collection(client, temporary_name, collection_info, sharded=False)
+    count = _copy_points(
+        client, collection_name, temporary_name, sharded=False, batch_size=batch_size
+    )
+
+    client.delete_collection(collection_name)
+    _create_collection(client, collection_name, collection_info, sharded=sharded)
+    _copy_points(
+        client, temporary_name, collection_name, sharded=sharded, batch_size=batch_size
+    )
+    client.delete_collection(temporary_name)
+
+    print(f"{collection_name}: migrated {count} points")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--location",
+        type=str,
+        default=os.getenv("QDRANT_HOST", "http://localhost:6333"),
+    )
+    parser.add_argument("--api-key", type=str, default=os.getenv("QDRANT_API_KEY"))
+    parser.add_argument("--collections", nargs="+", default=COLLECTIONS)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument(
+        "--unshard",
+        action="store_true",
+        help="migrate the collections back to automatic sharding",
+    )
+    args = parser.parse_args()
+
+    client = QdrantClient(location=args.location, api_key=args.api_key, timeout=120)
+    for collection_name in args.collections:
+        migrate(
+            client,
+            collection_name,
+            sharded=not args.unshard,
+            batch_size=args.batch_size,
+        )